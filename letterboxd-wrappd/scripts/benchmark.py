@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""Offline benchmarks: run the enrichment scripts against local stand-in services.
+
+Starts fake_services.py (boxd.it, letterboxd.com and TMDb on one local port),
+writes synthetic inputs, and runs each script's main() in a fresh process
+with the transport's host overrides pointing at the stand-ins. Each size is
+run twice: cold (empty caches) and warm (the caches the cold run left).
+
+Usage:
+  python scripts/benchmark.py                                  # scrape, critics, curated at 100 and 1k rows
+  python scripts/benchmark.py --scripts scrape --sizes 100,1000,10000,50000
+  python scripts/benchmark.py --latency 0.02 --latency letterboxd.com=0.08 \\
+    --rate-429 api.themoviedb.org=0.02 --challenge-rate 0.01 --out bench.json
+  python scripts/benchmark.py --compare bench.json             # exit 1 on a regression
+
+Per run it records wall and CPU seconds, rows/second, peak RSS and the
+requests each stand-in served (with 429s and challenge pages).
+
+- Scripts: scrape (scrape_tmdb_ids.py with --enrich-tmdb), critics
+  (enrich_critics_list.py) and curated (enrich_curated_lists.py). The
+  enrich scripts look films up one at a time, so their 10k/50k runs take a
+  while even at low latency.
+- The synthetic diary repeats some films, like a real one, each rewatch with
+  its own shortlink. Lists don't.
+- TMDb's token bucket is lifted unless --tmdb-rate is given, and --sleep is
+  0, so the numbers measure the scripts rather than the pacing.
+- --compare flags a run whose rows/second dropped, or whose peak RSS grew,
+  by more than --tolerance against the same script/size/cache run in the
+  baseline file.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import importlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fake_services import HOSTS, FakeServices, ServiceConfig, film_title, film_url, film_year, shortlink
+
+SCRIPTS = {
+    "scrape": "scrape_tmdb_ids",
+    "critics": "enrich_critics_list",
+    "curated": "enrich_curated_lists",
+}
+DEFAULT_SIZES = (100, 1000)
+DEFAULT_LATENCY = 0.01
+# Share of diary rows that are rewatches of a film already in the diary.
+DIARY_REPEAT_RATE = 0.15
+UNLIMITED_RATE = (1_000_000, 1.0)
+
+
+def parse_host_values(values: List[str], *, default: float = 0.0) -> Dict[str, float]:
+    """Parse ["0.02", "letterboxd.com=0.08"] into a value for every stand-in host."""
+    result = {host: default for host in HOSTS}
+    for value in values:
+        host, sep, number = value.rpartition("=")
+        try:
+            parsed = float(number)
+        except ValueError:
+            raise ValueError(f"Expected VALUE or HOST=VALUE, got {value!r}") from None
+        if not sep:
+            result = {h: parsed for h in HOSTS}
+        elif host in HOSTS:
+            result[host] = parsed
+        else:
+            raise ValueError(f"Unknown host {host!r} (expected one of {', '.join(HOSTS)})")
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Synthetic inputs
+# ---------------------------------------------------------------------------
+def write_inputs(script: str, rows: int, workdir: Path, seed: int) -> List[str]:
+    """Write the input file for ``script`` and return its argv (without cache paths)."""
+    rng = random.Random(seed)
+    if script == "scrape":
+        distinct = max(1, int(rows * (1 - DIARY_REPEAT_RATE)))
+        films = [i % distinct for i in range(rows)]
+        rng.shuffle(films)
+        path = workdir / "diary.csv"
+        watches: Dict[int, int] = {}
+        with path.open("w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Date", "Name", "Year", "Letterboxd URI", "Rating", "Rewatch", "Tags", "Watched Date"])
+            for n in films:
+                rewatch = watches[n] = watches.get(n, -1) + 1
+                writer.writerow(["2024-01-01", film_title(n), film_year(n), shortlink(n, rewatch), "4",
+                                 "Yes" if rewatch else "", "", "2024-01-01"])
+        return ["--csv", str(path), "--uri-column", "Letterboxd URI", "--out", str(workdir / "out.json"),
+                "--enrich-tmdb", "--tmdb-api-key", "bench"]
+    if script == "critics":
+        path = workdir / "list.csv"
+        with path.open("w", encoding="utf-8", newline="") as f:
+            f.write("Letterboxd list export v7\nDate,Name,Tags,URL,Description\n2024-01-01,Bench,,https://boxd.it/list,\n\n")
+            writer = csv.writer(f)
+            writer.writerow(["Position", "Name", "Year", "URL", "Description"])
+            for position, n in enumerate(range(rows), start=1):
+                writer.writerow([position, film_title(n), film_year(n), film_url(n), ""])
+        return ["--csv", str(path), "--out", str(workdir / "out.json"), "--tmdb-api-key", "bench", "--sleep", "0"]
+    path = workdir / "curated-lists.json"
+    films = [{"name": film_title(n), "year": film_year(n), "url": shortlink(n)} for n in range(rows)]
+    path.write_text(json.dumps({"films": films}), encoding="utf-8")
+    return ["--in", str(path), "--out", str(workdir / "out.json"), "--tmdb-api-key", "bench", "--sleep", "0"]
+
+
+def cache_args(script: str, cachedir: Path) -> List[str]:
+    return ["--cache", str(cachedir / "film_store.sqlite")]
+
+
+# ---------------------------------------------------------------------------
+# One run, in a fresh process
+# ---------------------------------------------------------------------------
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_case(module_name: str, argv: List[str], overrides: Dict[str, str], tmdb_rate: Tuple[int, float]) -> dict:
+    from http_transport import shared_transport
+
+    http = shared_transport()
+    http.configure(host_overrides=overrides, rate_limits={"api.themoviedb.org": tmdb_rate})
+    module = importlib.import_module(module_name)
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        code = module.main(argv)
+        seconds = time.perf_counter() - started
+        cpu = time.process_time() - cpu_started
+    return {"exit": code, "seconds": seconds, "cpu_seconds": cpu, "peak_rss_mb": _peak_rss_mb()}
+
+
+def run_benchmarks(args: argparse.Namespace, services: FakeServices) -> List[dict]:
+    tmdb_rate = UNLIMITED_RATE
+    if args.tmdb_rate:
+        from http_transport import parse_rate
+
+        tmdb_rate = parse_rate(args.tmdb_rate)
+
+    results: List[dict] = []
+    root = Path(tempfile.mkdtemp(prefix="wrappd-bench-"))
+    try:
+        for script in args.scripts:
+            for rows in args.sizes:
+                workdir = root / f"{script}-{rows}"
+                cachedir = workdir / "cache"
+                cachedir.mkdir(parents=True)
+                argv = write_inputs(script, rows, workdir, args.seed) + cache_args(script, cachedir)
+                if script == "scrape":
+                    # scrape_tmdb_ids sets the TMDb bucket from its own flag.
+                    argv += ["--tmdb-rate", f"{tmdb_rate[0]}/{tmdb_rate[1]}"]
+                for cache_state in ("cold", "warm"):
+                    services.reset_stats()
+                    # One process per run: no module state, memo or connection pool carries over.
+                    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                        run = pool.submit(_run_case, SCRIPTS[script], argv, services.overrides(), tmdb_rate).result()
+                    stats = services.stats()
+                    result = {
+                        "script": script,
+                        "rows": rows,
+                        "cache": cache_state,
+                        **run,
+                        "rows_per_second": rows / run["seconds"] if run["seconds"] else None,
+                        "requests": {host: stats.get(host, {}).get("requests", 0) for host in HOSTS},
+                        "throttled": sum(s.get("429", 0) for s in stats.values()),
+                        "challenges": sum(s.get("challenge", 0) for s in stats.values()),
+                    }
+                    results.append(result)
+                    print_row(result)
+    finally:
+        if args.keep:
+            print(f"Kept inputs, outputs and caches in {root}", file=sys.stderr)
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+HEADER = (
+    f"{'script':<8} {'rows':>6} {'cache':<5} {'exit':>4} {'seconds':>8} {'rows/s':>9} {'cpu s':>7} {'peak MB':>8} "
+    f"{'boxd.it':>8} {'lbxd':>8} {'tmdb':>8} {'429s':>6} {'cf':>5}"
+)
+
+
+def print_row(r: dict) -> None:
+    peak = "-" if r["peak_rss_mb"] is None else f"{r['peak_rss_mb']:.0f}"
+    requests = r["requests"]
+    print(
+        f"{r['script']:<8} {r['rows']:>6} {r['cache']:<5} {r['exit']:>4} {r['seconds']:>8.2f} "
+        f"{r['rows_per_second'] or 0:>9.1f} {r['cpu_seconds']:>7.2f} {peak:>8} "
+        f"{requests['boxd.it']:>8} {requests['letterboxd.com']:>8} {requests['api.themoviedb.org']:>8} "
+        f"{r['throttled']:>6} {r['challenges']:>5}",
+        flush=True,
+    )
+
+
+def compare(results: List[dict], baseline: List[dict], tolerance: float) -> List[str]:
+    """Describe every run that got slower or bigger than ``tolerance`` allows against ``baseline``."""
+    previous = {(b["script"], b["rows"], b["cache"]): b for b in baseline}
+    regressions = []
+    for r in results:
+        b = previous.get((r["script"], r["rows"], r["cache"]))
+        if b is None:
+            continue
+        name = f"{r['script']} {r['rows']} rows {r['cache']}"
+        if b.get("rows_per_second") and r["rows_per_second"] < b["rows_per_second"] * (1 - tolerance):
+            regressions.append(f"{name}: {r['rows_per_second']:.1f} rows/s, was {b['rows_per_second']:.1f}")
+        if b.get("peak_rss_mb") and r["peak_rss_mb"] and r["peak_rss_mb"] > b["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{name}: peak {r['peak_rss_mb']:.0f} MB, was {b['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Benchmark the enrichment scripts against local stand-in services")
+    p.add_argument("--scripts", default=",".join(SCRIPTS), help=f"Comma-separated subset of {', '.join(SCRIPTS)}")
+    p.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                   help="Comma-separated row counts (e.g. 100,1000,10000,50000)")
+    p.add_argument("--latency", action="append", default=[], metavar="[HOST=]SECONDS",
+                   help=f"Mean response latency of the stand-ins (default {DEFAULT_LATENCY}; repeatable per host)")
+    p.add_argument("--rate-429", action="append", default=[], metavar="[HOST=]P",
+                   help="Share of requests answered 429 (repeatable per host)")
+    p.add_argument("--retry-after", type=float, help="Retry-After seconds sent with 429s")
+    p.add_argument("--challenge-rate", type=float, default=0.0, help="Share of film pages served as a Cloudflare challenge")
+    p.add_argument("--not-found-rate", type=float, default=0.0, help="Share of films whose page has no TMDb link")
+    p.add_argument("--tmdb-rate", help="Keep a TMDb rate limit, N or N/SECONDS (default: none)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", help="Write the results as JSON")
+    p.add_argument("--compare", metavar="BASELINE", help="Results JSON from an earlier run to check against")
+    p.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown / memory growth for --compare")
+    p.add_argument("--keep", action="store_true", help="Keep the temporary inputs, outputs and caches")
+    args = p.parse_args(argv)
+
+    try:
+        args.scripts = [s.strip() for s in args.scripts.split(",") if s.strip()]
+        unknown = [s for s in args.scripts if s not in SCRIPTS]
+        if unknown:
+            raise ValueError(f"Unknown script(s): {', '.join(unknown)}")
+        args.sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+        config = ServiceConfig(
+            latency=parse_host_values(args.latency, default=DEFAULT_LATENCY),
+            rate_429=parse_host_values(args.rate_429),
+            retry_after=args.retry_after,
+            challenge_rate=args.challenge_rate,
+            not_found_rate=args.not_found_rate,
+            seed=args.seed,
+        )
+    except ValueError as e:
+        print(f"Invalid argument: {e}", file=sys.stderr)
+        return 2
+
+    print(HEADER)
+    with FakeServices(config) as services:
+        results = run_benchmarks(args, services)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"Wrote {len(results)} results -> {args.out}")
+    if args.compare:
+        regressions = compare(results, json.loads(Path(args.compare).read_text(encoding="utf-8")), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,11 +3,13 @@ import csv
 import json
 import re
 import sys
-import time
 from pathlib import Path
 from typing import Iterable, Set, Optional
 
-import requests
+from http_transport import shared_transport
+from letterboxd_client import resolve_shortlinks
+
+HTTP = shared_transport()
 
 
 def extract_slug(url: str) -> Optional[str]:
@@ -15,19 +17,26 @@ def extract_slug(url: str) -> Optional[str]:
     return m.group(1) if m else None
 
 
-def resolve_url(url: str) -> Optional[str]:
-    if "/list/" in url:
-        return None
-    if "boxd.it" not in url and "/film/" in url:
-        return url
-    try:
-        resp = requests.get(url, allow_redirects=True, timeout=15, headers={"User-Agent": "letterbddy/1.0"})
-        final_url = resp.url
+def resolve_urls(urls: list[str]) -> dict[str, str]:
+    """Map each list URL to a film URL, expanding shortlinks from their redirect headers."""
+    resolved: dict[str, str] = {}
+    short: list[str] = []
+    for url in urls:
+        if "/list/" in url:
+            continue
+        if "boxd.it" not in url and "/film/" in url:
+            resolved[url] = url
+        else:
+            short.append(url)
+
+    def progress(done: int, total: int) -> None:
+        if done % 50 == 0 or done == total:
+            print(f"Resolved {done}/{total}...", file=sys.stderr, flush=True)
+
+    for url, final_url in HTTP.run(resolve_shortlinks(HTTP.transport, short, timeout=15, on_progress=progress)).items():
         if "/film/" in final_url and "/list/" not in final_url:
-            return final_url
-    except Exception:
-        return None
-    return None
+            resolved[url] = final_url
+    return resolved
 
 
 def load_urls(csv_path: Path) -> list[str]:
@@ -76,16 +85,10 @@ def main() -> int:
 
     urls = load_urls(csv_path)
     slugs: Set[str] = set()
-    total = len(urls)
-    for i, url in enumerate(urls, start=1):
-        resolved = resolve_url(url)
-        if resolved:
-            slug = extract_slug(resolved)
-            if slug:
-                slugs.add(slug)
-        if i % 50 == 0 or i == total:
-            print(f"Resolved {i}/{total}...", file=sys.stderr, flush=True)
-        time.sleep(0.1)
+    for resolved in resolve_urls(urls).values():
+        slug = extract_slug(resolved)
+        if slug:
+            slugs.add(slug)
 
     out_path = csv_path.parent / "black-directors-slugs.json"
     out_path.write_text(json.dumps(sorted(slugs), indent=2), encoding="utf-8")
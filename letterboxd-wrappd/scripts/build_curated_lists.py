@@ -1,6 +1,14 @@
 #!/usr/bin/env python3
-"""Parse all 13 Letterboxd list export CSVs and produce public/curated-lists.json."""
+"""Parse all 13 Letterboxd list export CSVs and produce public/curated-lists.json.
 
+Also writes public/curated-lists.idx, a compact index of the same memberships
+keyed by film slug (see curated_index.py). The exports list films by boxd.it
+shortlink; those the shared cache has resolved are keyed by their film's slug.
+--resolve-shortlinks resolves the rest over the network first (and caches
+them). Any still unresolved are keyed by shortlink, with a warning.
+"""
+
+import argparse
 import csv
 import json
 import os
@@ -72,7 +80,50 @@ def parse_list_csv(filepath):
     return films
 
 
-def main():
+def load_resolved_shortlinks(urls, cache_path=None, resolve=False):
+    """boxd.it shortlink -> film URL for the shortlinks among ``urls`` the cache has resolved.
+
+    ``cache_path`` defaults to the shared cache. With ``resolve``, shortlinks
+    the cache doesn't have are resolved over the network first and stored in it.
+    """
+    from cache_store import SHARED_CACHE_PATH, open_cache
+    from letterboxd_client import is_film_url
+
+    cache_path = cache_path or SHARED_CACHE_PATH
+    shortlinks = [url for url in dict.fromkeys(urls) if "boxd.it/" in url]
+    if not resolve:
+        if not os.path.exists(cache_path):
+            return {}
+        with open_cache(cache_path, namespaces=("shortlink_to_film",), read_only=True) as cache:
+            short_map = cache.get("shortlink_to_film") or {}
+            return {url: short_map[url] for url in shortlinks if is_film_url(short_map.get(url) or "")}
+
+    from http_transport import shared_transport
+    from letterboxd_client import resolve_shortlinks
+
+    with open_cache(cache_path, namespaces=("shortlink_to_film",)) as cache:
+        short_map = cache["shortlink_to_film"]
+        pending = [url for url in shortlinks if not is_film_url(short_map.get(url) or "")]
+        if pending:
+            print(f"  Resolving {len(pending)} shortlinks...")
+            http = shared_transport()
+            for url, final in http.run(resolve_shortlinks(http.transport, pending, timeout=20)).items():
+                final = normalize_url(final)
+                if is_film_url(final):
+                    short_map[url] = final
+        return {url: short_map[url] for url in shortlinks if is_film_url(short_map.get(url) or "")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build public/curated-lists.json and curated-lists.idx")
+    parser.add_argument(
+        "--resolve-shortlinks",
+        action="store_true",
+        help="Resolve boxd.it shortlinks the shared cache doesn't have over the network, so the index is keyed by slug",
+    )
+    args = parser.parse_args(argv)
+
+
     # url -> {name, year, lists: {key: position}}
     films_by_url = {}
     lists_manifest = {}
@@ -108,6 +159,25 @@ def main():
     print(f"\nWrote {out_path}")
     print(f"  {len(lists_manifest)} lists, {len(films_array)} unique films")
 
+    from curated_index import film_key, write_curated_index
+
+    shortlinks = load_resolved_shortlinks([film["url"] for film in films_array], resolve=args.resolve_shortlinks)
+    index_path = os.path.join(PUBLIC_DIR, "curated-lists.idx")
+    size = write_curated_index(
+        index_path,
+        lists_manifest,
+        ((film_key(shortlinks.get(film["url"], film["url"])), film["lists"]) for film in films_array),
+    )
+    resolved = sum(1 for film in films_array if film["url"] in shortlinks)
+    print(f"Wrote {index_path} ({size:,} bytes; {resolved} shortlinks keyed by film slug)")
+    unresolved = sum(1 for film in films_array if "boxd.it/" in film["url"] and film["url"] not in shortlinks)
+    if unresolved:
+        print(
+            f"  WARNING: {unresolved} of {len(films_array)} films are keyed by an unresolved boxd.it shortlink; "
+            "slug lookups miss them (run with --resolve-shortlinks)",
+            file=sys.stderr,
+        )
+
     # Spot-check: top films by listCount
     print("\nTop 10 films by list count:")
     for film in films_array[:10]:
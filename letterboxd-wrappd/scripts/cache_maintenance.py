@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Keep the enrichment caches small: expiry, LRU eviction, orphan cleanup, compaction.
+
+Usage:
+  # Per-namespace entries, size, hits and ages (read-only: the files aren't touched)
+  python scripts/cache_maintenance.py stats .cache/*.sqlite .cache/*.json
+
+  # Expire, evict and compact (any number of caches, JSON or SQLite)
+  python scripts/cache_maintenance.py prune .cache/*.sqlite .cache/*.json \\
+    --max-age 180 --max-age tmdb_movie_data=30 --max-size-mb 200 --drop-orphans
+
+prune always drops negative-cache entries (``failures``) whose TTL has passed,
+then applies in order:
+- --max-age DAYS / NS=DAYS: drop entries written more than DAYS ago
+- --drop-orphans: drop list_cache path keys whose file is gone or has changed
+  since (each upload gets a new temp path, so these pile up). Content keys
+  stay: they are what a re-upload of the same list hits.
+- --max-size-mb N: evict least recently used entries, across namespaces,
+  until the entries total at most N MB
+and finally compacts the file (VACUUM for SQLite, a rewrite for JSON).
+
+Only cache files (.json, .sqlite, .sqlite3, .db) are opened. Their sidecars
+(SQLite -wal/-shm/-journal, JSON .journal/.meta/.tmp) are skipped, so a glob
+like .cache/* is safe; any other file is refused before anything is opened.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from cache_store import SQLITE_SUFFIXES, CacheStore, open_cache
+
+DAY = 24 * 60 * 60
+
+# See negative_cache.NEGATIVE_NAMESPACE (not imported: that module needs httpx).
+FAILURES_NAMESPACE = "failures"
+
+CACHE_SUFFIXES = (".json",) + SQLITE_SUFFIXES
+
+# Files the backends keep next to a cache; never caches themselves.
+SIDECAR_SUFFIXES = ("-wal", "-shm", "-journal", ".journal", ".meta", ".tmp")
+
+
+def cache_paths(paths: List[str]) -> List[str]:
+    """The cache files among ``paths``, without sidecars. Raises ValueError on anything else."""
+    caches = []
+    for path in paths:
+        if path.endswith(SIDECAR_SUFFIXES):
+            continue
+        if Path(path).suffix.lower() not in CACHE_SUFFIXES:
+            raise ValueError(f"Not a cache file (expected {', '.join(CACHE_SUFFIXES)}): {path}")
+        caches.append(path)
+    return caches
+
+
+def parse_max_age(values: List[str]) -> tuple[Optional[float], Dict[str, float]]:
+    """Parse ["180", "tmdb_movie_data=30"] into (default seconds, {namespace: seconds})."""
+    default: Optional[float] = None
+    per_namespace: Dict[str, float] = {}
+    for value in values:
+        name, sep, days = value.rpartition("=")
+        try:
+            seconds = float(days) * DAY
+        except ValueError:
+            raise ValueError(f"Expected DAYS or NAMESPACE=DAYS, got {value!r}") from None
+        if sep:
+            per_namespace[name] = seconds
+        else:
+            default = seconds
+    return default, per_namespace
+
+
+def namespace_stats(store: CacheStore, now: float) -> List[dict]:
+    """Entries, bytes, hits and ages for each namespace in the store."""
+    rows = []
+    for name in store.namespaces:
+        entries = list(store.entry_stats(name))
+        ages = sorted(now - e.updated_at for e in entries)
+        accessed = [e.accessed_at for e in entries if e.accessed_at]
+        rows.append({
+            "namespace": name,
+            "entries": len(entries),
+            "bytes": sum(e.size for e in entries),
+            "hits": sum(e.hits for e in entries),
+            "read": sum(1 for e in entries if e.hits),
+            "median_age_days": ages[len(ages) // 2] / DAY if ages else None,
+            "oldest_age_days": ages[-1] / DAY if ages else None,
+            "last_read_days": (now - max(accessed)) / DAY if accessed else None,
+        })
+    return rows
+
+
+def print_stats(store: CacheStore, now: float) -> None:
+    def days(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value:.1f}d"
+
+    print(f"{store.path} ({store.disk_usage() / 1024:.0f} KB on disk)")
+    print(f"  {'namespace':<20} {'entries':>8} {'KB':>9} {'hits':>8} {'read':>6} {'median age':>11} {'oldest':>8} {'last read':>10}")
+    for row in namespace_stats(store, now):
+        read_pct = f"{100 * row['read'] / row['entries']:.0f}%" if row["entries"] else "-"
+        print(
+            f"  {row['namespace']:<20} {row['entries']:>8} {row['bytes'] / 1024:>9.1f} {row['hits']:>8} "
+            f"{read_pct:>6} {days(row['median_age_days']):>11} {days(row['oldest_age_days']):>8} "
+            f"{days(row['last_read_days']):>10}"
+        )
+
+
+def expire_failures(store: CacheStore, now: float) -> int:
+    if FAILURES_NAMESPACE not in store.namespaces:
+        return 0
+    expired = []
+    for stat in store.entry_stats(FAILURES_NAMESPACE):
+        entry = store.peek(FAILURES_NAMESPACE, stat.key)
+        if not isinstance(entry, dict) or entry.get("expires_at", 0) <= now:
+            expired.append(stat.key)
+    return store.delete_many(FAILURES_NAMESPACE, expired)
+
+
+def expire_by_age(
+    store: CacheStore, now: float, default: Optional[float], per_namespace: Dict[str, float]
+) -> Dict[str, int]:
+    removed: Dict[str, int] = {}
+    for name in store.namespaces:
+        max_age = per_namespace.get(name, default)
+        if max_age is None:
+            continue
+        old = [e.key for e in store.entry_stats(name) if now - e.updated_at > max_age]
+        if old:
+            removed[name] = store.delete_many(name, old)
+    return removed
+
+
+def drop_orphaned_list_keys(store: CacheStore) -> int:
+    """Drop list_cache path keys ("<path>|<mtime>|<column>") that no longer match a file."""
+    if "list_cache" not in store.namespaces:
+        return 0
+    orphans = []
+    for stat in store.entry_stats("list_cache"):
+        if stat.key.startswith("sha256:"):
+            continue
+        parts = stat.key.rsplit("|", 2)
+        path = parts[0]
+        if not os.path.exists(path):
+            orphans.append(stat.key)
+        elif len(parts) == 3:
+            try:
+                if os.path.getmtime(path) != float(parts[1]):
+                    orphans.append(stat.key)
+            except ValueError:
+                pass
+    return store.delete_many("list_cache", orphans)
+
+
+def evict_lru(store: CacheStore, max_bytes: int) -> int:
+    """Evict least recently used entries until the entries total at most max_bytes."""
+    entries = [(e.last_used, name, e.key, e.size) for name in store.namespaces for e in store.entry_stats(name)]
+    total = sum(size for _, _, _, size in entries)
+    victims: Dict[str, List[str]] = {}
+    for _, name, key, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        victims.setdefault(name, []).append(key)
+        total -= size
+    return sum(store.delete_many(name, keys) for name, keys in victims.items())
+
+
+def prune(store: CacheStore, args: argparse.Namespace, now: float) -> None:
+    before = store.disk_usage()
+    default_age, per_namespace = parse_max_age(args.max_age)
+
+    removed = expire_failures(store, now)
+    if removed:
+        print(f"  expired {removed} failure entries")
+    for name, count in expire_by_age(store, now, default_age, per_namespace).items():
+        print(f"  expired {count} {name} entries by age")
+    if args.drop_orphans:
+        print(f"  dropped {drop_orphaned_list_keys(store)} orphaned list_cache keys")
+    if args.max_size_mb is not None:
+        print(f"  evicted {evict_lru(store, int(args.max_size_mb * 1024 * 1024))} least recently used entries")
+    if args.compact:
+        store.compact()
+        print(f"  compacted: {before / 1024:.0f} KB -> {store.disk_usage() / 1024:.0f} KB")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Inspect and shrink the Letterboxd/TMDb caches")
+    sub = p.add_subparsers(dest="command", required=True)
+    stats = sub.add_parser("stats", help="Per-namespace entries, size, hits and ages")
+    stats.add_argument("caches", nargs="+", help="Cache files (.json, .sqlite or .db)")
+    pr = sub.add_parser("prune", help="Expire, evict and compact")
+    pr.add_argument("caches", nargs="+", help="Cache files (.json, .sqlite or .db)")
+    pr.add_argument("--max-age", action="append", default=[], metavar="[NS=]DAYS",
+                    help="Drop entries written more than DAYS ago (repeatable; NS= limits it to one namespace)")
+    pr.add_argument("--max-size-mb", type=float, help="Evict least recently used entries above this size")
+    pr.add_argument("--drop-orphans", action="store_true", help="Drop list_cache keys for files that are gone or changed")
+    pr.add_argument("--no-compact", dest="compact", action="store_false", help="Skip VACUUM / rewrite")
+    args = p.parse_args(argv)
+
+    if args.command == "prune":
+        try:
+            parse_max_age(args.max_age)
+        except ValueError as e:
+            print(f"Invalid --max-age: {e}", file=sys.stderr)
+            return 2
+
+    try:
+        caches = cache_paths(args.caches)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    missing = [path for path in caches if not Path(path).exists()]
+    if missing:
+        print(f"Cache not found: {', '.join(missing)}", file=sys.stderr)
+        return 2
+
+    now = time.time()
+    for path in caches:
+        with open_cache(path, namespaces=(), read_only=args.command == "stats") as store:
+            if args.command == "prune":
+                print(f"Pruning {path}")
+                prune(store, args, now)
+            print_stats(store, now)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
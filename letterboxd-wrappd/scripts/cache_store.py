@@ -0,0 +1,864 @@
+#!/usr/bin/env python3
+"""Persistent, namespaced key/value caches shared by the enrichment scripts.
+
+A cache holds a few namespaces, each mapping string keys to JSON values:
+
+  shortlink_to_film    boxd.it shortlink -> Letterboxd film URL
+  film_to_tmdb         canonical film URL (https://letterboxd.com/film/<slug>/) -> TMDb ID
+  title_year_to_tmdb   "<title>|<year>" -> {"id", "confidence"} of a search match
+                       (tmdb_client.search_cache_entry; never copied into
+                       film_to_tmdb, which only holds IDs read off film pages)
+  tmdb_movie_data      TMDb ID -> tmdb_data record (tmdb_client.build_tmdb_data)
+  list_cache           resolved Letterboxd list uploads
+  failures             negative cache (negative_cache.py)
+
+Callers use it exactly like the old cache dict:
+
+  cache = open_cache(SHARED_CACHE_PATH)
+  cache["film_to_tmdb"][url] = 496243
+  cached = cache.get("shortlink_to_film", {}).get(short_url)
+  cache.close()
+
+Backends
+- JsonCacheStore: one JSON document, parsed whole on open and rewritten whole
+  on close (the original format). Entries are decoded one namespace at a
+  time, when the namespace is first used; namespaces a run never touches are
+  written back as they were read.
+- SqliteCacheStore: one table per namespace in an SQLite database in WAL mode.
+  Lookups are point queries on the primary key and writes are buffered and
+  upserted in batches, so opening and closing cost the same however large the
+  cache grows. A namespace's table is only set up when it is first used.
+
+``load_seconds`` has the time each namespace took to load (decode, or set up
+its table), and open_cache() sets ``open_seconds``; a run without
+--enrich-tmdb never loads tmdb_movie_data.
+
+Checkpoints
+Both backends persist newly written entries every ``checkpoint_every`` writes
+or ``checkpoint_seconds`` seconds, whichever comes first, so a killed run keeps
+what it fetched. A checkpoint only writes the new entries: SQLite upserts them,
+the JSON backend appends them to ``<cache>.journal``, which is replayed on the
+next open and folded into the main file on close.
+
+Compact records and codecs
+Values of ``tmdb_movie_data`` are stored in the compact positional form from
+compact_records.py and decoded back to the usual tmdb_data dict on read. Values
+are serialized with orjson when it is installed, else with stdlib json, without
+indentation. ``codec="msgpack"`` (needs the msgpack package) stores SQLite
+values as msgpack blobs instead; each row is decoded by its type, so a cache
+can mix both.
+
+Usage metadata
+Each entry carries when it was written, when it was last read and how many
+times it was read (SQLite columns; a ``<cache>.meta`` sidecar for JSON). The
+maintenance command (cache_maintenance.py) uses them for expiry, LRU eviction
+and per-namespace statistics.
+
+The backend is picked from the file suffix (.sqlite/.sqlite3/.db -> SQLite).
+A new SQLite cache imports the legacy JSON cache next to it (same stem, .json)
+the first time it is opened. The import can also be run by hand:
+
+  python scripts/cache_store.py import-json .cache/letterboxd_tmdb_cache.json \\
+    .cache/letterboxd_tmdb_cache.sqlite
+
+The shared store
+All the scripts default to one store, SHARED_CACHE_PATH, so a film resolved
+or enriched by one of them is a hit for the others. Runs that record or
+replay HTTP (http_archive.py) default to a throwaway store instead (see
+resolve_cache_path()). When it is first created
+it takes in the per-script caches that came before it (LEGACY_CACHE_FILES,
+next to it in .cache/), with curated_tmdb_cache.json's ``tmdb_search`` renamed
+to ``title_year_to_tmdb``:
+
+  python scripts/cache_store.py import .cache/critics_enrich_cache.json .cache/film_store.sqlite
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator, MutableMapping
+from pathlib import Path
+from typing import Any, Iterable, NamedTuple, Optional
+
+from compact_records import codec_for
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+CACHE_VERSION = 1
+
+CODECS = ("auto", "json", "msgpack")
+
+DEFAULT_NAMESPACES = (
+    "shortlink_to_film", "film_to_tmdb", "title_year_to_tmdb", "list_cache", "tmdb_movie_data",
+    "failures",
+)
+
+SHARED_CACHE_PATH = Path(__file__).resolve().parent.parent / ".cache" / "film_store.sqlite"
+
+# The per-script caches the shared store replaces, imported in this order
+# (later files win on conflicting keys).
+LEGACY_CACHE_FILES = (
+    "critics_enrich_cache.json",
+    "letterboxd_tmdb_cache.json",
+    "letterboxd_tmdb_cache.sqlite",
+    "curated_tmdb_cache.json",
+)
+
+# Namespaces renamed on import: {old name: new name}.
+LEGACY_NAMESPACES = {"tmdb_search": "title_year_to_tmdb"}
+
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+
+# Pending writes are checkpointed after this many writes or this many seconds.
+DEFAULT_CHECKPOINT_EVERY = 200
+DEFAULT_CHECKPOINT_SECONDS = 30.0
+
+_NAMESPACE_RE = re.compile(r"[a-z][a-z0-9_]*")
+
+
+class EntryStat(NamedTuple):
+    key: str
+    size: int  # bytes of key + JSON value
+    updated_at: float
+    accessed_at: Optional[float]
+    hits: int
+
+    @property
+    def last_used(self) -> float:
+        return max(self.updated_at, self.accessed_at or 0.0)
+
+
+class CacheStore:
+    """Base class for cache backends: a mapping of namespace -> MutableMapping.
+
+    Subclasses implement ``_namespace``, ``checkpoint`` and ``flush``. The
+    dict-style helpers (``cache[ns]``, ``cache.get(ns, {})``,
+    ``cache.setdefault(ns, {})``) let the scripts keep treating the cache as a
+    dict of dicts.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        namespaces: Iterable[str] = DEFAULT_NAMESPACES,
+        *,
+        checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+        checkpoint_seconds: float = DEFAULT_CHECKPOINT_SECONDS,
+        read_only: bool = False,
+    ) -> None:
+        self.path = Path(path)
+        self.namespaces = tuple(namespaces)
+        # Read-only stores never write their files (not even on close); for inspection.
+        self.read_only = read_only
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.checkpoint_seconds = checkpoint_seconds
+        self._lock = threading.RLock()
+        self._pending_count = 0
+        self._last_checkpoint = time.monotonic()
+        # Reads served, lookups that found nothing and entries written during this run, per namespace.
+        self.reads: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+        self.writes: Counter[str] = Counter()
+        self.load_seconds: Counter[str] = Counter()
+        self.open_seconds = 0.0
+
+    def _namespace(self, name: str) -> MutableMapping[str, Any]:
+        raise NotImplementedError
+
+    def __getitem__(self, name: str) -> MutableMapping[str, Any]:
+        return self._namespace(name)
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and name in self.namespaces
+
+    def get(self, name: str, default: Any = None) -> Any:
+        if name not in self.namespaces:
+            return default
+        return self._namespace(name)
+
+    def setdefault(self, name: str, default: Any = None) -> MutableMapping[str, Any]:
+        return self._namespace(name)
+
+    def _note_write(self) -> None:
+        """Count a write and checkpoint when the item or time budget is used up."""
+        with self._lock:
+            self._pending_count += 1
+            if (
+                self._pending_count >= self.checkpoint_every
+                or time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds
+            ):
+                self.checkpoint()
+
+    def lookup_stats(self) -> dict[str, dict[str, Any]]:
+        """Hits, misses, hit ratio and writes per namespace for this run.
+
+        A hit is a ``ns[key]`` or ``ns.get(key)`` that found the entry, a miss one
+        that didn't (membership tests count as neither).
+        """
+        stats = {}
+        for name in self.namespaces:
+            hits, misses = self.reads[name], self.misses[name]
+            ratio = round(hits / (hits + misses), 3) if hits + misses else None
+            stats[name] = {"hits": hits, "misses": misses, "hit_ratio": ratio, "writes": self.writes[name]}
+            if name in self.load_seconds:
+                stats[name]["load_seconds"] = round(self.load_seconds[name], 4)
+        return stats
+
+    def _checkpointed(self) -> None:
+        self._pending_count = 0
+        self._last_checkpoint = time.monotonic()
+
+    def checkpoint(self) -> None:
+        """Persist entries written since the last checkpoint, without rewriting the rest."""
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Persist everything, leaving the store in its compact on-disk form."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        self.flush()
+
+    # -- maintenance -------------------------------------------------------
+    def peek(self, name: str, key: str, default: Any = None) -> Any:
+        """Read an entry without counting it as a use."""
+        raise NotImplementedError
+
+    def entry_stats(self, name: str) -> Iterator[EntryStat]:
+        """Yield size and usage metadata for every entry in namespace ``name``."""
+        raise NotImplementedError
+
+    def delete_many(self, name: str, keys: Iterable[str]) -> int:
+        """Delete ``keys`` from namespace ``name``. Returns how many existed."""
+        raise NotImplementedError
+
+    def compact(self) -> None:
+        """Rewrite the on-disk form without dead space."""
+        self.flush()
+
+    def _files(self) -> list[Path]:
+        return [self.path]
+
+    def disk_usage(self) -> int:
+        """Bytes on disk across the cache file and its sidecars."""
+        return sum(p.stat().st_size for p in self._files() if p.exists())
+
+    def __enter__(self) -> "CacheStore":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+# ---------------------------------------------------------------------------
+# JSON backend (legacy single-document format + append-only journal)
+# ---------------------------------------------------------------------------
+_MISSING = object()
+
+
+def _dumps(value: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(value).decode("utf-8")
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _loads(data: str | bytes) -> Any:
+    if isinstance(data, bytes):
+        if msgpack is None:
+            raise RuntimeError("This cache holds msgpack values. Install with: pip install msgpack")
+        return msgpack.unpackb(data, raw=False)
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _read_json_cache(path: Path) -> dict[str, Any]:
+    try:
+        if not path.exists():
+            return {}
+        data = _loads(path.read_text(encoding="utf-8"))
+        # curated_tmdb_cache.json predates the version field; treat it as current.
+        if not isinstance(data, dict) or data.get("version", CACHE_VERSION) != CACHE_VERSION:
+            return {}
+        return data
+    except Exception:
+        return {}
+
+
+class _JournaledDict(dict):
+    """A namespace dict that reports writes (for the next checkpoint) and reads to its store."""
+
+    def __init__(self, store: "JsonCacheStore", name: str, *args: Any) -> None:
+        super().__init__(*args)
+        self._store = store
+        self.name = name
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            value = super().__getitem__(key)
+        except KeyError:
+            self._store.misses[self.name] += 1
+            raise
+        self._store._note_access(self.name, key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self:
+            return self[key]
+        self._store.misses[self.name] += 1
+        return default
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        super().__setitem__(key, value)
+        self._store._journal_write(self.name, key, value)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if key not in self:
+            self._store.misses[self.name] += 1
+            self[key] = default
+            return default
+        return self[key]
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+
+class JsonCacheStore(CacheStore):
+    """The whole cache as one JSON document, plus a journal of entries added since."""
+
+    def __init__(self, path: str | Path, namespaces: Iterable[str] = DEFAULT_NAMESPACES, **kwargs: Any) -> None:
+        super().__init__(path, namespaces, **kwargs)
+        self.journal_path = self.path.with_suffix(self.path.suffix + ".journal")
+        self.meta_path = self.path.with_suffix(self.path.suffix + ".meta")
+        self._journal: list[tuple[str, str, Any]] = []
+        # {namespace: {key: [updated_at, accessed_at, hits]}}; entries from before
+        # the sidecar existed count as written when the cache file was.
+        self._meta: dict[str, dict[str, list]] = self._read_meta()
+        self._base_time = self.path.stat().st_mtime if self.path.exists() else time.time()
+        data = _read_json_cache(self.path)
+        self._data: dict[str, Any] = {"version": CACHE_VERSION}
+        # Encoded entries per namespace, until the namespace is first used.
+        self._raw: dict[str, dict[str, Any]] = {
+            name: entries for name, entries in data.items() if isinstance(entries, dict)
+        }
+        # Keep namespaces this process doesn't use, so they survive the rewrite.
+        self.namespaces += tuple(k for k in self._raw if k not in self.namespaces)
+        self._replay_journal()
+
+    def _read_meta(self) -> dict[str, dict[str, list]]:
+        try:
+            meta = _loads(self.meta_path.read_text(encoding="utf-8"))
+            return meta if isinstance(meta, dict) else {}
+        except Exception:
+            return {}
+
+    def _replay_journal(self) -> None:
+        """Fold in entries checkpointed by a run that never got to flush()."""
+        if not self.journal_path.exists():
+            return
+        with self.journal_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    name, key, value = _loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+                dict.__setitem__(self._namespace(name), key, codec_for(name)[1](value))
+
+    def _namespace(self, name: str) -> MutableMapping[str, Any]:
+        ns = self._data.get(name)
+        if ns is None:
+            with self._lock:
+                ns = self._data.get(name)
+                if ns is None:
+                    started = time.perf_counter()
+                    _, decode = codec_for(name)
+                    entries = self._raw.pop(name, {})
+                    ns = self._data[name] = _JournaledDict(self, name, {k: decode(v) for k, v in entries.items()})
+                    self.load_seconds[name] += time.perf_counter() - started
+                    if name not in self.namespaces:
+                        self.namespaces += (name,)
+        return ns
+
+    def _journal_write(self, name: str, key: str, value: Any) -> None:
+        with self._lock:
+            self.writes[name] += 1
+            self._journal.append((name, key, value))
+            meta = self._meta.setdefault(name, {})
+            old = meta.get(key)
+            meta[key] = [time.time(), old[1] if old else None, old[2] if old else 0]
+        self._note_write()
+
+    def _note_access(self, name: str, key: str) -> None:
+        self.reads[name] += 1
+        meta = self._meta.setdefault(name, {})
+        entry = meta.get(key)
+        if entry is None:
+            entry = meta[key] = [self._base_time, None, 0]
+        entry[1] = time.time()
+        entry[2] += 1
+
+    def checkpoint(self) -> None:
+        with self._lock:
+            if self._journal and not self.read_only:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.journal_path.open("a", encoding="utf-8") as f:
+                    for name, key, value in self._journal:
+                        f.write(_dumps([name, key, codec_for(name)[0](value)]) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._journal.clear()
+            self._checkpointed()
+
+    def flush(self) -> None:
+        if self.read_only:
+            return
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(_dumps(self._encoded()), encoding="utf-8")
+            os.replace(tmp, self.path)
+            self._journal.clear()
+            self.journal_path.unlink(missing_ok=True)
+            self._checkpointed()
+            meta = {
+                name: {k: v for k, v in entries.items() if k in self._data.get(name, self._raw.get(name, {}))}
+                for name, entries in self._meta.items()
+            }
+            tmp = self.meta_path.with_suffix(self.meta_path.suffix + ".tmp")
+            tmp.write_text(_dumps(meta), encoding="utf-8")
+            os.replace(tmp, self.meta_path)
+
+    def _encoded(self) -> dict[str, Any]:
+        doc: dict[str, Any] = dict(self._raw)
+        for name, entries in self._data.items():
+            encode, _ = codec_for(name)
+            doc[name] = {k: encode(v) for k, v in dict.items(entries)} if isinstance(entries, dict) else entries
+        return doc
+
+    def _loaded(self, name: str) -> dict[str, Any]:
+        """Namespace ``name`` if this cache has it (loading it), else an empty dict."""
+        return self._namespace(name) if name in self.namespaces else {}
+
+    def peek(self, name: str, key: str, default: Any = None) -> Any:
+        return dict.get(self._loaded(name), key, default)
+
+    def entry_stats(self, name: str) -> Iterator[EntryStat]:
+        meta = self._meta.get(name, {})
+        encode, _ = codec_for(name)
+        for key, value in dict.items(self._loaded(name)):
+            updated_at, accessed_at, hits = meta.get(key) or (self._base_time, None, 0)
+            size = len(key.encode("utf-8")) + len(_dumps(encode(value)).encode("utf-8"))
+            yield EntryStat(key, size, updated_at, accessed_at, hits)
+
+    def delete_many(self, name: str, keys: Iterable[str]) -> int:
+        # Deletions aren't journaled: they reach disk with the next flush().
+        with self._lock:
+            ns = self._loaded(name)
+            meta = self._meta.get(name, {})
+            deleted = 0
+            for key in keys:
+                if dict.pop(ns, key, _MISSING) is not _MISSING:
+                    deleted += 1
+                meta.pop(key, None)
+            return deleted
+
+    def _files(self) -> list[Path]:
+        return [self.path, self.journal_path, self.meta_path]
+
+
+# ---------------------------------------------------------------------------
+# SQLite backend
+# ---------------------------------------------------------------------------
+class _SqliteNamespace(MutableMapping):
+    """One SQLite table viewed as a dict; reads are memoized, writes buffered."""
+
+    def __init__(self, store: "SqliteCacheStore", name: str) -> None:
+        self._store = store
+        self.name = name
+        self._encode, self._decode = codec_for(name)
+        self._memo: dict[str, Any] = {}
+        self._pending: dict[str, Any] = {}
+        self._hits: dict[str, int] = {}
+
+    def _lookup(self, key: str) -> Any:
+        with self._store._lock:
+            if key in self._memo:
+                return self._memo[key]
+            row = self._store._conn.execute(
+                f'SELECT value FROM "{self.name}" WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(key)
+            value = self._decode(_loads(row[0]))
+            self._memo[key] = value
+            return value
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            value = self._lookup(key)
+        except KeyError:
+            self._store.misses[self.name] += 1
+            raise
+        self._hits[key] = self._hits.get(key, 0) + 1
+        self._store.reads[self.name] += 1
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        # A membership test isn't a use of the entry; don't count it as a hit.
+        try:
+            self._lookup(key)  # type: ignore[arg-type]
+        except KeyError:
+            return False
+        return True
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        with self._store._lock:
+            self._memo[key] = value
+            self._pending[key] = value
+            self._store.writes[self.name] += 1
+        self._store._note_write()
+
+    def __delitem__(self, key: str) -> None:
+        with self._store._lock:
+            self._lookup(key)  # raise KeyError for missing keys, like a dict
+            self._memo.pop(key, None)
+            self._pending.pop(key, None)
+            self._hits.pop(key, None)
+            self._store._conn.execute(f'DELETE FROM "{self.name}" WHERE key = ?', (key,))
+
+    def __iter__(self) -> Iterator[str]:
+        with self._store._lock:
+            self._store.checkpoint()
+            keys = [r[0] for r in self._store._conn.execute(f'SELECT key FROM "{self.name}"')]
+        return iter(keys)
+
+    def __len__(self) -> int:
+        with self._store._lock:
+            self._store.checkpoint()
+            return self._store._conn.execute(f'SELECT COUNT(*) FROM "{self.name}"').fetchone()[0]
+
+    def _take_pending(self) -> list[tuple[str, str | bytes, float]]:
+        now = time.time()
+        dumps = self._store._dumps
+        rows = [(k, dumps(self._encode(v)), now) for k, v in self._pending.items()]
+        self._pending.clear()
+        return rows
+
+    def _take_hits(self) -> list[tuple[float, int, str]]:
+        now = time.time()
+        rows = [(now, n, k) for k, n in self._hits.items()]
+        self._hits.clear()
+        return rows
+
+
+class SqliteCacheStore(CacheStore):
+    """Cache namespaces as SQLite tables (WAL mode) with batched upserts."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        namespaces: Iterable[str] = DEFAULT_NAMESPACES,
+        *,
+        codec: str = "auto",
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(path, namespaces, **kwargs)
+        self._tables: dict[str, _SqliteNamespace] = {}
+        if codec == "msgpack":
+            if msgpack is None:
+                raise ValueError("codec='msgpack' needs the msgpack package (pip install msgpack)")
+            self._dumps = lambda value: msgpack.packb(value, use_bin_type=True)
+        else:
+            self._dumps = _dumps
+
+        if self.read_only:
+            self._conn = sqlite3.connect(
+                f"{self.path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False, isolation_level=None
+            )
+            existing = {
+                r[0]
+                for r in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name != 'meta'")
+            }
+            self.namespaces += tuple(sorted(existing - set(self.namespaces)))
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode; checkpoint() opens its own transaction per batch.
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        existing = {
+            r[0]
+            for r in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name != 'meta'")
+        }
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is not None and row[0] != str(CACHE_VERSION):
+            # Same rule as the JSON backend: an old cache version starts empty.
+            for name in existing:
+                self._conn.execute(f'DROP TABLE "{name}"')
+            existing = set()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (str(CACHE_VERSION),)
+        )
+        self.namespaces += tuple(sorted(existing - set(self.namespaces)))
+
+    def _namespace(self, name: str) -> _SqliteNamespace:
+        table = self._tables.get(name)
+        if table is not None:
+            return table
+        if not _NAMESPACE_RE.fullmatch(name):
+            raise ValueError(f"Invalid cache namespace: {name!r}")
+        with self._lock:
+            table = self._tables.get(name)
+            if table is not None:
+                return table
+            started = time.perf_counter()
+            if self.read_only:
+                if name not in self.namespaces:
+                    raise KeyError(f"No {name!r} table in read-only cache {self.path}")
+            else:
+                self._conn.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{name}" '
+                    "(key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL, "
+                    "accessed_at REAL, hits INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID"
+                )
+                columns = {r[1] for r in self._conn.execute(f'PRAGMA table_info("{name}")')}
+                if "hits" not in columns:
+                    # Tables from before usage tracking: add the columns in place.
+                    self._conn.execute(f'ALTER TABLE "{name}" ADD COLUMN accessed_at REAL')
+                    self._conn.execute(f'ALTER TABLE "{name}" ADD COLUMN hits INTEGER NOT NULL DEFAULT 0')
+            table = self._tables[name] = _SqliteNamespace(self, name)
+            self.load_seconds[name] += time.perf_counter() - started
+            if name not in self.namespaces:
+                self.namespaces += (name,)
+        return table
+
+    def checkpoint(self) -> None:
+        with self._lock:
+            if self.read_only:
+                for table in self._tables.values():
+                    table._pending.clear()
+                    table._hits.clear()
+            elif self._pending_count or any(t._hits for t in self._tables.values()):
+                self._conn.execute("BEGIN")
+                try:
+                    for table in self._tables.values():
+                        rows = table._take_pending()
+                        if rows:
+                            self._conn.executemany(
+                                f'INSERT INTO "{table.name}" (key, value, updated_at) VALUES (?, ?, ?) '
+                                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                                rows,
+                            )
+                        hits = table._take_hits()
+                        if hits:
+                            self._conn.executemany(
+                                f'UPDATE "{table.name}" SET accessed_at = ?, hits = hits + ? WHERE key = ?', hits
+                            )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            self._checkpointed()
+
+    def flush(self) -> None:
+        self.checkpoint()
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+    def peek(self, name: str, key: str, default: Any = None) -> Any:
+        try:
+            return self._namespace(name)._lookup(key)
+        except KeyError:
+            return default
+
+    def entry_stats(self, name: str) -> Iterator[EntryStat]:
+        with self._lock:
+            self._namespace(name)
+            self.checkpoint()
+            rows = self._conn.execute(
+                f'SELECT key, length(CAST(key AS BLOB)) + length(CAST(value AS BLOB)), updated_at, accessed_at, hits '
+                f'FROM "{name}"'
+            ).fetchall()
+        return (EntryStat(*row) for row in rows)
+
+    def delete_many(self, name: str, keys: Iterable[str]) -> int:
+        table = self._namespace(name)
+        with self._lock:
+            self.checkpoint()
+            keys = list(keys)
+            before = self._conn.total_changes
+            self._conn.execute("BEGIN")
+            self._conn.executemany(f'DELETE FROM "{name}" WHERE key = ?', ((k,) for k in keys))
+            self._conn.execute("COMMIT")
+            for key in keys:
+                table._memo.pop(key, None)
+            return self._conn.total_changes - before
+
+    def compact(self) -> None:
+        with self._lock:
+            self.checkpoint()
+            self._conn.execute("VACUUM")
+            # In WAL mode VACUUM's output lands in the -wal file; fold it back in.
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def _files(self) -> list[Path]:
+        return [self.path, Path(f"{self.path}-wal"), Path(f"{self.path}-shm")]
+
+
+# ---------------------------------------------------------------------------
+# Opening + legacy import
+# ---------------------------------------------------------------------------
+def import_json_cache(json_path: str | Path, store: CacheStore) -> int:
+    """Copy every namespace of a legacy JSON cache into ``store``. Returns entries copied."""
+    data = _read_json_cache(Path(json_path))
+    copied = 0
+    for name, entries in data.items():
+        if not isinstance(entries, dict) or not _NAMESPACE_RE.fullmatch(name):
+            continue
+        ns = store[LEGACY_NAMESPACES.get(name, name)]
+        for key, value in entries.items():
+            ns[str(key)] = value
+            copied += 1
+    store.flush()
+    return copied
+
+
+def import_cache(path: str | Path, store: CacheStore) -> int:
+    """Copy every entry of another cache (either backend) into ``store``. Returns entries copied."""
+    src = Path(path)
+    if src.suffix.lower() not in SQLITE_SUFFIXES:
+        return import_json_cache(src, store)
+    copied = 0
+    with SqliteCacheStore(src, (), read_only=True) as source:
+        for name in source.namespaces:
+            ns = store[LEGACY_NAMESPACES.get(name, name)]
+            for key in source[name]:
+                ns[key] = source.peek(name, key)
+                copied += 1
+    store.flush()
+    return copied
+
+
+def resolve_cache_path(cache: Optional[str | Path], *, isolated: bool = False) -> str | Path:
+    """The store a script opens: ``cache`` (its --cache) if given, else SHARED_CACHE_PATH.
+
+    ``isolated`` runs (an HTTP record or replay) get a new, empty store in a
+    temporary directory instead, removed when the process exits, so they
+    neither depend on nor change the shared store.
+    """
+    if cache:
+        return cache
+    if not isolated:
+        return SHARED_CACHE_PATH
+    import atexit
+    import shutil
+    import tempfile
+
+    scratch = tempfile.mkdtemp(prefix="wrappd-cache-")
+    atexit.register(shutil.rmtree, scratch, ignore_errors=True)
+    return Path(scratch) / SHARED_CACHE_PATH.name
+
+
+def open_cache(
+    path: str | Path,
+    *,
+    namespaces: Iterable[str] = DEFAULT_NAMESPACES,
+    legacy_json: Optional[str | Path] = None,
+    import_from: Iterable[str | Path] = (),
+    checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+    checkpoint_seconds: float = DEFAULT_CHECKPOINT_SECONDS,
+    codec: str = "auto",
+    read_only: bool = False,
+) -> CacheStore:
+    """Open the cache at ``path``, choosing the backend from its suffix.
+
+    A SQLite cache that doesn't exist yet is seeded from ``legacy_json``
+    (default: the same path with a .json suffix) when that file exists, then
+    from each existing cache in ``import_from`` (relative paths are taken
+    from the new cache's directory).
+    ``codec`` picks how SQLite values are serialized (see CODECS); JSON
+    caches are always JSON. A ``read_only`` store must already exist, imports
+    nothing and writes nothing, not even on close.
+    """
+    started = time.perf_counter()
+    p = Path(path)
+    options = {"checkpoint_every": checkpoint_every, "checkpoint_seconds": checkpoint_seconds, "read_only": read_only}
+    if read_only and not p.exists():
+        raise FileNotFoundError(f"Cache not found: {p}")
+    if p.suffix.lower() not in SQLITE_SUFFIXES:
+        store: CacheStore = JsonCacheStore(p, namespaces, **options)
+        store.open_seconds = time.perf_counter() - started
+        return store
+
+    is_new = not p.exists() and not read_only
+    store = SqliteCacheStore(p, namespaces, codec=codec, **options)
+    legacy = Path(legacy_json) if legacy_json else p.with_suffix(".json")
+    if is_new and legacy.exists():
+        copied = import_json_cache(legacy, store)
+        print(f"Imported {copied} cache entries from {legacy}", file=sys.stderr, flush=True)
+    if is_new:
+        for source in import_from:
+            source = p.parent / source
+            if source.exists() and source.resolve() != p.resolve():
+                copied = import_cache(source, store)
+                print(f"Imported {copied} cache entries from {source}", file=sys.stderr, flush=True)
+    store.open_seconds = time.perf_counter() - started
+    return store
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Manage the persistent Letterboxd/TMDb caches")
+    sub = p.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import-json", help="Copy a legacy JSON cache into a SQLite cache")
+    imp.add_argument("src", help="Legacy JSON cache (e.g. .cache/letterboxd_tmdb_cache.json)")
+    imp.add_argument("dest", help="SQLite cache to create or update (e.g. .cache/letterboxd_tmdb_cache.sqlite)")
+    merge = sub.add_parser("import", help="Merge another cache (JSON or SQLite) into a SQLite cache")
+    merge.add_argument("src", help="Cache to copy from (e.g. .cache/critics_enrich_cache.json)")
+    merge.add_argument("dest", help="SQLite cache to create or update (e.g. .cache/film_store.sqlite)")
+    args = p.parse_args(argv)
+
+    if args.command == "import-json":
+        if not Path(args.src).exists():
+            print(f"Cache not found: {args.src}", file=sys.stderr)
+            return 2
+        if Path(args.dest).suffix.lower() not in SQLITE_SUFFIXES:
+            print(f"Destination must end in one of {', '.join(SQLITE_SUFFIXES)}", file=sys.stderr)
+            return 2
+        with SqliteCacheStore(args.dest, checkpoint_every=1000) as store:
+            copied = import_json_cache(args.src, store)
+        print(f"Imported {copied} entries -> {args.dest}")
+    elif args.command == "import":
+        if not Path(args.src).exists():
+            print(f"Cache not found: {args.src}", file=sys.stderr)
+            return 2
+        if Path(args.dest).suffix.lower() not in SQLITE_SUFFIXES:
+            print(f"Destination must end in one of {', '.join(SQLITE_SUFFIXES)}", file=sys.stderr)
+            return 2
+        with SqliteCacheStore(args.dest, checkpoint_every=1000) as store:
+            copied = import_cache(args.src, store)
+        print(f"Imported {copied} entries -> {args.dest}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
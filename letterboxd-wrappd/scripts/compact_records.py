@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Compact on-disk form of cached ``tmdb_movie_data`` records.
+
+The scripts build tmdb_data dicts like
+  {"title": ..., "genres": ["Drama", ...], "production_countries": {"codes": [...], "names": [...]},
+   "directors": [{"name": ..., "gender": 1}, ...], "directed_by_woman": true, ...}
+and that stays the in-memory shape. On disk a record is a positional list:
+
+  ["t1", <presence mask>, <value of each present stored field, in FIELDS order>..., {extras}?]
+
+- Field names are implied by position; the mask records which keys the
+  original dict had, so each script's shape comes back with the same keys
+  (in FIELDS order, which is the order scrape_tmdb_ids writes them in).
+- Genres, writer jobs, country codes and language codes (original and
+  spoken) are interned as indexes into the tables below. Country names are
+  dropped when they match the table. Strings not in a table are stored as-is.
+- is_american, is_english, directed_by_woman and written_by_woman are
+  recomputed from the codes, language and credits.
+- original_title is stored only when it differs from title.
+- Values that don't fit these rules go into a trailing extras dict.
+
+Decoding gives back exactly the dict that was encoded. The tables are part
+of the format: only ever append to them. Records already in the old dict
+form decode as themselves.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Tuple
+
+RECORD_TAG = "t1"
+
+GENRES = (
+    "Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary", "Drama", "Family",
+    "Fantasy", "History", "Horror", "Music", "Mystery", "Romance", "Science Fiction", "TV Movie",
+    "Thriller", "War", "Western",
+)
+
+WRITER_JOBS = ("Writer", "Screenplay", "Story", "Characters")
+
+# (ISO 3166-1 code, TMDb's English name)
+COUNTRIES = (
+    ("US", "United States of America"), ("GB", "United Kingdom"), ("FR", "France"), ("DE", "Germany"),
+    ("JP", "Japan"), ("IT", "Italy"), ("CA", "Canada"), ("ES", "Spain"), ("KR", "South Korea"),
+    ("IN", "India"), ("AU", "Australia"), ("SE", "Sweden"), ("DK", "Denmark"), ("HK", "Hong Kong"),
+    ("CN", "China"), ("MX", "Mexico"), ("BE", "Belgium"), ("NL", "Netherlands"), ("NO", "Norway"),
+    ("IE", "Ireland"), ("BR", "Brazil"), ("AR", "Argentina"), ("PL", "Poland"), ("SU", "Soviet Union"),
+    ("CH", "Switzerland"), ("AT", "Austria"), ("FI", "Finland"), ("TW", "Taiwan"), ("IR", "Iran"),
+    ("NZ", "New Zealand"), ("CZ", "Czech Republic"), ("RU", "Russia"), ("HU", "Hungary"), ("GR", "Greece"),
+    ("PT", "Portugal"), ("TR", "Turkey"), ("IL", "Israel"), ("RO", "Romania"), ("CL", "Chile"),
+    ("LU", "Luxembourg"), ("ZA", "South Africa"), ("TH", "Thailand"), ("CO", "Colombia"),
+    ("XC", "Czechoslovakia"), ("XG", "East Germany"), ("YU", "Yugoslavia"), ("IS", "Iceland"),
+    ("SN", "Senegal"), ("NG", "Nigeria"), ("EG", "Egypt"), ("PH", "Philippines"), ("QA", "Qatar"),
+)
+
+LANGUAGES = (
+    "en", "fr", "ja", "es", "de", "it", "ko", "zh", "cn", "hi", "ru", "sv", "da", "pt", "no", "fa",
+    "pl", "nl", "fi", "tr", "ar", "el", "hu", "cs", "he", "ro", "th", "ta", "te", "ml", "bn", "id",
+    "tl", "xx", "is", "wo", "yo", "uk", "sr", "ka",
+)
+
+PERSON_KEYS = ("id", "name", "job", "gender", "profile_path")
+
+# Every key of the tmdb_data shapes, in output order. STORED fields get a slot
+# in the record; the derived ones are only tracked in the mask.
+FIELDS = (
+    "title", "original_title", "original_language", "release_date", "overview", "runtime",
+    "genres", "popularity", "vote_average", "vote_count", "poster_path", "backdrop_path",
+    "production_countries", "is_american", "spoken_languages", "is_english",
+    "directors", "writers", "directed_by_woman", "written_by_woman", "credits_error",
+)
+DERIVED = {"is_american", "is_english", "directed_by_woman", "written_by_woman"}
+STORED = tuple(f for f in FIELDS if f not in DERIVED)
+
+_GENRE_INDEX = {g: i for i, g in enumerate(GENRES)}
+_JOB_INDEX = {j: i for i, j in enumerate(WRITER_JOBS)}
+_COUNTRY_INDEX = {c: i for i, (c, _) in enumerate(COUNTRIES)}
+_LANGUAGE_INDEX = {l: i for i, l in enumerate(LANGUAGES)}
+
+
+def _intern(value: Any, index: Dict[str, int]) -> Any:
+    return index.get(value, value) if isinstance(value, str) else value
+
+
+def _encode_persons(people: Any) -> Any:
+    """[mask, [values...], ...] when every person has the same known keys, else the list as-is."""
+    if not isinstance(people, list) or not all(isinstance(p, dict) for p in people):
+        return people
+    keys = {tuple(p) for p in people}
+    if len(keys) > 1:
+        return people
+    present = next(iter(keys), ())
+    if any(k not in PERSON_KEYS for k in present):
+        return people
+    mask = sum(1 << i for i, k in enumerate(PERSON_KEYS) if k in present)
+    rows: List[Any] = [mask]
+    for p in people:
+        rows.append([_intern(p[k], _JOB_INDEX) if k == "job" else p[k] for k in PERSON_KEYS if k in present])
+    return rows
+
+
+def _decode_persons(value: Any) -> Any:
+    if not (isinstance(value, list) and value and isinstance(value[0], int)):
+        return value
+    keys = [k for i, k in enumerate(PERSON_KEYS) if value[0] & (1 << i)]
+    people = []
+    for row in value[1:]:
+        person = dict(zip(keys, row))
+        if isinstance(person.get("job"), int):
+            person["job"] = WRITER_JOBS[person["job"]]
+        people.append(person)
+    return people
+
+
+def _encode_countries(value: Any) -> Any:
+    """[codes] or [codes, names] with codes interned; names left out when they match the table."""
+    if not isinstance(value, dict) or set(value) - {"codes", "names"} or not isinstance(value.get("codes"), list):
+        return value
+    codes = value["codes"]
+    encoded: List[Any] = [[_intern(c, _COUNTRY_INDEX) for c in codes]]
+    if "names" in value:
+        table_names = [COUNTRIES[_COUNTRY_INDEX[c]][1] if c in _COUNTRY_INDEX else None for c in codes]
+        encoded.append(None if value["names"] == table_names else value["names"])
+    return encoded
+
+
+def _decode_countries(value: Any) -> Any:
+    if not isinstance(value, list):
+        return value
+    codes = [COUNTRIES[c][0] if isinstance(c, int) else c for c in value[0]]
+    decoded: Dict[str, Any] = {"codes": codes}
+    if len(value) > 1:
+        decoded["names"] = [COUNTRIES[_COUNTRY_INDEX[c]][1] for c in codes] if value[1] is None else value[1]
+    return decoded
+
+
+def _encode_languages(value: Any) -> Any:
+    """[codes] or [codes, names] with codes interned (names are TMDb's, in each language)."""
+    if not isinstance(value, dict) or set(value) - {"codes", "names"} or not isinstance(value.get("codes"), list):
+        return value
+    encoded: List[Any] = [[_intern(c, _LANGUAGE_INDEX) for c in value["codes"]]]
+    if "names" in value:
+        encoded.append(value["names"])
+    return encoded
+
+
+def _decode_languages(value: Any) -> Any:
+    if not isinstance(value, list):
+        return value
+    decoded: Dict[str, Any] = {"codes": [LANGUAGES[c] if isinstance(c, int) else c for c in value[0]]}
+    if len(value) > 1:
+        decoded["names"] = value[1]
+    return decoded
+
+
+def _derive(data: dict, field: str) -> Any:
+    if field == "is_american":
+        return "US" in (data.get("production_countries") or {}).get("codes", [])
+    if field == "is_english":
+        return data.get("original_language") == "en"
+    if field == "directed_by_woman":
+        return any(p.get("gender") == 1 for p in data.get("directors") or [])
+    return any(p.get("gender") == 1 for p in data.get("writers") or [])
+
+
+def encode_tmdb_data(data: Any) -> Any:
+    """Compact a tmdb_data dict for storage. Non-dicts are returned unchanged."""
+    if not isinstance(data, dict):
+        return data
+    mask = 0
+    values: List[Any] = []
+    extras: Dict[str, Any] = {}
+    for i, field in enumerate(FIELDS):
+        if field not in data:
+            continue
+        mask |= 1 << i
+        value = data[field]
+        if field in DERIVED:
+            if value != _derive(data, field):
+                extras[field] = value
+        elif field == "original_title":
+            values.append(None if value == data.get("title") else value)
+        elif field == "original_language":
+            values.append(_intern(value, _LANGUAGE_INDEX))
+        elif field == "genres":
+            values.append([_intern(g, _GENRE_INDEX) for g in value] if isinstance(value, list) else value)
+        elif field == "production_countries":
+            values.append(_encode_countries(value))
+        elif field == "spoken_languages":
+            values.append(_encode_languages(value))
+        elif field in ("directors", "writers"):
+            values.append(_encode_persons(value))
+        else:
+            values.append(value)
+    extras.update({k: v for k, v in data.items() if k not in FIELDS})
+    record: List[Any] = [RECORD_TAG, mask, *values]
+    if extras:
+        record.append(extras)
+    return record
+
+
+def decode_tmdb_data(record: Any) -> Any:
+    """Rebuild the tmdb_data dict from encode_tmdb_data() output (or pass an old dict through)."""
+    if not (isinstance(record, list) and record and record[0] == RECORD_TAG):
+        return record
+    mask = record[1]
+    present = [f for i, f in enumerate(FIELDS) if mask & (1 << i)]
+    stored = [f for f in present if f in STORED]
+    values = record[2:2 + len(stored)]
+    extras: Dict[str, Any] = record[2 + len(stored)] if len(record) > 2 + len(stored) else {}
+    raw = dict(zip(stored, values))
+
+    data: Dict[str, Any] = {}
+    for field in present:
+        if field in DERIVED:
+            data[field] = None  # placeholder keeps key order; filled below
+            continue
+        value = raw[field]
+        if field == "original_title":
+            value = raw.get("title") if value is None else value
+        elif field == "original_language":
+            value = LANGUAGES[value] if isinstance(value, int) else value
+        elif field == "genres":
+            value = [GENRES[g] if isinstance(g, int) else g for g in value] if isinstance(value, list) else value
+        elif field == "production_countries":
+            value = _decode_countries(value)
+        elif field == "spoken_languages":
+            value = _decode_languages(value)
+        elif field in ("directors", "writers"):
+            value = _decode_persons(value)
+        data[field] = value
+    for field in present:
+        if field in DERIVED:
+            data[field] = extras[field] if field in extras else _derive(data, field)
+    data.update({k: v for k, v in extras.items() if k not in DERIVED})
+    return data
+
+
+# Namespaces whose values are stored in compact form, as (encode, decode).
+NAMESPACE_CODECS = {
+    "tmdb_movie_data": (encode_tmdb_data, decode_tmdb_data),
+}
+
+
+def identity(value: Any) -> Any:
+    return value
+
+
+def codec_for(namespace: str) -> Tuple[Callable[[Any], Any], Callable[[Any], Any]]:
+    return NAMESPACE_CODECS.get(namespace, (identity, identity))
+
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""Compact binary index of the curated lists (public/curated-lists.idx).
+
+build_curated_lists.py writes it next to curated-lists.json (it isn't
+committed: it's rebuilt locally, see below). The JSON has a
+dict per film; this holds only what a membership lookup needs, and loads
+without parsing anything per film:
+
+  index = CuratedIndex.load(PUBLIC_DIR / "curated-lists.idx")
+  index.lists_of("parasite-2019")        # {"lb-top-250": 3, "criterion": None, ...}
+  index.position("parasite-2019", "imdb-top-250")
+  index.films_in("afi-100")              # slugs, in rank order for a ranked list
+  "https://letterboxd.com/film/parasite-2019/" in index
+
+Films are keyed by Letterboxd film slug. The curated exports list films by
+boxd.it shortlink, so the build needs them resolved: from the shared cache,
+or over the network with ``build_curated_lists.py --resolve-shortlinks``.
+A shortlink left unresolved is keyed "boxd.it/<code>" (the build warns how
+many): it is found by its shortlink, not by slug. Lookups take a slug or
+either kind of URL.
+
+Layout (little-endian):
+
+  header     "WRCL", version u16, list count u16, film count u32, hash slot count u32
+  lists      per list: key (u8 length + UTF-8), name (u16 length + UTF-8), ranked u8, count u32
+  slugs      u32 offsets[films + 1], then the UTF-8 slugs back to back (interned once each)
+  hash       u32 slots: film number + 1 (0 = empty), open addressing on FNV-1a of the slug
+  masks      u32 per film: bit i set if the film is on list i
+  positions  per ranked list, in list order: "H" or "I" (u8), then one position per film
+             (0 = not on the list)
+
+Loading copies these flat arrays out of the file without parsing anything
+per film. A lookup probes the hash table and indexes the arrays, so it costs
+the same however many films the lists hold. At most 32 lists fit the mask.
+"""
+
+from __future__ import annotations
+
+import re
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MAGIC = b"WRCL"
+VERSION = 1
+MAX_LISTS = 32
+
+_HEADER = struct.Struct("<4sHHII")
+_FILM_URL_RE = re.compile(r"https?://letterboxd\.com/(?:[^/]+/)?film/([^/?#]+)", re.I)
+_SHORTLINK_RE = re.compile(r"https?://boxd\.it/([^/?#]+)", re.I)
+
+
+def film_key(value: str) -> str:
+    """The index key for a slug, a Letterboxd film URL or a boxd.it shortlink."""
+    value = (value or "").strip()
+    match = _FILM_URL_RE.match(value)
+    if match:
+        return match.group(1).lower()
+    match = _SHORTLINK_RE.match(value if "://" in value else f"https://{value}")
+    if match:
+        return f"boxd.it/{match.group(1)}"
+    return value.strip("/").lower()
+
+
+def _fnv1a(data: bytes) -> int:
+    h = 0x811C9DC5
+    for byte in data:
+        h = ((h ^ byte) * 0x01000193) & 0xFFFFFFFF
+    return h
+
+
+def _le(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _read_array(typecode: str, data: memoryview, offset: int, count: int) -> Tuple[array, int]:
+    values = array(typecode)
+    end = offset + count * values.itemsize
+    values.frombytes(data[offset:end])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values, end
+
+
+def write_curated_index(
+    path: Path | str,
+    lists: Dict[str, dict],
+    films: Iterable[Tuple[str, Dict[str, int]]],
+) -> int:
+    """Write the index for ``lists`` (key -> {name, count, ranked}, as in the JSON
+    manifest) and ``films`` ((key, {list key: position}) pairs). Returns its size.
+
+    Films with the same key are merged (the first position on a list wins).
+    """
+    keys = list(lists)
+    if len(keys) > MAX_LISTS:
+        raise ValueError(f"At most {MAX_LISTS} lists fit the index, got {len(keys)}")
+    bit = {key: i for i, key in enumerate(keys)}
+
+    numbers: Dict[str, int] = {}
+    slugs: List[str] = []
+    masks = array("I")
+    positions = {key: array("I") for key in keys if lists[key].get("ranked")}
+    for slug, memberships in films:
+        n = numbers.get(slug)
+        if n is None:
+            n = numbers[slug] = len(slugs)
+            slugs.append(slug)
+            masks.append(0)
+            for ranks in positions.values():
+                ranks.append(0)
+        for key, position in memberships.items():
+            masks[n] |= 1 << bit[key]
+            if key in positions and not positions[key][n]:
+                positions[key][n] = int(position or 0)
+
+    encoded = [slug.encode("utf-8") for slug in slugs]
+    offsets = array("I", [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+
+    slot_count = 1
+    while slot_count < max(2 * len(slugs), 1):
+        slot_count *= 2
+    slots = array("I", bytes(4 * slot_count))
+    for n, data in enumerate(encoded):
+        i = _fnv1a(data) & (slot_count - 1)
+        while slots[i]:
+            i = (i + 1) & (slot_count - 1)
+        slots[i] = n + 1
+
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, len(keys), len(slugs), slot_count))
+    for key in keys:
+        key_bytes = key.encode("utf-8")
+        name_bytes = str(lists[key].get("name") or key).encode("utf-8")
+        out += struct.pack("<B", len(key_bytes)) + key_bytes
+        out += struct.pack("<H", len(name_bytes)) + name_bytes
+        out += struct.pack("<BI", 1 if lists[key].get("ranked") else 0, int(lists[key].get("count") or 0))
+    out += _le(offsets) + b"".join(encoded)
+    out += _le(slots)
+    out += _le(masks)
+    for ranks in positions.values():
+        typecode = "H" if max(ranks, default=0) <= 0xFFFF else "I"
+        out += typecode.encode("ascii") + _le(array(typecode, ranks))
+
+    Path(path).write_bytes(bytes(out))
+    return len(out)
+
+
+class CuratedIndex:
+    """Read-only view of a curated-lists.idx file."""
+
+    def __init__(self, data: bytes) -> None:
+        view = memoryview(data)
+        magic, version, list_count, film_count, slot_count = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a curated list index (version {VERSION})")
+        offset = _HEADER.size
+
+        self.lists: Dict[str, dict] = {}
+        for _ in range(list_count):
+            (key_len,) = struct.unpack_from("<B", view, offset)
+            key = bytes(view[offset + 1 : offset + 1 + key_len]).decode("utf-8")
+            offset += 1 + key_len
+            (name_len,) = struct.unpack_from("<H", view, offset)
+            name = bytes(view[offset + 2 : offset + 2 + name_len]).decode("utf-8")
+            offset += 2 + name_len
+            ranked, count = struct.unpack_from("<BI", view, offset)
+            offset += 5
+            self.lists[key] = {"name": name, "count": count, "ranked": bool(ranked)}
+        self._bits = {key: i for i, key in enumerate(self.lists)}
+
+        self._offsets, offset = _read_array("I", view, offset, film_count + 1)
+        self._blob = bytes(view[offset : offset + self._offsets[-1]])
+        offset += self._offsets[-1]
+        self._slots, offset = _read_array("I", view, offset, slot_count)
+        self._masks, offset = _read_array("I", view, offset, film_count)
+        self._positions: Dict[str, array] = {}
+        for key, meta in self.lists.items():
+            if meta["ranked"]:
+                typecode = chr(view[offset])
+                self._positions[key], offset = _read_array(typecode, view, offset + 1, film_count)
+
+    @classmethod
+    def load(cls, path: Path | str) -> "CuratedIndex":
+        return cls(Path(path).read_bytes())
+
+    def __len__(self) -> int:
+        return len(self._masks)
+
+    def __contains__(self, value: str) -> bool:
+        return self._find(value) is not None
+
+    def slug(self, n: int) -> str:
+        return self._blob[self._offsets[n] : self._offsets[n + 1]].decode("utf-8")
+
+    def _find(self, value: str) -> Optional[int]:
+        data = film_key(value).encode("utf-8")
+        mask = len(self._slots) - 1
+        i = _fnv1a(data) & mask
+        while True:
+            slot = self._slots[i]
+            if not slot:
+                return None
+            n = slot - 1
+            if self._blob[self._offsets[n] : self._offsets[n + 1]] == data:
+                return n
+            i = (i + 1) & mask
+
+    def lists_of(self, value: str) -> Dict[str, Optional[int]]:
+        """{list key: position} for a film (None on an unranked list); {} if it's on none."""
+        n = self._find(value)
+        if n is None:
+            return {}
+        bits = self._masks[n]
+        return {
+            key: self._positions[key][n] if key in self._positions else None
+            for key, i in self._bits.items()
+            if bits >> i & 1
+        }
+
+    def position(self, value: str, list_key: str) -> Optional[int]:
+        """The film's position on a ranked list, or None."""
+        n = self._find(value)
+        ranks = self._positions.get(list_key)
+        if n is None or ranks is None:
+            return None
+        return ranks[n] or None
+
+    def films_in(self, list_key: str) -> List[str]:
+        """Slugs of a list's films: by position for a ranked list (films without one last), else in index order."""
+        if list_key not in self._bits:
+            raise KeyError(list_key)
+        bit = 1 << self._bits[list_key]
+        members = [n for n, bits in enumerate(self._masks) if bits & bit]
+        ranks = self._positions.get(list_key)
+        if ranks is not None:
+            members.sort(key=lambda n: (ranks[n] == 0, ranks[n]))
+        return [self.slug(n) for n in members]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    default = Path(__file__).resolve().parent.parent / "public" / "curated-lists.idx"
+    p = argparse.ArgumentParser(description="Look films up in the curated list index")
+    p.add_argument("films", nargs="*", help="Slugs or Letterboxd/boxd.it URLs (none: list the lists)")
+    p.add_argument("--index", default=str(default), help="Index file (default: public/curated-lists.idx)")
+    args = p.parse_args(argv)
+
+    index = CuratedIndex.load(args.index)
+    if not args.films:
+        for key, meta in index.lists.items():
+            print(f"{key:<16} {meta['count']:>5}  {meta['name']}{'' if meta['ranked'] else '  (unranked)'}")
+        print(f"{len(index)} films")
+    for film in args.films:
+        print(f"{film}: {index.lists_of(film) or 'on no curated list'}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
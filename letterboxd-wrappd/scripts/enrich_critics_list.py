@@ -10,7 +10,8 @@ Usage:
     --csv /path/to/critics-list.csv \
     --out public/critics-enriched.json
 
-Requires TMDB_API_KEY env var or --tmdb-api-key flag.
+Requires TMDB_API_KEY env var or --tmdb-api-key flag. Add --profile - for a
+report of where the run's time went (see run_profile.py).
 """
 
 from __future__ import annotations
@@ -21,96 +22,71 @@ import json
 import os
 import re
 import sys
-import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from io import StringIO
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set
-
-import requests
-
-SESSION = requests.Session()
+from typing import Callable, Dict, List, Optional, Set
+
+from cache_store import (
+    DEFAULT_CHECKPOINT_EVERY,
+    DEFAULT_CHECKPOINT_SECONDS,
+    DEFAULT_NAMESPACES,
+    LEGACY_CACHE_FILES,
+    CacheStore,
+    open_cache,
+    resolve_cache_path,
+)
+from http_transport import shared_transport, with_retries
+from letterboxd_client import is_film_url, resolve_shortlink, resolve_shortlinks, scan_tmdb_id
+from negative_cache import NegativeCache
+from ndjson_output import OUTPUT_FORMATS, NdjsonWriter
+from run_profile import RunProfiler
+from tmdb_client import build_tmdb_data, fetch_movie, is_complete_tmdb_data
+
+HTTP = shared_transport()
+PROFILE = RunProfiler()
 
 # ---------------------------------------------------------------------------
-# Persistent cache (reuses format from scrape_tmdb_ids.py)
+# Persistent cache
 # ---------------------------------------------------------------------------
-CACHE_VERSION = 1
-
-
-def load_cache(path: str) -> dict[str, Any]:
-    p = Path(path)
-    try:
-        if not p.exists():
-            return _empty_cache()
-        data = json.loads(p.read_text(encoding="utf-8"))
-        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
-            return _empty_cache()
-        for key in ("shortlink_to_film", "film_to_tmdb", "tmdb_movie_data"):
-            data.setdefault(key, {})
-        return data
-    except Exception:
-        return _empty_cache()
-
-
-def _empty_cache() -> dict[str, Any]:
-    return {
-        "version": CACHE_VERSION,
-        "shortlink_to_film": {},
-        "film_to_tmdb": {},
-        "tmdb_movie_data": {},
-    }
-
-
-def save_cache(path: str, cache: dict[str, Any]) -> None:
-    p = Path(path)
-    p.parent.mkdir(parents=True, exist_ok=True)
-    tmp = p.with_suffix(p.suffix + ".tmp")
-    tmp.write_text(json.dumps(cache, ensure_ascii=False, indent=2), encoding="utf-8")
-    os.replace(tmp, p)
+# One schema for every script (see cache_store.py)
+CACHE_NAMESPACES = DEFAULT_NAMESPACES
 
 
 # ---------------------------------------------------------------------------
 # URL helpers
 # ---------------------------------------------------------------------------
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-    "Accept-Language": "en-US,en;q=0.5",
-}
-
-TMDB_MOVIE_RE = re.compile(r"https?://(?:www\.)?themoviedb\.org/movie/(\d+)")
-
 
-def expand_shortlink(url: str, cache: dict[str, Any]) -> str:
+def expand_shortlink(url: str, cache: CacheStore) -> str:
     cached = cache.get("shortlink_to_film", {}).get(url)
-    if isinstance(cached, str) and cached:
+    if isinstance(cached, str) and is_film_url(cached):
         return cached
     try:
-        resp = SESSION.head(url, headers=HEADERS, timeout=15, allow_redirects=True)
-        final = resp.url
-        if final:
+        final = HTTP.run(with_retries(lambda: resolve_shortlink(HTTP.transport, url, timeout=15)))
+        if is_film_url(final):
             cache.setdefault("shortlink_to_film", {})[url] = final
-            return final
-    except Exception:
-        pass
-    try:
-        resp = SESSION.get(url, headers=HEADERS, timeout=15, allow_redirects=True)
-        final = resp.url
         if final:
-            cache.setdefault("shortlink_to_film", {})[url] = final
             return final
     except Exception:
         pass
     return url
 
 
+def prefetch_shortlinks(urls: List[str], cache: CacheStore) -> None:
+    """Resolve all uncached boxd.it shortlinks concurrently into the cache."""
+    short_map = cache.setdefault("shortlink_to_film", {})
+    pending = [u for u in urls if "boxd.it" in u and not is_film_url(short_map.get(u) or "")]
+    if pending:
+        resolved = HTTP.run(resolve_shortlinks(HTTP.transport, pending, timeout=15))
+        short_map.update((url, final) for url, final in resolved.items() if is_film_url(final))
+
+
 def extract_slug(url: str) -> Optional[str]:
     m = re.search(r"/film/([^/]+)", url)
     return m.group(1) if m else None
 
 
-def canonicalize(url: str, cache: dict[str, Any]) -> Optional[str]:
+def canonicalize(url: str, cache: CacheStore) -> Optional[str]:
     """Return canonical /film/<slug>/ URL, resolving shortlinks as needed."""
     url = url.strip()
     if not url:
@@ -159,68 +135,67 @@ def read_list_csv(csv_path: str) -> List[dict]:
 # ---------------------------------------------------------------------------
 # TMDb fetching
 # ---------------------------------------------------------------------------
-def scrape_tmdb_id(film_url: str, cache: dict[str, Any]) -> Optional[int]:
-    """Scrape TMDb ID from a Letterboxd film page (with cache)."""
+def scrape_tmdb_id(film_url: str, cache: CacheStore, failures: NegativeCache) -> Optional[int]:
+    """Scrape TMDb ID from a Letterboxd film page (with cache, including cached failures)."""
     cached = cache.get("film_to_tmdb", {}).get(film_url)
     if isinstance(cached, int):
         return cached
+    if failures.get("scrape", film_url) is not None:
+        return None
     try:
-        resp = SESSION.get(film_url, headers=HEADERS, timeout=15)
-        resp.raise_for_status()
-        m = TMDB_MOVIE_RE.search(resp.text)
-        if m:
-            tmdb_id = int(m.group(1))
-            cache.setdefault("film_to_tmdb", {})[film_url] = tmdb_id
-            return tmdb_id
+        tmdb_id = HTTP.run(with_retries(lambda: scan_tmdb_id(HTTP.transport, film_url, timeout=15)))
+        cache.setdefault("film_to_tmdb", {})[film_url] = tmdb_id
+        return tmdb_id
     except Exception as e:
+        failures.record("scrape", film_url, e)
         print(f"  TMDb scrape error for {film_url}: {e}", file=sys.stderr)
     return None
 
 
-def fetch_tmdb_details(tmdb_id: int, api_key: str) -> Optional[dict]:
+def fetch_tmdb_movie(tmdb_id: int, api_key: str, failures: NegativeCache) -> tuple[Optional[dict], Optional[dict]]:
+    """Fetch details + credits in one round trip. Returns (details, credits), None on failure."""
+    if failures.get("tmdb", tmdb_id) is not None:
+        return None, None
     try:
-        resp = SESSION.get(
-            f"https://api.themoviedb.org/3/movie/{tmdb_id}",
-            params={"api_key": api_key, "language": "en-US"},
-            headers={"Accept": "application/json"},
-            timeout=15,
+        details, credits, credits_error = HTTP.run(
+            with_retries(lambda: fetch_movie(HTTP.transport, tmdb_id, api_key=api_key, timeout=15))
         )
-        resp.raise_for_status()
-        return resp.json()
     except Exception as e:
+        failures.record("tmdb", tmdb_id, e)
         print(f"  TMDb details error for {tmdb_id}: {e}", file=sys.stderr)
-        return None
-
-
-def fetch_tmdb_credits(tmdb_id: int, api_key: str) -> Optional[dict]:
-    try:
-        resp = SESSION.get(
-            f"https://api.themoviedb.org/3/movie/{tmdb_id}/credits",
-            params={"api_key": api_key, "language": "en-US"},
-            headers={"Accept": "application/json"},
-            timeout=15,
-        )
-        resp.raise_for_status()
-        return resp.json()
-    except Exception as e:
-        print(f"  TMDb credits error for {tmdb_id}: {e}", file=sys.stderr)
-        return None
+        return None, None
+    if credits_error:
+        print(f"  TMDb credits error for {tmdb_id}: {credits_error}", file=sys.stderr)
+    return details, credits
 
 
 # ---------------------------------------------------------------------------
 # Main enrichment pipeline
 # ---------------------------------------------------------------------------
-def enrich(rows: List[dict], *, api_key: str, cache: dict[str, Any],
+def enrich(rows: List[dict], *, api_key: str, cache: CacheStore,
            criterion_slugs: Set[str], black_director_slugs: Set[str],
-           sleep_s: float = 0.25) -> List[dict]:
-    """Enrich list rows with TMDb data. Returns flat JSON-ready dicts."""
+           sleep_s: float = 0.25,
+           on_film: Optional[Callable[[dict], None]] = None,
+           retry_failures: bool = False) -> List[dict]:
+    """Enrich list rows with TMDb data. Returns flat JSON-ready dicts.
+
+    on_film(film) is called with each record as soon as it is built, and the
+    record is then not kept (the result is empty), so a streamed run holds
+    one film at a time. Films whose scrape or TMDb lookup failed recently are skipped until the cached
+    failure expires, unless retry_failures is set.
+    """
     total = len(rows)
     results: List[dict] = []
+    enriched = 0
     tmdb_cache = cache.get("tmdb_movie_data", {})
+    failures = NegativeCache(cache, enabled=not retry_failures)
+    with PROFILE.phase("resolve"):
+        prefetch_shortlinks([row["url"] for row in rows], cache)
 
     for i, row in enumerate(rows, start=1):
         url = row["url"]
-        canonical = canonicalize(url, cache)
+        with PROFILE.phase("resolve"):
+            canonical = canonicalize(url, cache)
         if not canonical:
             print(f"  [{i}/{total}] Could not resolve: {url}", file=sys.stderr)
             continue
@@ -231,7 +206,8 @@ def enrich(rows: List[dict], *, api_key: str, cache: dict[str, Any],
         position = row["position"]
 
         # --- TMDb ID ---
-        tmdb_id = scrape_tmdb_id(canonical, cache)
+        with PROFILE.phase("letterboxd_scrape"):
+            tmdb_id = scrape_tmdb_id(canonical, cache, failures)
         if not tmdb_id:
             print(f"  [{i}/{total}] No TMDb ID: {name} ({year})", file=sys.stderr)
             continue
@@ -241,48 +217,17 @@ def enrich(rows: List[dict], *, api_key: str, cache: dict[str, Any],
         cached_data = tmdb_cache.get(cache_key)
         network_used = False
 
-        if cached_data and "directed_by_woman" in cached_data:
+        if is_complete_tmdb_data(cached_data):
             tmdb_data = cached_data
         else:
-            details = fetch_tmdb_details(tmdb_id, api_key)
-            credits = fetch_tmdb_credits(tmdb_id, api_key)
+            with PROFILE.phase("tmdb_api"):
+                details, credits = fetch_tmdb_movie(tmdb_id, api_key, failures)
             network_used = True
             if not details:
                 print(f"  [{i}/{total}] TMDb details failed: {name}", file=sys.stderr)
                 continue
 
-            # Production countries
-            country_codes = [c.get("iso_3166_1") for c in details.get("production_countries", []) if c.get("iso_3166_1")]
-            original_language = details.get("original_language", "")
-
-            # Directors + writers from credits
-            crew = (credits or {}).get("crew", [])
-            directors = [
-                {"name": p.get("name"), "gender": p.get("gender")}
-                for p in crew if p.get("job") == "Director"
-            ]
-            writer_jobs = ["Writer", "Screenplay", "Story", "Characters"]
-            writers = [
-                {"name": p.get("name"), "gender": p.get("gender")}
-                for p in crew if p.get("job") in writer_jobs
-            ]
-
-            tmdb_data = {
-                "title": details.get("title"),
-                "vote_average": details.get("vote_average"),
-                "vote_count": details.get("vote_count"),
-                "popularity": details.get("popularity"),
-                "runtime": details.get("runtime"),
-                "genres": [g.get("name") for g in details.get("genres", [])],
-                "directors": directors,
-                "writers": writers,
-                "production_countries": {"codes": country_codes},
-                "original_language": original_language,
-                "is_american": "US" in country_codes,
-                "is_english": original_language == "en",
-                "directed_by_woman": any(d.get("gender") == 1 for d in directors),
-                "written_by_woman": any(w.get("gender") == 1 for w in writers),
-            }
+            tmdb_data = build_tmdb_data(details, credits)
             tmdb_cache[cache_key] = tmdb_data
 
         # Build output record
@@ -310,14 +255,21 @@ def enrich(rows: List[dict], *, api_key: str, cache: dict[str, Any],
             "is_black_director": slug in black_director_slugs,
             "position": position,
         }
-        results.append(film)
+        enriched += 1
+        if on_film is not None:
+            on_film(film)
+        else:
+            results.append(film)
 
         if i % 25 == 0 or i == total:
-            print(f"  [{i}/{total}] Enriched {len(results)} films so far", file=sys.stderr, flush=True)
+            print(f"  [{i}/{total}] Enriched {enriched} films so far", file=sys.stderr, flush=True)
 
-        if network_used and sleep_s > 0:
-            time.sleep(sleep_s)
+        if network_used:
+            PROFILE.sleep(sleep_s)
 
+    if failures.skipped:
+        print(f"Skipped {failures.skipped} lookups that failed recently (--retry-failures to try them again)",
+              file=sys.stderr)
     return results
 
 
@@ -328,11 +280,31 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Enrich a Letterboxd critics list with TMDb data")
     p.add_argument("--csv", required=True, help="Path to Letterboxd list export CSV")
     p.add_argument("--out", required=True, help="Output JSON path (e.g. public/critics-enriched.json)")
+    p.add_argument("--format", choices=OUTPUT_FORMATS, default="json",
+                    help="json: one array at the end (default). ndjson: one film per line as each finishes")
     p.add_argument("--tmdb-api-key", help="TMDb API key (or set TMDB_API_KEY env var)")
-    p.add_argument("--cache", default=str(Path(".cache") / "critics_enrich_cache.json"),
-                    help="Path to cache file")
+    p.add_argument("--cache",
+                    help="Film metadata store shared with the other scripts (.sqlite, or .json for the JSON backend). "
+                    "Default: .cache/film_store.sqlite, or a throwaway store with --record-http/--replay-http")
+    p.add_argument("--checkpoint-every", type=int, default=DEFAULT_CHECKPOINT_EVERY,
+                    help="Persist new cache entries after this many writes")
+    p.add_argument("--checkpoint-seconds", type=float, default=DEFAULT_CHECKPOINT_SECONDS,
+                    help="Persist new cache entries at least this often (seconds)")
     p.add_argument("--sleep", type=float, default=0.25,
                     help="Delay between TMDb API requests (seconds)")
+    p.add_argument("--retry-failures", action="store_true",
+                    help="Ignore cached failures (no TMDb link, TMDb 404, ...) and try those films again")
+    p.add_argument("--profile", metavar="PATH",
+                    help="Write a profiling report here when the run ends ('-' for stderr)")
+    p.add_argument("--profile-cprofile", metavar="PATH",
+                    help="Also run cProfile and dump its stats here")
+    archive = p.add_mutually_exclusive_group()
+    archive.add_argument("--record-http", metavar="DIR",
+                         help="Save every HTTP request and response of this run to an archive directory")
+    archive.add_argument("--replay-http", metavar="DIR",
+                         help="Answer HTTP requests from an archive made with --record-http instead of the network")
+    p.add_argument("--replay-timing", type=float, default=0.0, metavar="FACTOR",
+                    help="With --replay-http, wait the recorded response time times FACTOR (default 0: no waiting)")
     return p.parse_args(argv)
 
 
@@ -342,9 +314,29 @@ def main(argv: Optional[List[str]] = None) -> int:
     if not api_key:
         print("Error: TMDB_API_KEY not set. Use --tmdb-api-key or set env var.", file=sys.stderr)
         return 1
-
-    # Load cache
-    cache = load_cache(args.cache)
+    archive = None
+    if args.record_http or args.replay_http:
+        from http_archive import open_archive  # brings in httpx, so only when asked for
+
+        try:
+            archive = open_archive(record=args.record_http, replay=args.replay_http, timing=args.replay_timing)
+        except ValueError as e:
+            print(f"Invalid HTTP archive: {e}", file=sys.stderr)
+            return 2
+        HTTP.configure(archive=archive)
+    if args.profile or args.profile_cprofile:
+        PROFILE.start(transport=HTTP, cprofile_path=args.profile_cprofile)
+
+    # Load cache (new entries are checkpointed as they come in, so a killed
+    # run resumes from where it stopped)
+    with PROFILE.phase("cache_open"):
+        cache = open_cache(
+            resolve_cache_path(args.cache, isolated=archive is not None),
+            namespaces=CACHE_NAMESPACES,
+            import_from=LEGACY_CACHE_FILES,
+            checkpoint_every=args.checkpoint_every,
+            checkpoint_seconds=args.checkpoint_seconds,
+        )
 
     # Load slug lists
     api_dir = Path(__file__).resolve().parent.parent / "api"
@@ -362,10 +354,12 @@ def main(argv: Optional[List[str]] = None) -> int:
         print(f"Loaded {len(black_director_slugs)} Black director slugs", file=sys.stderr)
 
     # Read CSV
-    rows = read_list_csv(args.csv)
+    with PROFILE.phase("loading_csv"):
+        rows = read_list_csv(args.csv)
     print(f"Read {len(rows)} entries from CSV", file=sys.stderr)
 
-    # Enrich
+    # Enrich (ndjson output is written film by film as they finish)
+    writer = NdjsonWriter(args.out) if args.format == "ndjson" else None
     results = enrich(
         rows,
         api_key=api_key,
@@ -373,16 +367,27 @@ def main(argv: Optional[List[str]] = None) -> int:
         criterion_slugs=criterion_slugs,
         black_director_slugs=black_director_slugs,
         sleep_s=args.sleep,
+        on_film=writer.write_film if writer is not None else None,
+        retry_failures=args.retry_failures,
     )
 
     # Write output
-    out_path = Path(args.out)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
-    print(f"Wrote {len(results)} films -> {args.out}")
+    with PROFILE.phase("write_output"):
+        if writer is not None:
+            writer.close()
+        else:
+            out_path = Path(args.out)
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            out_path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Wrote {writer.count if writer is not None else len(results)} films -> {args.out}")
 
     # Save cache
-    save_cache(args.cache, cache)
+    with PROFILE.phase("cache_close"):
+        cache.close()
+    if archive is not None:
+        print(archive.describe(), file=sys.stderr)
+    if PROFILE.enabled:
+        PROFILE.write_report(args.profile or "-")
     return 0
 
 
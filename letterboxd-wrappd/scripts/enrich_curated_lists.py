@@ -1,24 +1,37 @@
 #!/usr/bin/env python3
-"""Enrich curated-lists.json with TMDb data and Black directors flag."""
+"""Enrich curated-lists.json with TMDb data and Black directors flag.
+
+--profile PATH writes a report of where the run's time went (see run_profile.py).
+"""
 
 import argparse
 import json
 import os
 import re
 import sys
-import time
 from pathlib import Path
-from typing import Any, Dict, Optional
-
-import requests
-
-SESSION = requests.Session()
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache_store import DEFAULT_CHECKPOINT_EVERY, DEFAULT_CHECKPOINT_SECONDS, LEGACY_CACHE_FILES, open_cache, resolve_cache_path
+from http_transport import shared_transport, with_retries
+from letterboxd_client import is_film_url, resolve_shortlink, resolve_shortlinks
+from negative_cache import NegativeCache
+from run_profile import RunProfiler
+from tmdb_client import (
+    build_tmdb_data,
+    cached_search_id,
+    fetch_movie,
+    is_complete_tmdb_data,
+    match_search_result,
+    search_cache_entry,
+)
+
+HTTP = shared_transport()
+PROFILE = RunProfiler()
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = SCRIPT_DIR.parent
 PUBLIC_DIR = PROJECT_ROOT / "public"
-CACHE_PATH = PROJECT_ROOT / ".cache" / "curated_tmdb_cache.json"
-LETTERBOXD_CACHE_PATH = PROJECT_ROOT / ".cache" / "letterboxd_tmdb_cache.json"
 BLACK_DIRECTORS_CSV = PROJECT_ROOT / "api" / "black-directors.csv"
 BLACK_DIRECTORS_SLUGS = PROJECT_ROOT / "api" / "black-directors-slugs.json"
 
@@ -94,34 +107,56 @@ def load_black_director_sets() -> tuple[set[str], set[str]]:
 def expand_shortlink(url: str, cache: dict[str, Any]) -> str:
     if "boxd.it/" not in url:
         return url
-    short_map = cache.get("shortlink_to_film", {})
-    if isinstance(short_map, dict) and url in short_map:
-        return short_map[url]
     short_map = cache.setdefault("shortlink_to_film", {})
-    resolved = url
+    cached = short_map.get(url)
+    if isinstance(cached, str) and is_film_url(cached):
+        return cached
     try:
-        resp = SESSION.head(url, allow_redirects=True, timeout=20)
-        if resp.status_code >= 400:
-            resp = SESSION.get(url, allow_redirects=True, timeout=20)
-        resolved = resp.url or url
+        resolved = HTTP.run(with_retries(lambda: resolve_shortlink(HTTP.transport, url, timeout=20))) or url
     except Exception:
         return url
     resolved = normalize_url(resolved)
-    short_map[url] = resolved
+    if is_film_url(resolved):
+        short_map[url] = resolved
     return resolved
 
 
-def tmdb_search(title: str, year: str, api_key: str) -> Optional[dict]:
+def prefetch_shortlinks(urls: list[str], cache: dict[str, Any]) -> None:
+    """Resolve all uncached boxd.it shortlinks concurrently into the cache."""
+    short_map = cache.setdefault("shortlink_to_film", {})
+    pending = [u for u in urls if "boxd.it/" in u and not is_film_url(short_map.get(u) or "")]
+    if pending:
+        resolved = HTTP.run(resolve_shortlinks(HTTP.transport, pending, timeout=20))
+        for url, final in resolved.items():
+            if is_film_url(final):
+                short_map[url] = normalize_url(final)
+
+
+def tmdb_search(title: str, year: str, api_key: str) -> Tuple[Optional[dict], float]:
+    """Search TMDb for a curated film. Returns (result, confidence), or (None, 0.0).
+
+    The result is this script's best guess, which may be a weak one (a year-only
+    match, or the first result). Its confidence is match_search_result()'s when
+    the guess is that function's pick too, else 0.0, so scrape_tmdb_ids.py only
+    trusts the guesses it would have made itself.
+    """
     params = {"api_key": api_key, "query": title}
     if year:
         params["year"] = year
-    resp = SESSION.get("https://api.themoviedb.org/3/search/movie", params=params, timeout=30)
+    resp = HTTP.get("https://api.themoviedb.org/3/search/movie", params=params, timeout=30)
     resp.raise_for_status()
     data = resp.json()
     results = data.get("results") or []
     if not results:
-        return None
+        return None, 0.0
+    result = _pick_search_result(results, title, year)
+    best, confidence = match_search_result(results, title, year)
+    if best is None or best.get("id") != result.get("id"):
+        confidence = 0.0
+    return result, confidence
+
 
+def _pick_search_result(results: List[dict], title: str, year: str) -> dict:
     norm_title = normalize_title(title)
     for result in results:
         if year and str(result.get("release_date", "")).startswith(str(year)):
@@ -139,106 +174,56 @@ def tmdb_search(title: str, year: str, api_key: str) -> Optional[dict]:
     return results[0]
 
 
-def fetch_tmdb_movie(tmdb_id: int, api_key: str) -> dict:
-    resp = SESSION.get(f"https://api.themoviedb.org/3/movie/{tmdb_id}", params={"api_key": api_key}, timeout=30)
-    resp.raise_for_status()
-    return resp.json()
-
-
-def fetch_tmdb_credits(tmdb_id: int, api_key: str) -> dict:
-    resp = SESSION.get(
-        f"https://api.themoviedb.org/3/movie/{tmdb_id}/credits",
-        params={"api_key": api_key},
-        timeout=30,
+def fetch_tmdb_data(tmdb_id: int, api_key: str) -> dict:
+    tmdb_data, credits, credits_error = HTTP.run(
+        with_retries(lambda: fetch_movie(HTTP.transport, tmdb_id, api_key=api_key))
     )
-    resp.raise_for_status()
-    return resp.json()
-
-
-def build_tmdb_data(tmdb_id: int, api_key: str) -> dict:
-    tmdb_data = fetch_tmdb_movie(tmdb_id, api_key)
-    production_countries = tmdb_data.get("production_countries", [])
-    country_codes = [c.get("iso_3166_1") for c in production_countries if c.get("iso_3166_1")]
-    country_names = [c.get("name") for c in production_countries if c.get("name")]
-
-    spoken_languages = tmdb_data.get("spoken_languages", [])
-    language_codes = [l.get("iso_639_1") for l in spoken_languages if l.get("iso_639_1")]
-    language_names = [l.get("name") for l in spoken_languages if l.get("name")]
+    if credits is None:
+        return {"tmdb_error": credits_error}
+    return build_tmdb_data(tmdb_data, credits)
 
-    original_language = tmdb_data.get("original_language", "")
-    is_american = "US" in country_codes
-    is_english = original_language == "en"
 
-    directors = []
-    writers = []
-    directed_by_woman = False
-    written_by_woman = False
-
-    try:
-        credits = fetch_tmdb_credits(tmdb_id, api_key)
-        crew = credits.get("crew", [])
-        directors = [
-            {
-                "id": person.get("id"),
-                "name": person.get("name"),
-                "gender": person.get("gender"),
-                "profile_path": person.get("profile_path"),
-            }
-            for person in crew
-            if person.get("job") == "Director"
-        ]
-        writer_jobs = {"Writer", "Screenplay", "Story", "Characters"}
-        writers = [
-            {
-                "id": person.get("id"),
-                "name": person.get("name"),
-                "job": person.get("job"),
-                "gender": person.get("gender"),
-                "profile_path": person.get("profile_path"),
-            }
-            for person in crew
-            if person.get("job") in writer_jobs
-        ]
-        directed_by_woman = any(d.get("gender") == 1 for d in directors)
-        written_by_woman = any(w.get("gender") == 1 for w in writers)
-    except Exception as exc:
-        return {"tmdb_error": str(exc)}
-
-    return {
-        "title": tmdb_data.get("title"),
-        "original_title": tmdb_data.get("original_title"),
-        "original_language": original_language,
-        "release_date": tmdb_data.get("release_date"),
-        "overview": tmdb_data.get("overview"),
-        "runtime": tmdb_data.get("runtime"),
-        "genres": [g.get("name") for g in tmdb_data.get("genres", [])],
-        "popularity": tmdb_data.get("popularity"),
-        "vote_average": tmdb_data.get("vote_average"),
-        "vote_count": tmdb_data.get("vote_count"),
-        "poster_path": tmdb_data.get("poster_path"),
-        "backdrop_path": tmdb_data.get("backdrop_path"),
-        "production_countries": {"codes": country_codes, "names": country_names},
-        "is_american": is_american,
-        "spoken_languages": {"codes": language_codes, "names": language_names},
-        "is_english": is_english,
-        "directors": directors,
-        "writers": writers,
-        "directed_by_woman": directed_by_woman,
-        "written_by_woman": written_by_woman,
-    }
-
-
-def main() -> int:
+def main(argv: Optional[List[str]] = None) -> int:
     parser = argparse.ArgumentParser(description="Enrich curated-lists.json with TMDb data.")
     parser.add_argument("--in", dest="input_path", default=str(PUBLIC_DIR / "curated-lists.json"))
     parser.add_argument("--out", dest="output_path", default=str(PUBLIC_DIR / "curated-lists-enriched.json"))
     parser.add_argument("--tmdb-api-key", dest="tmdb_api_key", default=os.getenv("TMDB_API_KEY", ""))
     parser.add_argument("--sleep", type=float, default=0.25)
-    args = parser.parse_args()
+    parser.add_argument(
+        "--cache",
+        help="Film metadata store shared with the other scripts "
+        "(default: .cache/film_store.sqlite, or a throwaway store with --record-http/--replay-http)",
+    )
+    parser.add_argument("--checkpoint-every", type=int, default=DEFAULT_CHECKPOINT_EVERY)
+    parser.add_argument("--checkpoint-seconds", type=float, default=DEFAULT_CHECKPOINT_SECONDS)
+    parser.add_argument(
+        "--retry-failures",
+        action="store_true",
+        help="Ignore cached failures (no TMDb match, TMDb 404, ...) and try those films again",
+    )
+    parser.add_argument("--profile", metavar="PATH", help="Write a profiling report here when the run ends ('-' for stderr)")
+    parser.add_argument("--profile-cprofile", metavar="PATH", help="Also run cProfile and dump its stats here")
+    archive_group = parser.add_mutually_exclusive_group()
+    archive_group.add_argument("--record-http", metavar="DIR", help="Save every HTTP request and response of this run to an archive directory")
+    archive_group.add_argument("--replay-http", metavar="DIR", help="Answer HTTP requests from an archive made with --record-http instead of the network")
+    parser.add_argument("--replay-timing", type=float, default=0.0, metavar="FACTOR", help="With --replay-http, wait the recorded response time times FACTOR")
+    args = parser.parse_args(argv)
 
     if not args.tmdb_api_key:
         print("Missing TMDB_API_KEY (set env or use --tmdb-api-key).", file=sys.stderr)
         return 1
+    archive = None
+    if args.record_http or args.replay_http:
+        from http_archive import open_archive  # brings in httpx, so only when asked for
+
+        try:
+            archive = open_archive(record=args.record_http, replay=args.replay_http, timing=args.replay_timing)
+        except ValueError as exc:
+            print(f"Invalid HTTP archive: {exc}", file=sys.stderr)
+            return 2
+        HTTP.configure(archive=archive)
+    if args.profile or args.profile_cprofile:
+        PROFILE.start(transport=HTTP, cprofile_path=args.profile_cprofile)
 
     data = load_json(Path(args.input_path), {})
     films = data.get("films", [])
@@ -246,15 +231,24 @@ def main() -> int:
         print("No films found in curated-lists.json", file=sys.stderr)
         return 1
 
-    cache = load_json(CACHE_PATH, {"tmdb_movie_data": {}, "tmdb_search": {}})
-    letterboxd_cache = load_json(LETTERBOXD_CACHE_PATH, {})
+    with PROFILE.phase("cache_open"):
+        cache = open_cache(
+            resolve_cache_path(args.cache, isolated=archive is not None),
+            import_from=LEGACY_CACHE_FILES,
+            checkpoint_every=args.checkpoint_every,
+            checkpoint_seconds=args.checkpoint_seconds,
+        )
+    failures = NegativeCache(cache, enabled=not args.retry_failures)
     black_url_set, black_slug_set = load_black_director_sets()
+    with PROFILE.phase("resolve"):
+        prefetch_shortlinks([str(film.get("url") or "") for film in films], cache)
 
     for idx, film in enumerate(films, 1):
         name = str(film.get("name") or "")
         year = str(film.get("year") or "")
         url_raw = str(film.get("url") or "")
-        normalized_url = normalize_url(expand_shortlink(url_raw, letterboxd_cache))
+        with PROFILE.phase("resolve"):
+            normalized_url = normalize_url(expand_shortlink(url_raw, cache))
         slug = extract_slug(normalized_url)
 
         film["url"] = normalized_url or url_raw
@@ -265,44 +259,68 @@ def main() -> int:
         if film.get("tmdb_data") and film.get("tmdb_movie_id"):
             continue
 
+        # A TMDb ID scraped from the film's own page (by another script) beats
+        # a search. Searches with no match are negative-cached with a TTL
+        # (older caches stored them as None, which is now just a miss).
         cache_key = f"{name}|{year}"
-        if cache_key in cache.get("tmdb_search", {}):
-            tmdb_id = cache["tmdb_search"][cache_key]
-        else:
-            result = tmdb_search(name, year, args.tmdb_api_key)
-            tmdb_id = result.get("id") if result else None
-            cache["tmdb_search"][cache_key] = tmdb_id
-
-        if not tmdb_id:
-            film["tmdb_error"] = "No TMDb match"
+        tmdb_id = cache["film_to_tmdb"].get(normalized_url) or cached_search_id(cache["title_year_to_tmdb"].get(cache_key))
+        failure = failures.get("search", cache_key) if not tmdb_id else None
+        if failure is not None:
+            film["tmdb_error"] = failure["error"]
             continue
+        if not tmdb_id:
+            try:
+                with PROFILE.phase("tmdb_search"):
+                    result, confidence = tmdb_search(name, year, args.tmdb_api_key)
+            except Exception as exc:
+                failures.record("search", cache_key, exc)
+                film["tmdb_error"] = str(exc)
+                continue
+            tmdb_id = result.get("id") if result else None
+            if not tmdb_id:
+                failures.record_kind("search", cache_key, "not_found", "No TMDb match")
+                film["tmdb_error"] = "No TMDb match"
+                continue
+            cache["title_year_to_tmdb"][cache_key] = search_cache_entry(tmdb_id, confidence)
 
         film["tmdb_movie_id"] = tmdb_id
 
         tmdb_cache = cache.get("tmdb_movie_data", {})
         cached = tmdb_cache.get(str(tmdb_id))
-        if cached and "directed_by_woman" in cached:
+        if is_complete_tmdb_data(cached):
             film["tmdb_data"] = cached
             continue
+        failure = failures.get("tmdb", tmdb_id)
+        if failure is not None:
+            film["tmdb_error"] = failure["error"]
+            continue
 
         try:
-            tmdb_data = build_tmdb_data(int(tmdb_id), args.tmdb_api_key)
+            with PROFILE.phase("tmdb_api"):
+                tmdb_data = fetch_tmdb_data(int(tmdb_id), args.tmdb_api_key)
             film["tmdb_data"] = tmdb_data
             if "tmdb_error" not in tmdb_data:
                 tmdb_cache[str(tmdb_id)] = tmdb_data
         except Exception as exc:
+            failures.record("tmdb", tmdb_id, exc)
             film["tmdb_error"] = str(exc)
 
-        if args.sleep:
-            time.sleep(args.sleep)
+        PROFILE.sleep(args.sleep)
 
         if idx % 50 == 0:
-            save_json(CACHE_PATH, cache)
             print(f"Enriched {idx}/{len(films)} films")
 
-    save_json(CACHE_PATH, cache)
-    save_json(Path(args.output_path), data)
+    if failures.skipped:
+        print(f"Skipped {failures.skipped} lookups that failed recently (--retry-failures to try them again)")
+    with PROFILE.phase("cache_close"):
+        cache.close()
+    with PROFILE.phase("write_output"):
+        save_json(Path(args.output_path), data)
     print(f"Wrote {args.output_path}")
+    if archive is not None:
+        print(archive.describe(), file=sys.stderr)
+    if PROFILE.enabled:
+        PROFILE.write_report(args.profile or "-")
     return 0
 
 
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""Local stand-ins for boxd.it, letterboxd.com and the TMDb API, for benchmarks.
+
+One threaded HTTP server answers for all three hosts, routing on the Host
+header; point the scripts at it with the transport's host overrides:
+
+  services = FakeServices(ServiceConfig(latency={"letterboxd.com": 0.05}, rate_429={"api.themoviedb.org": 0.01}))
+  services.start()
+  HTTP.configure(host_overrides=services.overrides())
+  ...
+  services.stats()   # {"letterboxd.com": {"requests": 1200, "200": 1190, "429": 10, ...}, ...}
+  services.close()
+
+Synthetic films are numbered. Film n has
+- shortlink https://boxd.it/b<n in hex> (and b<n in hex>r<k> for a diary's
+  k-th rewatch, which gets its own shortlink), redirecting (301) to
+- https://letterboxd.com/film/film-<n>/, a page that links
+  themoviedb.org/movie/<n + TMDB_ID_OFFSET> partway through (unless the film
+  is one of the ``not_found_rate`` share without a TMDb link)
+- title "Film <n>", year 1950 + n % 75, which /3/search/movie finds
+
+Per host, the config sets a mean latency (jittered +-50%) and a share of
+requests answered 429. ``challenge_rate`` of letterboxd.com pages are a
+Cloudflare "Just a moment..." page served with 200, which is how the scripts
+see one mid-stream.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+HOSTS = ("boxd.it", "letterboxd.com", "api.themoviedb.org")
+TMDB_ID_OFFSET = 1000
+
+_SHORTLINK_RE = re.compile(r"^/b([0-9a-f]+)(?:r\d+)?/?$")
+_FILM_RE = re.compile(r"^/(?:[^/]+/)?film/film-(\d+)/?$")
+_MOVIE_RE = re.compile(r"^/3/movie/(\d+)(/credits)?$")
+_TITLE_RE = re.compile(r"^Film (\d+)$")
+
+CHALLENGE_PAGE = (
+    b"<!DOCTYPE html><html><head><title>Just a moment...</title></head>"
+    b"<body><div id=\"challenge-platform\"></div></body></html>"
+)
+
+
+def shortlink(n: int, rewatch: int = 0) -> str:
+    return f"https://boxd.it/b{n:x}" + (f"r{rewatch}" if rewatch else "")
+
+
+def film_url(n: int) -> str:
+    return f"https://letterboxd.com/film/film-{n}/"
+
+
+def film_title(n: int) -> str:
+    return f"Film {n}"
+
+
+def film_year(n: int) -> int:
+    return 1950 + n % 75
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # the scripts open dozens of connections at once
+
+
+@dataclass
+class ServiceConfig:
+    """Behaviour of the stand-ins. Dicts are keyed by host (see HOSTS)."""
+
+    latency: Dict[str, float] = field(default_factory=dict)  # mean seconds per request
+    rate_429: Dict[str, float] = field(default_factory=dict)  # share of requests answered 429
+    retry_after: Optional[float] = None  # Retry-After sent with 429s
+    challenge_rate: float = 0.0  # share of film pages that are a Cloudflare challenge
+    not_found_rate: float = 0.0  # share of films whose page has no TMDb link
+    page_kb: int = 80  # film page size
+    link_at: float = 0.4  # where in the page the TMDb link sits (0..1)
+    seed: int = 0
+
+
+class FakeServices:
+    def __init__(self, config: Optional[ServiceConfig] = None, *, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config or ServiceConfig()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        filler = (b"<div class=\"filler\">" + b"x" * 200 + b"</div>\n") * (self.config.page_kb * 1024 // 220 + 1)
+        self._filler = filler[: self.config.page_kb * 1024]
+        self._server = _Server((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def origin(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def overrides(self) -> Dict[str, str]:
+        """Host overrides for http_transport: every stand-in host -> this server."""
+        return {host: self.origin for host in HOSTS}
+
+    def start(self) -> "FakeServices":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-services", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {host: dict(counts) for host, counts in self._stats.items()}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = {}
+
+    def __enter__(self) -> "FakeServices":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    # -- behaviour ---------------------------------------------------------
+    def _count(self, host: str, outcome: str) -> None:
+        with self._lock:
+            counts = self._stats.setdefault(host, {})
+            counts["requests"] = counts.get("requests", 0) + 1
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def _chance(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+
+    def _delay(self, host: str) -> None:
+        latency = self.config.latency.get(host, 0.0)
+        if latency > 0:
+            with self._lock:
+                jitter = self._rng.uniform(0.5, 1.5)
+            time.sleep(latency * jitter)
+
+    def _has_tmdb_link(self, n: int) -> bool:
+        # Decided per film, not per request, so warm runs see the same films.
+        return zlib.crc32(str(n).encode()) % 10_000 >= self.config.not_found_rate * 10_000
+
+    def _film_page(self, n: int) -> bytes:
+        cut = int(len(self._filler) * self.config.link_at)
+        link = b""
+        if self._has_tmdb_link(n):
+            link = f'<a href="https://www.themoviedb.org/movie/{n + TMDB_ID_OFFSET}/" data-track-action="TMDb">TMDb</a>'.encode()
+        head = f"<!DOCTYPE html><html><head><title>{film_title(n)} ({film_year(n)})</title></head><body>".encode()
+        return head + self._filler[:cut] + link + self._filler[cut:] + b"</body></html>"
+
+    def _movie(self, n: int) -> dict:
+        return {
+            "id": n + TMDB_ID_OFFSET,
+            "title": film_title(n),
+            "original_title": film_title(n),
+            "original_language": "en" if n % 3 else "fr",
+            "release_date": f"{film_year(n)}-01-01",
+            "overview": "A synthetic film. " * 8,
+            "runtime": 80 + n % 70,
+            "genres": [{"id": 18, "name": "Drama"}, {"id": 35, "name": "Comedy"}][: 1 + n % 2],
+            "popularity": round(1 + (n % 97) / 3, 3),
+            "vote_average": round(5 + (n % 50) / 10, 1),
+            "vote_count": 10 + n % 5000,
+            "poster_path": f"/poster{n}.jpg",
+            "backdrop_path": f"/backdrop{n}.jpg",
+            "production_countries": [
+                {"iso_3166_1": "US", "name": "United States of America"} if n % 2 else {"iso_3166_1": "FR", "name": "France"}
+            ],
+            "spoken_languages": [{"iso_639_1": "en", "name": "English"}],
+        }
+
+    def _credits(self, n: int) -> dict:
+        return {
+            "id": n + TMDB_ID_OFFSET,
+            "cast": [],
+            "crew": [
+                {"id": 2 * n, "name": f"Director {n}", "job": "Director", "gender": 1 if n % 4 == 0 else 2, "profile_path": None},
+                {"id": 2 * n + 1, "name": f"Writer {n}", "job": "Screenplay", "gender": 1 if n % 5 == 0 else 2, "profile_path": None},
+            ],
+        }
+
+    def _handler_class(self) -> type:
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; with Nagle on, the body
+            # waits for the client's delayed ACK (~40ms a response).
+            disable_nagle_algorithm = True
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+            def do_HEAD(self) -> None:
+                self._serve(head=True)
+
+            def do_GET(self) -> None:
+                self._serve(head=False)
+
+            def _reply(self, host: str, status: int, body: bytes = b"", headers: Optional[dict] = None, *, head: bool, outcome: str = "") -> None:
+                services._count(host, outcome or str(status))
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if not head:
+                    try:
+                        self.wfile.write(body)
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass  # the scanner stops reading once it has the link
+
+            def _serve(self, *, head: bool) -> None:
+                host = (self.headers.get("Host") or "").split(":")[0].lower()
+                url = urlsplit(self.path)
+                services._delay(host)
+                if services._chance(services.config.rate_429.get(host, 0.0)):
+                    headers = {}
+                    if services.config.retry_after is not None:
+                        headers["Retry-After"] = str(services.config.retry_after)
+                    self._reply(host, 429, b"Too Many Requests", headers, head=head)
+                    return
+
+                if host == "boxd.it":
+                    m = _SHORTLINK_RE.match(url.path)
+                    if not m:
+                        self._reply(host, 404, head=head)
+                        return
+                    self._reply(host, 301, headers={"Location": film_url(int(m.group(1), 16))}, head=head)
+                elif host == "letterboxd.com":
+                    m = _FILM_RE.match(url.path)
+                    if not m:
+                        self._reply(host, 404, head=head)
+                    elif services._chance(services.config.challenge_rate):
+                        self._reply(host, 200, CHALLENGE_PAGE, {"Content-Type": "text/html"}, head=head, outcome="challenge")
+                    else:
+                        page = services._film_page(int(m.group(1)))
+                        self._reply(host, 200, page, {"Content-Type": "text/html; charset=utf-8"}, head=head)
+                elif host == "api.themoviedb.org":
+                    self._tmdb(host, url.path, parse_qs(url.query), head=head)
+                else:
+                    self._reply(host, 404, head=head)
+
+            def _tmdb(self, host: str, path: str, query: dict, *, head: bool) -> None:
+                if not query.get("api_key"):
+                    self._reply(host, 401, b'{"status_code": 7}', {"Content-Type": "application/json"}, head=head)
+                    return
+                payload: Optional[dict] = None
+                m = _MOVIE_RE.match(path)
+                if m and int(m.group(1)) >= TMDB_ID_OFFSET:
+                    n = int(m.group(1)) - TMDB_ID_OFFSET
+                    if m.group(2):
+                        payload = services._credits(n)
+                    else:
+                        payload = services._movie(n)
+                        if "credits" in query.get("append_to_response", [""])[0]:
+                            payload["credits"] = services._credits(n)
+                elif path == "/3/search/movie":
+                    title = _TITLE_RE.match(query.get("query", [""])[0])
+                    results = []
+                    if title:
+                        n = int(title.group(1))
+                        results.append({"id": n + TMDB_ID_OFFSET, "title": film_title(n), "release_date": f"{film_year(n)}-01-01"})
+                    payload = {"page": 1, "results": results, "total_results": len(results)}
+                if payload is None:
+                    self._reply(host, 404, b'{"status_code": 34}', {"Content-Type": "application/json"}, head=head)
+                    return
+                body = json.dumps(payload).encode()
+                self._reply(host, 200, body, {"Content-Type": "application/json"}, head=head)
+
+        return Handler
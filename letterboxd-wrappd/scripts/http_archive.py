@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""Record the scripts' HTTP traffic to disk and replay it without a network.
+
+  python scripts/scrape_tmdb_ids.py --csv upload.csv --out out.json --enrich-tmdb --record-http .cache/http/upload
+  python scripts/scrape_tmdb_ids.py --csv upload.csv --out out.json --enrich-tmdb --replay-http .cache/http/upload
+
+Recording sits below the httpx client, so every hop is captured as it went
+over the wire: boxd.it redirects, film pages, TMDb JSON, retried 429s. An
+archive is a directory:
+
+  index.jsonl      one line per exchange, in the order responses arrived:
+                   {"k": "GET https://...", "s": 200, "h": [[name, value], ...], "b": "<sha256>", "t": 0.213}
+  blobs/ab/ab12..  response bodies, zlib-compressed, named by the SHA-256 of
+                   the body, so identical bodies (404s, challenge pages) are
+                   stored once
+
+The key is the method and URL with the query sorted and ``api_key`` left out,
+so archives hold no TMDb key and replay works with any key. Bodies are stored
+as received (still gzip/br encoded if the server sent them that way).
+
+Replay serves each key's responses in recorded order and repeats the last one
+once they run out, so a run that hit a 429 then a 200 sees the same again. A
+request that is not in the archive fails with ArchiveMissError (not retried);
+nothing goes to the network. Rate limits are skipped during replay, and
+``timing`` sleeps for the recorded response time times the given factor
+(0: as fast as possible, 1: as recorded).
+
+While recording, streamed film pages are read in full (the page scanner
+normally stops at the TMDb link), so a replayed scan has the whole page.
+Both modes start the scripts from an empty, temporary cache unless --cache
+is given (cache_store.resolve_cache_path), so a recording makes every
+request and a replay makes the same ones, without touching the shared store.
+
+HostOverrideTransport, the transport behind ``host_overrides``, lives here
+too: http_transport.py imports this module (and so httpx) only when it
+builds its first client.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+INDEX_FILE = "index.jsonl"
+BLOB_DIR = "blobs"
+
+# Query parameters kept out of archive keys (and so off disk).
+SECRET_PARAMS = frozenset({"api_key"})
+
+
+class ArchiveMissError(httpx.RequestError):
+    """A replayed request that the archive has no response for."""
+
+
+def archive_key(method: str, url: httpx.URL) -> str:
+    params = sorted((k, v) for k, v in url.params.multi_items() if k not in SECRET_PARAMS)
+    return f"{method.upper()} {url.copy_with(query=None).copy_merge_params(params)}"
+
+
+def open_archive(*, record: Optional[str] = None, replay: Optional[str] = None, timing: float = 0.0) -> Optional[HttpArchive]:
+    """The archive for the --record-http / --replay-http flags, or None when neither is set."""
+    if record and replay:
+        raise ValueError("--record-http and --replay-http can't be used together")
+    if record:
+        return HttpArchive(record, mode="record")
+    if replay:
+        return HttpArchive(replay, mode="replay", timing=timing)
+    return None
+
+
+class HttpArchive:
+    """One archive directory, opened for recording or for replay."""
+
+    def __init__(self, path: str | Path, *, mode: str, timing: float = 0.0) -> None:
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown archive mode {mode!r} (expected record or replay)")
+        self.path = Path(path)
+        self.mode = mode
+        self.timing = timing
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._blobs = self.path / BLOB_DIR
+        self._entries: Dict[str, List[dict]] = {}
+        self._served: Dict[str, int] = {}
+        self._index = None
+        if mode == "record":
+            self._blobs.mkdir(parents=True, exist_ok=True)
+            # A fresh index per recording; blobs are shared, keyed by content.
+            # Line-buffered, so a killed run keeps what it recorded.
+            self._index = open(self.path / INDEX_FILE, "w", encoding="utf-8", buffering=1)
+        else:
+            index_path = self.path / INDEX_FILE
+            if not index_path.exists():
+                raise ValueError(f"No HTTP archive at {self.path} (missing {INDEX_FILE})")
+            with open(index_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["k"], []).append(entry)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _blob_path(self, digest: str) -> Path:
+        return self._blobs / digest[:2] / digest
+
+    def _put_body(self, body: bytes) -> str:
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(zlib.compress(body))
+            tmp.replace(path)
+        return digest
+
+    def _get_body(self, digest: str) -> bytes:
+        return zlib.decompress(self._blob_path(digest).read_bytes())
+
+    def record(self, key: str, response: httpx.Response, body: bytes, seconds: float) -> None:
+        entry = {
+            "k": key,
+            "s": response.status_code,
+            "h": [[name, value] for name, value in response.headers.multi_items()],
+            "b": self._put_body(body),
+            "t": round(seconds, 4),
+        }
+        self._index.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.recorded += 1
+
+    def next_response(self, key: str) -> Optional[Tuple[dict, bytes]]:
+        """The next recorded (entry, body) for ``key``, or None if there is none."""
+        entries = self._entries.get(key)
+        if not entries:
+            self.misses += 1
+            return None
+        i = self._served.get(key, 0)
+        self._served[key] = i + 1
+        entry = entries[min(i, len(entries) - 1)]
+        self.replayed += 1
+        return entry, self._get_body(entry["b"])
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+            "keys": len(self._entries),
+        }
+
+    def describe(self) -> str:
+        if self.mode == "record":
+            return f"Recorded {self.recorded} HTTP exchanges -> {self.path}"
+        return f"Replayed {self.replayed} HTTP responses from {self.path} ({self.misses} not in the archive)"
+
+    def close(self) -> None:
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Passes requests on to ``inner`` and writes each exchange to the archive."""
+
+    def __init__(self, archive: HttpArchive, inner: httpx.AsyncBaseTransport) -> None:
+        self.archive = archive
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.monotonic()
+        response = await self.inner.handle_async_request(request)
+        try:
+            body = b"".join([chunk async for chunk in response.aiter_raw()])
+        finally:
+            await response.aclose()
+        self.archive.record(archive_key(request.method, request.url), response, body, time.monotonic() - started)
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            content=body,
+            request=request,
+            extensions={k: v for k, v in response.extensions.items() if k in ("http_version", "reason_phrase")},
+        )
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class HostOverrideTransport(httpx.AsyncBaseTransport):
+    """Sends requests for overridden hosts to another origin; the Host header is kept."""
+
+    def __init__(self, overrides: Dict[str, str], inner: httpx.AsyncBaseTransport) -> None:
+        self.overrides = {host: httpx.URL(origin) for host, origin in overrides.items()}
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        target = self.overrides.get(request.url.host)
+        if target is not None:
+            request = httpx.Request(
+                request.method,
+                request.url.copy_with(scheme=target.scheme, host=target.host, port=target.port),
+                headers=request.headers,
+                stream=request.stream,
+                extensions=request.extensions,
+            )
+        return await self.inner.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Answers requests from the archive; never touches the network."""
+
+    def __init__(self, archive: HttpArchive) -> None:
+        self.archive = archive
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = archive_key(request.method, request.url)
+        found = self.archive.next_response(key)
+        if found is None:
+            raise ArchiveMissError(f"Not in HTTP archive {self.archive.path}: {key}", request=request)
+        entry, body = found
+        if self.archive.timing > 0:
+            await asyncio.sleep(entry["t"] * self.archive.timing)
+        return httpx.Response(entry["s"], headers=entry["h"], content=body, request=request)
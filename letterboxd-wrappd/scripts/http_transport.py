@@ -0,0 +1,640 @@
+#!/usr/bin/env python3
+"""Shared asyncio HTTP transport for the scripts in this directory.
+
+- One pooled httpx.AsyncClient per host, so keep-alive connections to
+  boxd.it, letterboxd.com and api.themoviedb.org are reused across requests.
+- An adaptive concurrency limit per host (AdaptiveLimiter, additive-increase/
+  multiplicative-decrease): it grows while responses are healthy and halves on
+  429, 5xx, timeouts or a Cloudflare challenge, up to a configured ceiling.
+  Repeated throttling opens a per-host circuit breaker that pauses the host.
+- with_retries(): jittered exponential backoff for throttled and transient
+  failures, so an item goes back in line instead of failing outright.
+- A token-bucket rate limit per host; api.themoviedb.org defaults to TMDb's
+  documented 40 requests per 10 seconds.
+- HTTP/2 to api.themoviedb.org when the optional `h2` package is installed.
+- Host overrides (``host_overrides={"letterboxd.com": "http://127.0.0.1:8771"}``)
+  send a host's requests to another server, e.g. the stand-ins in
+  fake_services.py. Requests and responses keep their original URLs, so
+  redirects and parsing behave as they would against the real host.
+- An HttpArchive (http_archive.py) records every exchange to disk, or
+  replays a recording with no network calls.
+- SyncTransport: a blocking facade whose event loop runs on one background
+  thread. Simple scripts call ``HTTP.get(...)`` like a requests.Session; the
+  concurrent phases hand a coroutine to ``HTTP.run(...)`` and can keep
+  hundreds of requests in flight without a thread per request.
+- Importing this module is cheap: httpx, asyncio, http_archive.py and the
+  event loop thread are only loaded (or started) by the first request, so a
+  run answered entirely from the cache never pays for them.
+
+Usage:
+  from http_transport import shared_transport
+  HTTP = shared_transport()
+  resp = HTTP.get("https://letterboxd.com/film/parasite-2019/", timeout=30)
+"""
+
+from __future__ import annotations
+
+import atexit
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    import asyncio
+
+    import httpx
+
+    from http_archive import HttpArchive
+
+T = TypeVar("T")
+
+# Max concurrent requests per host (the ceiling of the adaptive limit).
+# Letterboxd film pages start low and only grow while Cloudflare lets them;
+# boxd.it redirects are tiny and tolerate much more.
+DEFAULT_HOST_LIMITS: Dict[str, int] = {
+    "boxd.it": 50,
+    "letterboxd.com": 32,
+    "api.themoviedb.org": 20,
+}
+DEFAULT_HOST_LIMIT = 8
+
+# Statuses that mean "slow down" rather than "this request is wrong".
+THROTTLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+DEFAULT_RETRIES = 4
+
+# Requests allowed per window, as (requests, seconds), per host.
+DEFAULT_RATE_LIMITS: Dict[str, Tuple[int, float]] = {
+    "api.themoviedb.org": (40, 10.0),
+}
+
+HTTP2_HOSTS = ("api.themoviedb.org",)
+
+
+def _import_httpx() -> Any:
+    try:
+        import httpx
+    except Exception:
+        print("Missing dependency: httpx. Install with: pip install httpx", file=sys.stderr)
+        raise
+    return httpx
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except Exception:
+        return False
+    return True
+
+
+def parse_host_limits(values: Iterable[str]) -> Dict[str, int]:
+    """Parse ["letterboxd.com=8", ...] from the CLI into {host: limit}."""
+    limits: Dict[str, int] = {}
+    for value in values:
+        host, sep, limit = value.partition("=")
+        if not sep or not host.strip() or not limit.strip().isdigit() or int(limit) < 1:
+            raise ValueError(f"Expected HOST=N with N >= 1, got {value!r}")
+        limits[host.strip().lower()] = int(limit)
+    return limits
+
+
+def parse_rate(value: str) -> Tuple[int, float]:
+    """Parse "40/10" (requests per seconds) or "4" (requests per second)."""
+    count, sep, window = value.partition("/")
+    try:
+        n = int(count)
+        per = float(window) if sep else 1.0
+    except ValueError:
+        raise ValueError(f"Expected N or N/SECONDS, got {value!r}") from None
+    if n < 1 or per <= 0:
+        raise ValueError(f"Expected N or N/SECONDS with N >= 1, got {value!r}")
+    return n, per
+
+
+class ThrottledError(Exception):
+    """A response that asks the client to back off (e.g. a challenge page served with 200)."""
+
+    def __init__(self, message: str, *, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _retry_after(resp: httpx.Response) -> Optional[float]:
+    value = resp.headers.get("retry-after", "").strip()
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None  # HTTP-date form; fall back to our own backoff
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Throttling, 5xx and network errors are worth retrying; other failures are final."""
+    if isinstance(exc, ThrottledError):
+        return True
+    httpx = _import_httpx()
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in THROTTLE_STATUSES
+    return isinstance(exc, httpx.TransportError)
+
+
+def retry_reason(exc: BaseException) -> str:
+    """Short label for a retried failure, e.g. "http_503" or "ConnectTimeout"."""
+    if isinstance(exc, _import_httpx().HTTPStatusError):
+        return f"http_{exc.response.status_code}"
+    return type(exc).__name__
+
+
+# Retries taken by with_retries() in this process, by retry_reason().
+RETRY_COUNTS: Counter[str] = Counter()
+
+# Seconds requests spent waiting on purpose, summed over concurrent requests:
+# "retry_backoff" (with_retries), "rate_limit" (token buckets) and
+# "host_limit" (adaptive concurrency limit and circuit breaker).
+WAIT_SECONDS: Counter[str] = Counter()
+
+# Multiplier on retry backoff. Replaying an archive sets it to the replay
+# timing factor, so replayed 429s don't sleep out real backoff.
+_backoff_scale = 1.0
+
+
+def set_backoff_scale(scale: float) -> None:
+    global _backoff_scale
+    _backoff_scale = max(0.0, scale)
+
+
+def retry_delay(attempt: int, exc: BaseException, *, base: float = 1.0, cap: float = 60.0) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(cap, base * 2**attempt))
+    retry_after = getattr(exc, "retry_after", None)
+    if isinstance(exc, _import_httpx().HTTPStatusError):
+        retry_after = _retry_after(exc.response)
+    return max(delay, retry_after or 0.0)
+
+
+async def with_retries(call: Callable[[], Awaitable[T]], *, retries: int = DEFAULT_RETRIES) -> T:
+    """Await ``call()``, retrying retryable failures up to ``retries`` times.
+
+    Each retry waits out its backoff and then queues for a host slot again,
+    behind the requests that arrived meanwhile.
+    """
+    import asyncio
+
+    attempt = 0
+    while True:
+        try:
+            return await call()
+        except Exception as e:
+            if attempt >= retries or not is_retryable(e):
+                raise
+            RETRY_COUNTS[retry_reason(e)] += 1
+            delay = retry_delay(attempt, e) * _backoff_scale
+            WAIT_SECONDS["retry_backoff"] += delay
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for one host, with a circuit breaker.
+
+    The limit starts at a quarter of ``ceiling`` and doubles per round of
+    healthy responses until the first throttle, then grows by one slot per
+    round (a round is ``limit`` responses). A response is healthy if it isn't
+    a throttle and its latency stays within ``slow_factor`` of the fastest
+    smoothed latency seen. A throttle halves the limit, once per round.
+
+    After ``trip_after`` throttles in a row the breaker opens: no request
+    starts until the cooldown (or the server's Retry-After) has passed. Then
+    a single probe runs; success closes the breaker, another throttle reopens
+    it with twice the cooldown.
+    """
+
+    def __init__(
+        self,
+        ceiling: int,
+        *,
+        floor: int = 1,
+        trip_after: int = 5,
+        cooldown: float = 15.0,
+        max_cooldown: float = 300.0,
+        slow_factor: float = 3.0,
+    ) -> None:
+        self.ceiling = max(floor, ceiling)
+        self.floor = floor
+        self.limit = float(max(floor, ceiling // 4))
+        self.trip_after = trip_after
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.slow_factor = slow_factor
+        self.in_flight = 0
+        self.throttles = 0
+        self._cooldown = cooldown
+        self._slow_start = True
+        self._round_successes = 0
+        self._consecutive_throttles = 0
+        self._generation = 0
+        self._open_until = 0.0
+        self._half_open = False
+        self._latency: Optional[float] = None
+        self._best_latency: Optional[float] = None
+        self._cond: Optional[asyncio.Condition] = None
+
+    def _condition(self) -> asyncio.Condition:
+        if self._cond is None:
+            import asyncio
+
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def acquire(self) -> int:
+        """Wait for a slot. Returns the generation to pass back to release()."""
+        import asyncio
+
+        cond = self._condition()
+        async with cond:
+            while True:
+                wait = self._open_until - time.monotonic()
+                if wait > 0:
+                    try:
+                        await asyncio.wait_for(cond.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                capacity = 1 if self._half_open else int(self.limit)
+                if self.in_flight < capacity:
+                    self.in_flight += 1
+                    if self.in_flight < capacity:
+                        cond.notify(1)  # pass spare capacity on to the next waiter
+                    return self._generation
+                await cond.wait()
+
+    async def release(
+        self,
+        generation: int,
+        *,
+        throttled: bool,
+        latency: Optional[float] = None,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        cond = self._condition()
+        async with cond:
+            self.in_flight -= 1
+            if throttled:
+                self._on_throttle(generation, retry_after)
+            elif latency is not None:
+                self._on_success(latency)
+            # Wake one waiter; it hands on any further free slots when it gets its own.
+            # (notify_all woke every queued request per release: quadratic with
+            # thousands queued.)
+            cond.notify(1)
+
+    def _on_success(self, latency: float) -> None:
+        self._consecutive_throttles = 0
+        if self._half_open:
+            self._half_open = False
+            self._cooldown = self.base_cooldown
+        self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+        if self._best_latency is None or self._latency < self._best_latency:
+            self._best_latency = self._latency
+        if self._latency > self.slow_factor * self._best_latency:
+            return  # responses are slowing down: hold the limit where it is
+        if self._slow_start:
+            self.limit = min(self.ceiling, self.limit + 1)
+            return
+        self._round_successes += 1
+        if self._round_successes >= int(self.limit):
+            self._round_successes = 0
+            self.limit = min(self.ceiling, self.limit + 1)
+
+    def _on_throttle(self, generation: int, retry_after: Optional[float]) -> None:
+        self.throttles += 1
+        self._slow_start = False
+        self._consecutive_throttles += 1
+        # Requests started before the last decrease saw the old limit; don't punish twice.
+        if generation == self._generation:
+            self._generation += 1
+            self._round_successes = 0
+            self.limit = max(float(self.floor), self.limit / 2)
+        if self._half_open or self._consecutive_throttles >= self.trip_after:
+            self._open_until = time.monotonic() + max(self._cooldown, retry_after or 0.0)
+            self._cooldown = min(self.max_cooldown, self._cooldown * 2)
+            self._half_open = True
+            self._consecutive_throttles = 0
+        elif retry_after:
+            self._open_until = max(self._open_until, time.monotonic() + retry_after)
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per ``per`` seconds, bursting to ``rate``.
+
+    Waiters are served in arrival order; each ``acquire`` sleeps only as long as
+    it takes for the next token to refill.
+    """
+
+    def __init__(self, rate: int, per: float = 1.0) -> None:
+        self.capacity = float(rate)
+        self.fill_rate = rate / per
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self) -> None:
+        import asyncio
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.fill_rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.fill_rate)
+
+
+class AsyncTransport:
+    """Per-host pooled clients with per-host adaptive concurrency and rate limits."""
+
+    def __init__(
+        self,
+        *,
+        host_limits: Optional[Dict[str, int]] = None,
+        rate_limits: Optional[Dict[str, Tuple[int, float]]] = None,
+        default_limit: int = DEFAULT_HOST_LIMIT,
+        http2_hosts: Iterable[str] = HTTP2_HOSTS,
+        timeout: float = 30.0,
+        host_overrides: Optional[Dict[str, str]] = None,
+        archive: Optional[HttpArchive] = None,
+    ) -> None:
+        self.host_limits = {**DEFAULT_HOST_LIMITS, **(host_limits or {})}
+        self.buckets = {
+            host: TokenBucket(*rate) for host, rate in {**DEFAULT_RATE_LIMITS, **(rate_limits or {})}.items()
+        }
+        self.default_limit = default_limit
+        self._http2_hosts = set(http2_hosts)
+        self._h2: Optional[bool] = None
+        self.timeout = timeout
+        self.host_overrides = dict(host_overrides or {})
+        self.archive = archive
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self.limiters: Dict[str, AdaptiveLimiter] = {}
+        # Seconds per request (after its slot was granted), by host, and the
+        # time with at least one request in flight.
+        self.latencies: Dict[str, List[float]] = {}
+        self.busy_seconds = 0.0
+        self._in_flight = 0
+        self._busy_since = 0.0
+
+    def limit_for(self, host: str) -> int:
+        return self.host_limits.get(host, self.default_limit)
+
+    @property
+    def http2_hosts(self) -> set[str]:
+        """Hosts spoken to over HTTP/2 (none unless h2 is installed; checked on first use)."""
+        if self._h2 is None:
+            self._h2 = _h2_available()
+        return self._http2_hosts if self._h2 else set()
+
+    def _client(self, host: str) -> httpx.AsyncClient:
+        client = self._clients.get(host)
+        if client is None:
+            httpx = _import_httpx()
+            from http_archive import HostOverrideTransport, RecordingTransport, ReplayTransport
+
+            limit = self.limit_for(host)
+            limits = httpx.Limits(max_connections=limit, max_keepalive_connections=limit)
+            transport: Optional[httpx.AsyncBaseTransport] = None
+            if self.archive is not None and self.archive.replaying:
+                transport = ReplayTransport(self.archive)
+            else:
+                if self.host_overrides:
+                    # Redirects may lead to another host, so every client checks the overrides.
+                    transport = HostOverrideTransport(
+                        self.host_overrides, httpx.AsyncHTTPTransport(http2=host in self.http2_hosts, limits=limits)
+                    )
+                if self.archive is not None:
+                    transport = RecordingTransport(
+                        self.archive,
+                        transport or httpx.AsyncHTTPTransport(http2=host in self.http2_hosts, limits=limits),
+                    )
+            client = httpx.AsyncClient(
+                http2=host in self.http2_hosts,
+                limits=limits,
+                timeout=self.timeout,
+                transport=transport,
+            )
+            self._clients[host] = client
+        return client
+
+    def _limiter(self, host: str) -> AdaptiveLimiter:
+        limiter = self.limiters.get(host)
+        if limiter is None:
+            limiter = self.limiters[host] = AdaptiveLimiter(self.limit_for(host))
+        return limiter
+
+    @asynccontextmanager
+    async def _slot(self, host: str) -> AsyncIterator[list]:
+        """Hold a concurrency slot for ``host`` and report how the request went.
+
+        The body appends the response to the yielded list once it has one; an
+        exception raised inside the block (a ThrottledError from a challenge
+        page, a timeout) is reported as well.
+        """
+        # Replaying an archive: no rate limits, and replayed throttles came
+        # from a server that isn't there, so the limit doesn't back off for them.
+        replaying = self.archive is not None and self.archive.replaying
+        queued = time.monotonic()
+        bucket = self.buckets.get(host)
+        if bucket is not None and not replaying:
+            await bucket.acquire()
+            WAIT_SECONDS["rate_limit"] += time.monotonic() - queued
+        limiter_queued = time.monotonic()
+        limiter = self._limiter(host)
+        generation = await limiter.acquire()
+        started = time.monotonic()
+        WAIT_SECONDS["host_limit"] += started - limiter_queued
+        if self._in_flight == 0:
+            self._busy_since = started
+        self._in_flight += 1
+        seen: list = []
+        try:
+            yield seen
+        except BaseException as e:
+            self._done(host, started)
+            if replaying:
+                await limiter.release(generation, throttled=False)
+            elif seen and seen[0].status_code in THROTTLE_STATUSES:
+                await limiter.release(generation, throttled=True, retry_after=_retry_after(seen[0]))
+            else:
+                throttled = isinstance(e, (ThrottledError, _import_httpx().TimeoutException))
+                await limiter.release(generation, throttled=throttled, retry_after=getattr(e, "retry_after", None))
+            raise
+        self._done(host, started)
+        if seen and seen[0].status_code in THROTTLE_STATUSES and not replaying:
+            await limiter.release(generation, throttled=True, retry_after=_retry_after(seen[0]))
+        else:
+            await limiter.release(generation, throttled=False, latency=time.monotonic() - started)
+
+    def _done(self, host: str, started: float) -> None:
+        now = time.monotonic()
+        self.latencies.setdefault(host, []).append(now - started)
+        self._in_flight -= 1
+        if self._in_flight == 0:
+            self.busy_seconds += now - self._busy_since
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        allow_redirects: bool = False,
+    ) -> httpx.Response:
+        host = (urlsplit(url).hostname or "").lower()
+        async with self._slot(host) as seen:
+            resp = await self._client(host).request(
+                method,
+                url,
+                params=params,
+                headers=headers,
+                timeout=timeout if timeout is not None else self.timeout,
+                follow_redirects=allow_redirects,
+            )
+            seen.append(resp)
+            return resp
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        allow_redirects: bool = False,
+    ) -> AsyncIterator[httpx.Response]:
+        """Like request(), but the body is read by the caller (``resp.aiter_bytes()``).
+
+        Leaving the block early closes the connection instead of draining the body.
+        Raising ThrottledError inside the block counts as a throttle for the host.
+        """
+        host = (urlsplit(url).hostname or "").lower()
+        async with self._slot(host) as seen:
+            async with self._client(host).stream(
+                method,
+                url,
+                params=params,
+                headers=headers,
+                timeout=timeout if timeout is not None else self.timeout,
+                follow_redirects=allow_redirects,
+            ) as resp:
+                seen.append(resp)
+                yield resp
+
+    async def get(self, url: str, *, allow_redirects: bool = True, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, allow_redirects=allow_redirects, **kwargs)
+
+    async def head(self, url: str, *, allow_redirects: bool = False, **kwargs: Any) -> httpx.Response:
+        return await self.request("HEAD", url, allow_redirects=allow_redirects, **kwargs)
+
+    async def aclose(self) -> None:
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+        if self.archive is not None:
+            self.archive.close()
+
+
+class SyncTransport:
+    """Blocking facade over AsyncTransport with its event loop on a daemon thread."""
+
+    def __init__(self, **kwargs: Any) -> None:
+        self.transport = AsyncTransport(**kwargs)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        """The transport's event loop, started on first use."""
+        with self._start_lock:
+            if self._loop is None:
+                import asyncio
+
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="http-transport", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro: Awaitable[T]) -> T:
+        """Run a coroutine on the transport's event loop and wait for its result."""
+        import asyncio
+
+        return asyncio.run_coroutine_threadsafe(coro, self._event_loop()).result()
+
+    def configure(
+        self,
+        *,
+        host_limits: Optional[Dict[str, int]] = None,
+        rate_limits: Optional[Dict[str, Tuple[int, float]]] = None,
+        host_overrides: Optional[Dict[str, str]] = None,
+        archive: Optional[HttpArchive] = None,
+    ) -> None:
+        """Override per-host limits (concurrency ceilings) and origins, or set the record/replay archive.
+
+        Call before the first request to those hosts.
+        """
+        if archive is not None:
+            self.transport.archive = archive
+            if archive.replaying:
+                set_backoff_scale(archive.timing)
+        if host_limits:
+            self.transport.host_limits.update(host_limits)
+        self.transport.host_overrides.update(host_overrides or {})
+        for host, rate in (rate_limits or {}).items():
+            self.transport.buckets[host] = TokenBucket(*rate)
+
+    def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.run(self.transport.get(url, **kwargs))
+
+    def head(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.run(self.transport.head(url, **kwargs))
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._loop is None:
+            # No request was ever made: no clients to close, only the archive.
+            if self.transport.archive is not None:
+                self.transport.archive.close()
+            return
+        try:
+            self.run(self.transport.aclose())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+
+_shared: Optional[SyncTransport] = None
+_shared_lock = threading.Lock()
+
+
+def shared_transport() -> SyncTransport:
+    """Process-wide SyncTransport, created on first use and closed at exit."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = SyncTransport()
+            atexit.register(_shared.close)
+        return _shared
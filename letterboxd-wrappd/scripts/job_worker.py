@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""Run a script's jobs in one long-lived process, fed line-delimited JSON.
+
+  python scripts/scrape_tmdb_ids.py --worker                            # jobs on stdin, events on stdout
+  python scripts/scrape_tmdb_ids.py --worker --socket /tmp/scrape.sock  # jobs over a Unix socket
+
+The process pays interpreter start-up, imports and cache opening once; the
+cache, its in-memory memo and the HTTP connection pools stay warm between
+jobs, and concurrent jobs share the transport's per-host limits.
+
+Requests, one JSON object per line:
+
+  {"id": "job-1", "args": ["--csv", "diary.csv", "--out", "/tmp/job-1.json", "--enrich-tmdb"]}
+  {"op": "ping"}
+  {"op": "shutdown"}        (on stdin, end of input does the same)
+
+``args`` are the script's usual command-line arguments. Everything sent back
+is a JSON line tagged with the job id: the events of ``--progress json``
+(phase_start, progress, phase_end, failures, summary; see
+progress_events.py), a "log" event per line the job printed, and last
+
+  {"event": "result", "job": "job-1", "exit": 0, "seconds": 1.82}
+
+with an "error" field when the job raised. Jobs run on a thread pool
+(``jobs`` at a time); the rest wait their turn. A shutdown lets running and
+queued jobs finish first.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import io
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import TYPE_CHECKING, Any, BinaryIO, Callable, List, Optional
+
+from progress_events import DEFAULT_PROGRESS_INTERVAL, ProgressReporter, ScopedProgress
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+DEFAULT_WORKER_JOBS = 4
+
+# The job whose thread (or HTTP coroutine) is running, for routing its output.
+_CURRENT_JOB: contextvars.ContextVar[Optional["_Job"]] = contextvars.ContextVar("current_job", default=None)
+
+
+class _Session:
+    """One client: a byte stream that JSON lines are written to, one whole line at a time."""
+
+    def __init__(self, out: BinaryIO) -> None:
+        self._out = out
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        data = text.encode("utf-8")
+        with self._lock:
+            try:
+                self._out.write(data)
+                self._out.flush()
+            except (BrokenPipeError, ConnectionResetError, ValueError):
+                pass  # the client went away; the job still finishes and fills the cache
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+    def send(self, event: dict[str, Any]) -> None:
+        self.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+class _Job:
+    def __init__(self, job_id: str, session: _Session) -> None:
+        self.id = job_id
+        self.session = session
+        self._partial = ""
+        self._lock = threading.Lock()
+
+    def log(self, text: str) -> None:
+        with self._lock:
+            lines = (self._partial + text).split("\n")
+            self._partial = lines.pop()
+        for line in lines:
+            if line.strip():
+                self.session.send({"event": "log", "job": self.id, "line": line})
+
+    def flush_log(self) -> None:
+        self.log("\n")
+
+
+class _RoutedOutput(io.TextIOBase):
+    """sys.stdout/sys.stderr stand-in: a job's prints become its "log" events."""
+
+    def __init__(self, fallback: Any) -> None:
+        self._fallback = fallback
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        job = _CURRENT_JOB.get()
+        if job is None:
+            return self._fallback.write(text)
+        job.log(text)
+        return len(text)
+
+    def flush(self) -> None:
+        if _CURRENT_JOB.get() is None:
+            self._fallback.flush()
+
+
+class JobWorker:
+    """Runs ``run_job(argv)`` for each request; ``progress`` is bound per job."""
+
+    def __init__(
+        self,
+        run_job: Callable[[List[str]], int],
+        *,
+        progress: ScopedProgress,
+        jobs: int = DEFAULT_WORKER_JOBS,
+        progress_interval: float = DEFAULT_PROGRESS_INTERVAL,
+        after_job: Optional[Callable[[], None]] = None,
+    ) -> None:
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.run_job = run_job
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.after_job = after_job
+        self._executor = ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="job")
+        self._stopping = threading.Event()
+
+    # -- one job -----------------------------------------------------------
+    def _run(self, job: _Job, argv: List[str]) -> None:
+        _CURRENT_JOB.set(job)
+        self.progress.bind(
+            ProgressReporter(job.session, fmt="json", interval=self.progress_interval, context={"job": job.id})
+        )
+        started = time.monotonic()
+        result: dict[str, Any] = {"event": "result", "job": job.id}
+        try:
+            result["exit"] = self.run_job(argv)
+        except SystemExit as e:  # argparse errors and explicit exits
+            result["exit"] = e.code if isinstance(e.code, int) else 1
+        except Exception as e:
+            traceback.print_exc()
+            result["exit"] = 1
+            result["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            if self.after_job is not None:
+                self.after_job()
+        job.flush_log()
+        result["seconds"] = round(time.monotonic() - started, 3)
+        job.session.send(result)
+
+    def submit(self, request: dict[str, Any], session: _Session) -> Optional[Future]:
+        """Handle one request line; returns the job's future, if it started one."""
+        op = request.get("op", "run")
+        if op == "ping":
+            session.send({"event": "pong", "pid": os.getpid()})
+            return None
+        if op == "shutdown":
+            self._stopping.set()
+            return None
+        job_id, args = request.get("id"), request.get("args")
+        if op != "run" or not isinstance(job_id, (str, int)) or not isinstance(args, list):
+            session.send({"event": "result", "job": job_id, "exit": 2, "error": f"Bad request: {request!r}"})
+            return None
+        job = _Job(str(job_id), session)
+        # A fresh context per job, so its output and progress stay its own
+        # (and follow it into the coroutines it hands to the HTTP loop).
+        return self._executor.submit(contextvars.Context().run, self._run, job, [str(a) for a in args])
+
+    def _read(self, lines: Any, session: _Session) -> List[Future]:
+        futures = []
+        for raw in lines:
+            line = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                session.send({"event": "result", "job": None, "exit": 2, "error": f"Bad request line: {e}"})
+                continue
+            future = self.submit(request, session)
+            if future is not None:
+                futures.append(future)
+            if self._stopping.is_set():
+                break
+        return futures
+
+    # -- transports --------------------------------------------------------
+    def serve_stdio(self) -> int:
+        """Read requests from stdin and answer on stdout until EOF or a shutdown request."""
+        session = _Session(sys.stdout.buffer)
+        self._route_output()
+        self._read(sys.stdin.buffer, session)
+        self._executor.shutdown(wait=True)
+        return 0
+
+    def serve_socket(self, path: str) -> int:
+        """Accept connections on a Unix socket at ``path``; each is a session like stdin/stdout."""
+        import socketserver
+
+        worker = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                session = _Session(self.wfile)
+                futures = worker._read(self.rfile, session)
+                for future in futures:
+                    future.result()  # keep the connection open until its jobs are done
+                if worker._stopping.is_set():
+                    threading.Thread(target=server.shutdown, daemon=True).start()
+
+        if os.path.exists(path):
+            os.unlink(path)  # a stale socket from a worker that didn't clean up
+        server = socketserver.ThreadingUnixStreamServer(path, Handler)
+        server.daemon_threads = True
+        self._route_output()
+        print(f"Worker listening on {path}", file=sys.stderr, flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            os.unlink(path)
+            self._executor.shutdown(wait=True)
+        return 0
+
+    @staticmethod
+    def _route_output() -> None:
+        sys.stdout = _RoutedOutput(sys.stderr)  # stdout carries the protocol; the worker's own prints go to stderr
+        sys.stderr = _RoutedOutput(sys.stderr)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Letterboxd page fetching shared by the enrichment scripts.
+
+resolve_shortlink() expands a boxd.it shortlink by reading the Location header
+of each redirect itself (HEAD, no redirect following) and stops at the first
+letterboxd.com/.../film/<slug>/ URL, so the film page is never downloaded.
+resolve_shortlinks() does the same for a batch, concurrently, retrying
+throttled requests with backoff. Callers cache a resolution only when
+is_film_url() holds: a link that ends on a 403/404 or a non-film page is
+retried next run rather than remembered.
+
+scan_tmdb_id() streams a film page and stops reading as soon as the
+themoviedb.org/movie/<id> link has gone by, instead of downloading and
+decoding the whole page. The scan works on raw bytes, carries a small overlap
+between chunks so links split across chunk boundaries are still found, raises
+CloudflareBlockedError on a challenge page (a ThrottledError, so the
+transport backs off letterboxd.com), and gives up after a byte cap.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Callable, Dict, Iterable, Optional
+from urllib.parse import urljoin
+
+from http_transport import DEFAULT_RETRIES, THROTTLE_STATUSES, AsyncTransport, ThrottledError, with_retries
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+}
+
+# Extract TMDb *movie* IDs embedded on Letterboxd pages.
+TMDB_MOVIE_RE = re.compile(rb"https?://(?:www\.)?themoviedb\.org/movie/(\d+)")
+
+# Canonical and user-scoped film URLs (the latter may carry a diary suffix).
+FILM_URL_RE = re.compile(r"https?://(?:www\.)?letterboxd\.com/(?:[^/]+/)?film/[^/?#]+")
+
+MAX_REDIRECT_HOPS = 5
+
+
+def is_film_url(url: str) -> bool:
+    """Whether a resolved shortlink reached a film page (only those are worth caching)."""
+    return bool(url and FILM_URL_RE.match(url))
+
+CLOUDFLARE_MARKERS = (b"Just a moment", b"cf-browser-verification", b"challenge-platform")
+
+# Bytes kept from the previous chunk; longer than any marker or TMDb link.
+SCAN_OVERLAP = 128
+
+# Film pages are a few hundred KB; stop well past that.
+SCAN_MAX_BYTES = 2 * 1024 * 1024
+
+
+class CloudflareBlockedError(ThrottledError):
+    """Raised when Cloudflare blocks the request with a challenge page."""
+    pass
+
+
+class TmdbLinkNotFoundError(ValueError):
+    """Raised when a film page has no TMDb movie link (TV entries, some shorts)."""
+    pass
+
+
+def _find_tmdb_id(window: bytes, *, final: bool) -> int | None:
+    m = TMDB_MOVIE_RE.search(window)
+    # A match touching the end of the window may still be missing digits.
+    if m and (final or m.end() < len(window)):
+        return int(m.group(1))
+    return None
+
+
+async def scan_tmdb_id(
+    transport: AsyncTransport,
+    film_url: str,
+    *,
+    timeout: float = 30,
+    max_bytes: int = SCAN_MAX_BYTES,
+) -> int:
+    """Return the TMDb movie ID linked from a Letterboxd film page, reading as little as possible.
+
+    Raises:
+        httpx.HTTPStatusError: if the page request fails
+        CloudflareBlockedError: if a Cloudflare challenge shows up before the link
+        TmdbLinkNotFoundError: if no TMDb movie link appears within ``max_bytes``
+    """
+    async with transport.stream("GET", film_url, headers=HEADERS, timeout=timeout, allow_redirects=True) as resp:
+        resp.raise_for_status()
+        tail = b""
+        read = 0
+        async for chunk in resp.aiter_bytes():
+            read += len(chunk)
+            window = tail + chunk
+            if any(marker in window for marker in CLOUDFLARE_MARKERS):
+                raise CloudflareBlockedError(f"Cloudflare blocked request to {film_url}")
+            tmdb_id = _find_tmdb_id(window, final=False)
+            if tmdb_id is not None:
+                return tmdb_id
+            if read >= max_bytes:
+                raise TmdbLinkNotFoundError(f"TMDb movie link not found in first {max_bytes} bytes of page")
+            tail = window[-SCAN_OVERLAP:]
+        tmdb_id = _find_tmdb_id(tail, final=True)
+        if tmdb_id is not None:
+            return tmdb_id
+    raise TmdbLinkNotFoundError("TMDb movie link not found in page HTML")
+
+
+async def resolve_shortlink(
+    transport: AsyncTransport,
+    url: str,
+    *,
+    timeout: float = 30,
+    max_hops: int = MAX_REDIRECT_HOPS,
+) -> str:
+    """Follow redirects from ``url`` one hop at a time until a film URL is reached.
+
+    Returns the first letterboxd.com film URL seen, or the last URL reached when
+    the chain ends elsewhere (e.g. a list shortlink) or runs out of hops.
+    Raises httpx.HTTPStatusError on a 429 or 5xx, so callers can retry.
+    """
+    current = url
+    for _ in range(max_hops):
+        if FILM_URL_RE.match(current):
+            return current
+        resp = await transport.head(current, headers=HEADERS, timeout=timeout)
+        status, location = resp.status_code, resp.headers.get("location")
+        if status in (405, 501):
+            # HEAD not supported: take the headers of a GET and drop the body unread.
+            async with transport.stream("GET", current, headers=HEADERS, timeout=timeout) as resp:
+                status, location = resp.status_code, resp.headers.get("location")
+        if status in THROTTLE_STATUSES:
+            resp.raise_for_status()  # not the end of the chain: let with_retries try again
+        if not (300 <= status < 400 and location):
+            return current
+        current = urljoin(current, location)
+    return current
+
+
+async def resolve_shortlinks(
+    transport: AsyncTransport,
+    urls: Iterable[str],
+    *,
+    timeout: float = 30,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    retries: int = DEFAULT_RETRIES,
+) -> Dict[str, str]:
+    """Resolve many shortlinks concurrently. Returns {shortlink: url}; failures are left out."""
+    import asyncio
+
+    pending = list(dict.fromkeys(urls))
+    resolved: Dict[str, str] = {}
+
+    async def one(u: str) -> tuple[str, Optional[str]]:
+        try:
+            return u, await with_retries(lambda: resolve_shortlink(transport, u, timeout=timeout), retries=retries)
+        except Exception:
+            return u, None
+
+    for done, future in enumerate(asyncio.as_completed([one(u) for u in pending]), start=1):
+        u, final = await future
+        if final:
+            resolved[u] = final
+        if on_progress is not None:
+            on_progress(done, len(pending))
+    return resolved
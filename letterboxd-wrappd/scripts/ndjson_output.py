@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Line-delimited JSON output for scrape_tmdb_ids.py and enrich_critics_list.py.
+
+With ``--format ndjson`` each film is written as one line as soon as it is
+finished, and a trailer line closes the file:
+
+  {"type": "film", "film": {...}}
+  {"type": "film", "film": {...}}
+  {"type": "trailer", "count": 2, "uriMap": {...}}
+
+Films arrive in completion order, not sorted. A file without a trailer line is
+from a run that is still going (or died). The default output stays a single
+JSON document.
+
+The scripts don't keep a film once its line is written, so a streamed run's
+memory doesn't grow with its output. read_ndjson() reads a file back (what
+scrape_tmdb_ids.py --previous does with one), including a partial one: the
+films written so far, and no trailer.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+OUTPUT_FORMATS = ("json", "ndjson")
+
+
+class NdjsonWriter:
+    """Append film records to a line-buffered file, one JSON object per line."""
+
+    def __init__(self, path: str | Path) -> None:
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(p, "w", encoding="utf-8", buffering=1)
+        self.count = 0
+
+    def write_film(self, film: dict) -> None:
+        self._f.write(json.dumps({"type": "film", "film": film}, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self, **trailer: Any) -> None:
+        self._f.write(json.dumps({"type": "trailer", "count": self.count, **trailer}, ensure_ascii=False) + "\n")
+        self._f.close()
+
+
+def read_ndjson(path: str | Path) -> Tuple[List[dict], Optional[dict]]:
+    """Return (films, trailer) from an NDJSON output; trailer is None if the run didn't finish.
+
+    Raises ValueError if a line other than a cut-off last one isn't a record of this format.
+    """
+    films: List[dict] = []
+    trailer: Optional[dict] = None
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                if not line.endswith("\n"):  # the last line of a run that was killed mid-write
+                    break
+                raise
+            if not isinstance(record, dict) or record.get("type") not in ("film", "trailer"):
+                raise ValueError(f"{path}:{number}: not an NDJSON output record")
+            if record["type"] == "film":
+                films.append(record["film"])
+            else:
+                trailer = record
+    return films, trailer
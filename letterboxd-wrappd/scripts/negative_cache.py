@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Negative cache: remember lookups that failed, and for how long to believe it.
+
+Failures are stored in the ``failures`` namespace of the script's cache, keyed
+by "<scope>:<key>" (e.g. "scrape:https://letterboxd.com/film/x/", "tmdb:123"):
+
+  {"kind": "not_found", "error": "...", "expires_at": 1767225600.0}
+
+The kind decides the TTL. A film page without a TMDb link or a TMDb 404 won't
+change soon; a Cloudflare challenge, a timeout, a 5xx or a dropped connection
+says nothing about the film. Exceptions that aren't HTTP failures (a bug, a
+bad argument) aren't cached at all.
+
+  failures = NegativeCache(cache)
+  hit = failures.get("scrape", url)
+  if hit:
+      data["tmdb_error"] = hit["error"]
+  ...
+  except Exception as e:
+      failures.record("scrape", url, e)
+"""
+
+from __future__ import annotations
+
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from http_transport import ThrottledError
+from letterboxd_client import TmdbLinkNotFoundError
+
+NEGATIVE_NAMESPACE = "failures"
+
+DAY = 24 * 60 * 60
+
+# Seconds a failure of each kind is trusted before the lookup is tried again.
+FAILURE_TTLS: Dict[str, float] = {
+    "not_found": 30 * DAY,
+    "blocked": 60 * 60,
+    "timeout": 15 * 60,
+    "unavailable": 15 * 60,
+    "error": 6 * 60 * 60,
+}
+
+
+def classify_failure(exc: BaseException) -> Optional[str]:
+    """Map an exception to a failure kind, or None if it says nothing about the item.
+
+    Auth errors (401/403) are about the API key, not the film, so they are never
+    cached, and neither is anything that isn't an HTTP failure, nor a replayed
+    request the HTTP archive has no response for.
+    """
+    if isinstance(exc, TmdbLinkNotFoundError):
+        return "not_found"
+    if isinstance(exc, ThrottledError):
+        return "blocked"
+    import httpx
+    from http_archive import ArchiveMissError
+
+    if isinstance(exc, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        if status in (401, 403):
+            return None
+        if status in (404, 410):
+            return "not_found"
+        if status == 429:
+            return "blocked"
+        if status >= 500:
+            return "unavailable"
+        return "error"
+    if isinstance(exc, httpx.TransportError):
+        return "unavailable"
+    if isinstance(exc, ArchiveMissError):
+        return None  # a replayed request the archive doesn't have says nothing about the film
+    if isinstance(exc, httpx.RequestError):
+        return "error"
+    return None
+
+
+class NegativeCache:
+    """Typed, expiring failure records on top of a CacheStore (or cache dict)."""
+
+    def __init__(self, cache: Any, *, ttls: Optional[Dict[str, float]] = None, enabled: bool = True) -> None:
+        self._entries = cache[NEGATIVE_NAMESPACE] if cache is not None else {}
+        self.ttls = {**FAILURE_TTLS, **(ttls or {})}
+        self.enabled = enabled
+        self.skipped = 0
+        self.recorded: Counter[str] = Counter()
+
+    def get(self, scope: str, key: Any) -> Optional[dict]:
+        """Return the unexpired failure recorded for ``key``, or None."""
+        if not self.enabled:
+            return None
+        entry = self._entries.get(f"{scope}:{key}")
+        if not isinstance(entry, dict) or entry.get("expires_at", 0) <= time.time():
+            return None
+        self.skipped += 1
+        return entry
+
+    def record(self, scope: str, key: Any, exc: BaseException) -> Optional[dict]:
+        kind = classify_failure(exc)
+        if kind is None:
+            return None
+        return self.record_kind(scope, key, kind, str(exc))
+
+    def record_kind(self, scope: str, key: Any, kind: str, error: str) -> dict:
+        """Record a failure that isn't an exception (e.g. a search with no match)."""
+        entry = {"kind": kind, "error": error, "expires_at": time.time() + self.ttls[kind]}
+        self.recorded[kind] += 1
+        self._entries[f"{scope}:{key}"] = entry
+        return entry
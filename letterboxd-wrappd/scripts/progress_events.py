@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Progress reporting on stderr: the legacy PHASE/PROGRESS lines, or JSON events.
+
+legacy (default) writes what server.mjs has always parsed, one flushed line
+per item:
+
+  PHASE resolve
+  PROGRESS 12 340
+
+json writes one JSON object per line instead. Progress is throttled to one
+event per ``interval`` seconds (plus the last item of each phase), and the run
+ends with a summary:
+
+  {"event": "phase_start", "phase": "resolve", "t": 0.412}
+  {"event": "progress", "phase": "resolve", "done": 120, "total": 340, "rate": 41.2, "eta": 5.3, "t": 3.325}
+  {"event": "phase_end", "phase": "resolve", "seconds": 8.26, "items": 340, "t": 8.672}
+  {"event": "failures", "skipped": 3, "recorded": {"not_found": 2, "timeout": 1}, "t": 30.101}
+  {"event": "summary", "elapsed": 31.2, "phases": {"resolve": 8.26, ...},
+   "cache": {"film_to_tmdb": {"hits": 310, "misses": 30, "hit_ratio": 0.912, "writes": 30}, ...},
+   "retries": {"http_429": 4, "ConnectTimeout": 1},
+   "startup": {"imports": 0.031, "cache_open": 0.004}, "t": 31.2}
+
+A cache namespace's stats carry ``load_seconds`` once the run has loaded it.
+
+``t`` is seconds since the reporter was created. Other stderr output (warnings,
+"Loaded N films") stays plain text in both formats. ``context`` fields are
+added to every JSON event (the worker tags events with their job id).
+
+A ScopedProgress stands in for a module-level reporter: calls go to the
+reporter bound in the current context, so concurrent jobs of one worker
+process (job_worker.py) each report on their own stream.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, TextIO
+
+PROGRESS_FORMATS = ("legacy", "json")
+DEFAULT_PROGRESS_INTERVAL = 0.5
+
+
+class ProgressReporter:
+    def __init__(
+        self,
+        stream: Optional[TextIO] = None,
+        *,
+        fmt: str = "legacy",
+        interval: float = DEFAULT_PROGRESS_INTERVAL,
+        context: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self._stream = stream
+        self.fmt = fmt
+        self.interval = interval
+        self.context = context or {}
+        self._started = time.monotonic()
+        self._phase: Optional[str] = None
+        self._phase_started = self._started
+        self._phase_items = 0
+        self._last_progress = 0.0
+        self.phase_seconds: Dict[str, float] = {}
+
+    def configure(self, *, fmt: Optional[str] = None, interval: Optional[float] = None) -> None:
+        if fmt is not None:
+            if fmt not in PROGRESS_FORMATS:
+                raise ValueError(f"Unknown progress format {fmt!r} (expected one of {', '.join(PROGRESS_FORMATS)})")
+            self.fmt = fmt
+        if interval is not None:
+            self.interval = interval
+
+    @property
+    def stream(self) -> TextIO:
+        return self._stream or sys.stderr
+
+    def _write(self, line: str) -> None:
+        self.stream.write(line + "\n")
+        self.stream.flush()
+
+    def emit(self, event: str, **fields: Any) -> None:
+        """Write a JSON event (no-op in legacy format)."""
+        if self.fmt != "json":
+            return
+        fields["t"] = round(time.monotonic() - self._started, 3)
+        self._write(json.dumps({"event": event, **self.context, **fields}, ensure_ascii=False))
+
+    def _end_phase(self) -> None:
+        if self._phase is None:
+            return
+        seconds = time.monotonic() - self._phase_started
+        self.phase_seconds[self._phase] = self.phase_seconds.get(self._phase, 0.0) + seconds
+        self.emit("phase_end", phase=self._phase, seconds=round(seconds, 3), items=self._phase_items)
+        self._phase = None
+
+    def phase(self, name: str) -> None:
+        """Start a phase (ending the current one)."""
+        self._end_phase()
+        self._phase = name
+        self._phase_started = time.monotonic()
+        self._phase_items = 0
+        self._last_progress = 0.0
+        if self.fmt == "json":
+            self.emit("phase_start", phase=name)
+        else:
+            self._write(f"PHASE {name}")
+
+    def progress(self, done: int, total: int) -> None:
+        self._phase_items = done
+        if self.fmt != "json":
+            self._write(f"PROGRESS {done} {total}")
+            return
+        now = time.monotonic()
+        if done < total and now - self._last_progress < self.interval:
+            return
+        self._last_progress = now
+        elapsed = now - self._phase_started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (total - done) / rate if rate > 0 else None
+        self.emit(
+            "progress",
+            phase=self._phase,
+            done=done,
+            total=total,
+            rate=round(rate, 2),
+            eta=None if eta is None else round(eta, 1),
+        )
+
+    def finish(self, **fields: Any) -> None:
+        """End the current phase and emit the summary (per-phase timings plus ``fields``)."""
+        self._end_phase()
+        self.emit(
+            "summary",
+            elapsed=round(time.monotonic() - self._started, 3),
+            phases={name: round(seconds, 3) for name, seconds in self.phase_seconds.items()},
+            **fields,
+        )
+
+
+class ScopedProgress:
+    """A ProgressReporter stand-in that forwards to the reporter bound in the current context."""
+
+    def __init__(self, default: ProgressReporter) -> None:
+        self.default = default
+        self._bound: ContextVar[Optional[ProgressReporter]] = ContextVar("progress_reporter", default=None)
+
+    def bind(self, reporter: ProgressReporter) -> None:
+        """Send this context's calls (and those of tasks started from it) to ``reporter``."""
+        self._bound.set(reporter)
+
+    @property
+    def current(self) -> ProgressReporter:
+        return self._bound.get() or self.default
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.current, name)
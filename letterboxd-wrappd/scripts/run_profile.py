@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Where did the time go? A report for --profile runs of the enrichment scripts.
+
+  PROFILE = RunProfiler()
+  PROFILE.start(transport=HTTP, cprofile_path=args.profile_cprofile)
+  with PROFILE.phase("write_output"):
+      ...
+  PROFILE.sleep(args.sleep)          # a deliberate pause, counted as such
+  PROFILE.write_report(args.profile)
+
+The report has:
+- wall time per phase (the script's own phases plus cache and output I/O)
+- per-host request latency: count, p50/p90/p99/max and a histogram
+- wall vs CPU time vs network (time with a request in flight) vs deliberate
+  waits: --sleep pauses, retry backoff, rate-limit and host-limit queues
+  (the async waits are summed over concurrent requests, so they can exceed
+  wall time)
+- peak traced memory (tracemalloc), and with a cProfile path the hottest
+  functions of the main and transport threads
+
+Phase timing and sleep accounting cost nothing when --profile is off;
+tracemalloc and cProfile only run after start(), and cProfile/pstats are
+only imported then.
+"""
+
+from __future__ import annotations
+
+import io
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+from http_transport import RETRY_COUNTS, WAIT_SECONDS
+
+if TYPE_CHECKING:
+    import cProfile
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open.
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+TOP_FUNCTIONS = 25
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def latency_histogram(latencies: List[float]) -> List[tuple[str, int]]:
+    counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    for seconds in latencies:
+        ms = seconds * 1000
+        i = 0
+        while i < len(LATENCY_BUCKETS_MS) and ms > LATENCY_BUCKETS_MS[i]:
+            i += 1
+        counts[i] += 1
+    labels = [f"<={b}ms" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+    return list(zip(labels, counts))
+
+
+class RunProfiler:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.phase_seconds: Dict[str, float] = {}
+        self.sleep_seconds = 0.0
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        self._transport: Any = None
+        self._profiles: List[cProfile.Profile] = []
+        self._cprofile_path: Optional[str] = None
+
+    def start(self, *, transport: Any = None, cprofile_path: Optional[str] = None) -> None:
+        """Turn on memory tracing (and cProfile) and reset the clocks.
+
+        ``transport`` is the SyncTransport whose latencies go in the report;
+        with ``cprofile_path`` its event loop thread is profiled too.
+        """
+        self.enabled = True
+        self._transport = transport
+        self._cprofile_path = cprofile_path
+        tracemalloc.start()
+        if cprofile_path:
+            import cProfile
+
+            main = cProfile.Profile()
+            main.enable()
+            self._profiles.append(main)
+            if transport is not None:
+                loop_profile = cProfile.Profile()
+
+                async def enable() -> None:
+                    loop_profile.enable()
+
+                transport.run(enable())
+                self._profiles.append(loop_profile)
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + time.perf_counter() - started
+
+    def sleep(self, seconds: float) -> None:
+        """time.sleep(), counted as a deliberate wait."""
+        if seconds > 0:
+            time.sleep(seconds)
+            self.sleep_seconds += seconds
+
+    def _stop_cprofile(self) -> str:
+        if not self._profiles:
+            return ""
+        main, *others = self._profiles
+        main.disable()
+        for profile in others:
+
+            async def disable(p: cProfile.Profile = profile) -> None:
+                p.disable()
+
+            self._transport.run(disable())
+        import pstats
+
+        stats = pstats.Stats(main)
+        for profile in others:
+            stats.add(profile)
+        stats.dump_stats(self._cprofile_path)
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats("tottime").print_stats(TOP_FUNCTIONS)
+        self._profiles = []
+        return out.getvalue()
+
+    def report(self, *, phases: Optional[Dict[str, float]] = None) -> str:
+        """Stop tracing and return the report text. ``phases`` adds phase timings kept elsewhere."""
+        wall = time.perf_counter() - self._started
+        cpu = time.process_time() - self._cpu_started
+        peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        hot = self._stop_cprofile()
+        transport = getattr(self._transport, "transport", None)
+
+        lines = ["== Run profile ==", f"wall {wall:.2f}s"]
+        all_phases = {**(phases or {}), **self.phase_seconds}
+        if all_phases:
+            lines.append("")
+            lines.append("Phases (wall seconds)")
+            for name, seconds in all_phases.items():
+                lines.append(f"  {name:<28} {seconds:>9.2f}  {100 * seconds / wall if wall else 0:5.1f}%")
+
+        lines.append("")
+        lines.append("Time")
+        lines.append(f"  {'CPU (all threads)':<28} {cpu:>9.2f}")
+        if transport is not None:
+            lines.append(f"  {'network (request in flight)':<28} {transport.busy_seconds:>9.2f}")
+        lines.append(f"  {'--sleep pauses':<28} {self.sleep_seconds:>9.2f}")
+        for reason in ("retry_backoff", "rate_limit", "host_limit"):
+            lines.append(f"  {reason + ' waits (summed)':<28} {WAIT_SECONDS[reason]:>9.2f}")
+        if RETRY_COUNTS:
+            retries = ", ".join(f"{reason} x{n}" for reason, n in RETRY_COUNTS.most_common())
+            lines.append(f"  retries: {retries}")
+
+        if transport is not None and transport.latencies:
+            lines.append("")
+            lines.append("Request latency by host")
+            for host, latencies in sorted(transport.latencies.items()):
+                values = sorted(latencies)
+                lines.append(
+                    f"  {host}: {len(values)} requests, p50 {_percentile(values, 0.5) * 1000:.0f}ms, "
+                    f"p90 {_percentile(values, 0.9) * 1000:.0f}ms, p99 {_percentile(values, 0.99) * 1000:.0f}ms, "
+                    f"max {values[-1] * 1000:.0f}ms, total {sum(values):.1f}s"
+                )
+                histogram = latency_histogram(values)
+                widest = max(count for _, count in histogram) or 1
+                for label, count in histogram:
+                    if count:
+                        lines.append(f"    {label:>9} {count:>7} {'#' * max(1, round(40 * count / widest))}")
+
+        if peak is not None:
+            lines.append("")
+            lines.append(f"Peak traced memory {peak / (1024 * 1024):.1f} MB")
+        if hot:
+            lines.append("")
+            lines.append(f"Hot functions (cProfile, full dump in {self._cprofile_path})")
+            lines.append(hot.strip("\n"))
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path: str, *, phases: Optional[Dict[str, float]] = None) -> None:
+        """Write the report to ``path`` ("-" for stderr)."""
+        text = self.report(phases=phases)
+        if path == "-":
+            sys.stderr.write(text)
+            sys.stderr.flush()
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            print(f"Wrote profile report -> {path}", file=sys.stderr)
@@ -7,11 +7,7 @@ import sys
 from typing import List, Optional, Tuple
 from urllib.parse import urljoin
 
-try:
-    import requests
-except Exception:
-    print("Missing dependency: requests. Install with: pip install requests", file=sys.stderr)
-    raise
+from http_transport import shared_transport
 
 try:
     from bs4 import BeautifulSoup
@@ -80,7 +76,6 @@ def fetch(url: str) -> str:
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
         "Accept-Language": "en-US,en;q=0.9",
-        "Accept-Encoding": "gzip, deflate, br",
         "Connection": "keep-alive",
         "Upgrade-Insecure-Requests": "1",
         "Sec-Fetch-Dest": "document",
@@ -89,7 +84,7 @@ def fetch(url: str) -> str:
         "Sec-Fetch-User": "?1",
         "Cache-Control": "max-age=0",
     }
-    resp = requests.get(url, headers=headers, timeout=30)
+    resp = shared_transport().get(url, headers=headers, timeout=30)
     resp.raise_for_status()
     return resp.text
 
@@ -13,9 +13,38 @@ Inputs
 - --uri-column NAME (optional): the column name that contains the Letterboxd film URL.
   If omitted, the script will try a few common column names and also fall back to
   scanning for any cell that looks like a Letterboxd film URL.
+- --previous PATH (optional): an earlier --out file (JSON or NDJSON) for the same diary. Its
+  uriMap and finished entries are reused, so only newly added rows are resolved and enriched.
+- Rows that share a normalized Name/Year (a diary's rewatches, each with its own boxd.it
+  shortlink) have one shortlink resolved for the group. --verify-title-groups N spot-checks
+  N groups by resolving a second shortlink; --no-title-groups resolves every one.
+- --list KEY=PATH (optional, repeatable): a Letterboxd list CSV; each film on it gets
+  lists[KEY] = its rank. A bare KEY (or --curated-lists for all of them) loads a curated
+  export from public/ (build_curated_lists.LISTS). The lists are resolved together, each
+  URL once, and memberships attached in one pass. --criterion-list and --black-director-list
+  load the keys "criterion" and "black-directors", which also set is_in_criterion_collection
+  and is_by_black_director.
+- --tmdb-resolver hybrid (optional, needs --tmdb-api-key): look each film's TMDb ID up by
+  the CSV's Name/Year columns with the TMDb search API first, and scrape the Letterboxd
+  page only when no result matches confidently (exact title and year, or year one off,
+  and no tie) or the search fails. Each entry's tmdb_source says which path found its ID.
 
 Outputs
 - --out PATH: JSON file containing a dict keyed by letterboxd_url
+- --format ndjson (optional): write one film per line as each finishes instead,
+  followed by a trailer line carrying uriMap (see ndjson_output.py). A film is dropped
+  from memory once written.
+- --progress json (optional): report progress on stderr as JSON events with rates,
+  ETA, cache hit ratios, retries and per-phase timings instead of PHASE/PROGRESS
+  lines (see progress_events.py)
+- --profile PATH (optional): write a report of phase timings, per-host request latency,
+  CPU/network/wait time and peak memory when the run ends (see run_profile.py)
+
+Worker mode
+- --worker: stay running and take jobs (this script's usual arguments) as JSON lines on
+  stdin, or on a Unix socket with --socket PATH; see job_worker.py. The worker's own
+  --cache, limits and HTTP archive apply to every job, and the cache and retry counts
+  in each job's summary are worker-wide.
 
 Example
   python scripts/scrape_tmdb_ids.py --csv diary.csv --out movies.json --enrich-tmdb
@@ -28,73 +57,87 @@ Then in Python:
 
 from __future__ import annotations
 
+import time
+
+_IMPORTS_STARTED = time.perf_counter()
+
 import argparse
 import csv
+import hashlib
 import json
 import re
 import sys
-import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, Iterable, List, Optional, Set
+from typing import Callable, Dict, Iterable, List, Optional, Set
 import os
 from pathlib import Path
 from typing import Any
-import requests
 
-SESSION = requests.Session()
+from build_curated_lists import LISTS as CURATED_LISTS, PUBLIC_DIR
+from cache_store import (
+    CODECS,
+    DEFAULT_CHECKPOINT_EVERY,
+    DEFAULT_CHECKPOINT_SECONDS,
+    DEFAULT_NAMESPACES,
+    LEGACY_CACHE_FILES,
+    CacheStore,
+    open_cache,
+    resolve_cache_path,
+)
+from http_transport import DEFAULT_RETRIES, RETRY_COUNTS, parse_host_limits, parse_rate, shared_transport, with_retries
+from job_worker import DEFAULT_WORKER_JOBS, JobWorker
+from letterboxd_client import CloudflareBlockedError, is_film_url, resolve_shortlink, scan_tmdb_id
+from negative_cache import NegativeCache
+from ndjson_output import OUTPUT_FORMATS, NdjsonWriter, read_ndjson
+from progress_events import DEFAULT_PROGRESS_INTERVAL, PROGRESS_FORMATS, ProgressReporter, ScopedProgress
+from run_profile import RunProfiler
+from tmdb_client import (
+    SEARCH_MIN_CONFIDENCE,
+    build_tmdb_data,
+    cached_search_id,
+    fetch_movie,
+    is_complete_tmdb_data,
+    match_search_result,
+    normalize_title,
+    search_cache_entry,
+    search_movie,
+)
+
+# This module's own imports, for the startup timings in the summary. The HTTP
+# stack (httpx, asyncio, the event loop thread) only loads on the first request.
+IMPORT_SECONDS = time.perf_counter() - _IMPORTS_STARTED
+
+HTTP = shared_transport()
+# Per job under --worker (see job_worker.py)
+PROGRESS = ScopedProgress(ProgressReporter())
+PROFILE = RunProfiler()
 
 # -----------------
 # Persistent caching
 # -----------------
-CACHE_VERSION = 1
-
-def load_cache(path: str) -> dict[str, Any]:
-    p = Path(path)
-    try:
-        if not p.exists():
-            return {
-                "version": CACHE_VERSION,
-                "shortlink_to_film": {},
-                "film_to_tmdb": {},
-                "list_cache": {},
-                "tmdb_movie_data": {},
-            }
-        data = json.loads(p.read_text(encoding="utf-8"))
-        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
-            return {
-                "version": CACHE_VERSION,
-                "shortlink_to_film": {},
-                "film_to_tmdb": {},
-                "list_cache": {},
-                "tmdb_movie_data": {},
-            }
-        data.setdefault("shortlink_to_film", {})
-        data.setdefault("film_to_tmdb", {})
-        data.setdefault("list_cache", {})
-        data.setdefault("tmdb_movie_data", {})
-        return data
-    except Exception:
-        return {
-            "version": CACHE_VERSION,
-            "shortlink_to_film": {},
-            "film_to_tmdb": {},
-            "list_cache": {},
-            "tmdb_movie_data": {},
-        }
-
-def save_cache(path: str, cache: dict[str, Any]) -> None:
-    p = Path(path)
-    p.parent.mkdir(parents=True, exist_ok=True)
-    tmp = p.with_suffix(p.suffix + ".tmp")
-    tmp.write_text(json.dumps(cache, ensure_ascii=False, indent=2), encoding="utf-8")
-    os.replace(tmp, p)
-
-
-# Helper to compute a stable cache key for a list CSV.
+# One schema for every script (see cache_store.py)
+CACHE_NAMESPACES = DEFAULT_NAMESPACES
+
+# How a film's TMDb ID was found (its tmdb_source): --tmdb-resolver picks
+# whether the title search is tried before the page scrape.
+SOURCE_SCRAPE = "letterboxd_scrape"
+SOURCE_SEARCH = "csv_title_search"
+TMDB_RESOLVERS = ("scrape", "hybrid")
+
+# Lists whose members also get a flag of their own (--criterion-list and
+# --black-director-list load these keys).
+LIST_FLAGS = {"criterion": "is_in_criterion_collection", "black-directors": "is_by_black_director"}
+
+
+# Helpers to compute cache keys for a list CSV.
+#
+# list_cache entries ({resolved_urls, ranks}) are stored under a digest of the list's
+# ranked URLs, so the same list
+# uploaded to a fresh temp path (a new copy per job) still hits. The path + mtime key
+# is kept as a fast check: it points at the content key and avoids re-reading the CSV.
 def _list_cache_key(list_csv_path: str, uri_column: Optional[str]) -> str:
-    """Build a stable cache key for a list CSV.
+    """Build the path-based fast-check key for a list CSV.
 
-    We include the resolved absolute path + mtime so edits to the list file invalidate the cache.
+    We include the resolved absolute path + mtime so edits to the list file invalidate it.
     We include uri_column because it changes how URLs are extracted.
     """
     try:
@@ -104,8 +147,22 @@ def _list_cache_key(list_csv_path: str, uri_column: Optional[str]) -> str:
     except Exception:
         return f"{list_csv_path}|{uri_column or ''}"
 
-# Extract TMDb *movie* IDs embedded on Letterboxd pages.
-TMDB_MOVIE_RE = re.compile(r"https?://(?:www\.)?themoviedb\.org/movie/(\d+)")
+
+def _list_content_key(raw_urls: Iterable[str]) -> str:
+    """Build the content key for a list: a digest of its entries, each given as "<rank>\t<URL>".
+
+    The entries are deduplicated and sorted before hashing, so the order they
+    are passed in doesn't change the key; a changed rank or URL does.
+    """
+    digest = hashlib.sha256("\n".join(sorted(set(raw_urls))).encode("utf-8")).hexdigest()
+    return f"sha256:{digest}"
+
+
+def _cached_list_ranks(entry: Any) -> Optional[Dict[str, int]]:
+    """A list_cache entry's {film slug: rank}; None for a miss (or an entry from before ranks were kept)."""
+    if isinstance(entry, dict) and isinstance(entry.get("ranks"), dict):
+        return {str(slug): int(rank) for slug, rank in entry["ranks"].items()}
+    return None
 
 # Matches canonical film URLs and user-scoped film URLs:
 # - https://letterboxd.com/film/<slug>/
@@ -125,6 +182,12 @@ def normalize_letterboxd_url(url: str) -> str:
         url += "/"
     return url
 
+def film_slug(url: str) -> str:
+    """The <slug> of a canonical https://letterboxd.com/film/<slug>/ URL ("" for anything else)."""
+    m = re.match(r"https?://letterboxd\.com/film/([^/]+)/", url)
+    return m.group(1) if m else ""
+
+
 def canonicalize_letterboxd_film_url(url: str) -> str:
     """Convert user-scoped film URLs to canonical /film/<slug>/ URLs.
 
@@ -138,7 +201,9 @@ def canonicalize_letterboxd_film_url(url: str) -> str:
     slug = m.group(1)
     return f"https://letterboxd.com/film/{slug}/"
 
-def resolve_letterboxd_film_url(url: str, *, timeout: int = 30, cache: dict[str, Any] | None = None) -> str:
+async def resolve_letterboxd_film_url(
+    url: str, *, timeout: int = 30, cache: CacheStore | None = None, retries: int = DEFAULT_RETRIES
+) -> str:
     """Return a normalized letterboxd.com/film/... URL.
 
     Accepts either a full film URL or a boxd.it shortlink.
@@ -149,7 +214,7 @@ def resolve_letterboxd_film_url(url: str, *, timeout: int = 30, cache: dict[str,
 
     # Expand short links.
     if "boxd.it/" in url:
-        url = expand_boxd_shortlink(url, timeout=timeout, cache=cache)
+        url = await expand_boxd_shortlink(url, timeout=timeout, cache=cache, retries=retries)
 
     # Normalize and canonicalize to /film/<slug>/
     url = normalize_letterboxd_url(url)
@@ -158,69 +223,54 @@ def resolve_letterboxd_film_url(url: str, *, timeout: int = 30, cache: dict[str,
     return url
 
 
-class CloudflareBlockedError(Exception):
-    """Raised when Cloudflare blocks the request with a challenge page."""
-    pass
-
-
-def fetch_html(url: str, *, timeout: int = 30) -> str:
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-    }
-    resp = SESSION.get(url, headers=headers, timeout=timeout)
-    resp.raise_for_status()
-    html = resp.text
-
-    # Detect Cloudflare challenge page
-    if "Just a moment" in html or "cf-browser-verification" in html or "challenge-platform" in html:
-        raise CloudflareBlockedError(f"Cloudflare blocked request to {url}")
+def cached_film_url(url: str, cache: CacheStore | None) -> Optional[str]:
+    """What resolve_letterboxd_film_url would return, if it needs no request; else None."""
+    url = url.strip()
+    if "boxd.it/" in url:
+        cached = cache.get("shortlink_to_film", {}).get(url) if cache is not None else None
+        if not (isinstance(cached, str) and is_film_url(cached)):
+            return None
+        url = cached
+    if not url:
+        return url
+    return canonicalize_letterboxd_film_url(normalize_letterboxd_url(url))
 
-    return html
 
+async def expand_boxd_shortlink(
+    url: str, *, timeout: int = 30, cache: CacheStore | None = None, retries: int = DEFAULT_RETRIES
+) -> str:
+    """Resolve https://boxd.it/... to its Letterboxd film URL from the redirect headers.
 
-def expand_boxd_shortlink(url: str, *, timeout: int = 30, cache: dict[str, Any] | None = None) -> str:
-    """Resolve https://boxd.it/... to its final Letterboxd URL via redirects."""
+    Throttled requests are retried with backoff up to ``retries`` times; if
+    they keep failing the shortlink is returned as-is and not cached. A chain
+    that ends anywhere but a film page is returned but not cached either.
+    """
     if cache is not None:
         cached = cache.get("shortlink_to_film", {}).get(url)
-        if isinstance(cached, str) and cached:
+        if isinstance(cached, str) and is_film_url(cached):
             return cached
-    # Prefer HEAD (lighter), but fall back to GET because some sites don't fully support HEAD.
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-    }
     try:
-        resp = SESSION.head(url, headers=headers, timeout=timeout, allow_redirects=True)
-        final_url = resp.url
-        if final_url:
-            if cache is not None:
-                cache["shortlink_to_film"][url] = final_url
-            return final_url
+        final_url = await with_retries(lambda: resolve_shortlink(HTTP.transport, url, timeout=timeout), retries=retries)
     except Exception:
-        pass
-
-    resp = SESSION.get(url, headers=headers, timeout=timeout, allow_redirects=True)
-    final_url = resp.url
-    if cache is not None and final_url:
+        return url
+    if cache is not None and is_film_url(final_url):
         cache["shortlink_to_film"][url] = final_url
     return final_url
 
 
-def letterboxd_film_to_tmdb_id(film_url: str, *, timeout: int = 30) -> int:
+async def letterboxd_film_to_tmdb_id(film_url: str, *, timeout: int = 30, retries: int = DEFAULT_RETRIES) -> int:
     """Return the TMDb movie ID for a Letterboxd film URL.
 
+    The page is streamed and the connection dropped as soon as the TMDb link is seen.
+    429s, 5xx, timeouts and Cloudflare challenges are retried with jittered backoff
+    up to ``retries`` times before the error is raised.
+
     Raises:
-        requests.HTTPError: if the page request fails
+        httpx.HTTPStatusError: if the page request fails
+        CloudflareBlockedError: if Cloudflare serves a challenge page
         ValueError: if a TMDb movie link can't be found in the HTML
     """
-    html = fetch_html(film_url, timeout=timeout)
-    m = TMDB_MOVIE_RE.search(html)
-    if not m:
-        raise ValueError("TMDb movie link not found in page HTML")
-    return int(m.group(1))
+    return await with_retries(lambda: scan_tmdb_id(HTTP.transport, film_url, timeout=timeout), retries=retries)
 
 
 def extract_urls_from_row(row: Dict[str, str]) -> List[str]:
@@ -264,10 +314,47 @@ def guess_uri_column(fieldnames: List[str]) -> Optional[str]:
     return None
 
 
-def read_letterboxd_film_urls(csv_path: str, uri_column: Optional[str], *, timeout: int, cache: dict[str, Any] | None = None) -> tuple[List[str], Dict[str, str]]:
-    """Read unique Letterboxd film URLs from a CSV."""
-    print("PHASE loading_csv", file=sys.stderr, flush=True)
+def guess_title_columns(fieldnames: List[str]) -> tuple[Optional[str], Optional[str]]:
+    """Return the (title, year) column names of a diary or list export, if it has them."""
+    lower_map = {name.lower(): name for name in fieldnames or []}
+    return lower_map.get("name") or lower_map.get("title"), lower_map.get("year")
+
+
+def title_group_key(name: str, year: str) -> Optional[str]:
+    """The key rows of one film share: normalized title and year (None without both)."""
+    title = normalize_title(name)
+    return f"{title}|{year.strip()}" if title and year.strip() else None
+
+
+def read_letterboxd_film_urls(
+    csv_path: str,
+    uri_column: Optional[str],
+    *,
+    timeout: int,
+    cache: CacheStore | None = None,
+    known_uri_map: Optional[Dict[str, str]] = None,
+    retries: int = DEFAULT_RETRIES,
+    titles: Optional[Dict[str, tuple[str, str]]] = None,
+    group_by_title: bool = True,
+    verify_groups: int = 0,
+) -> tuple[List[str], Dict[str, str]]:
+    """Read unique Letterboxd film URLs from a CSV.
+
+    Raw values found in known_uri_map (a previous run's uriMap) are taken as
+    already resolved; only the rest go through the resolve phase. If
+    ``titles`` is given it is filled with film URL -> (Name, Year) from the
+    rows that have them.
+
+    A diary gives every entry its own boxd.it shortlink, so a rewatched film
+    has several. With group_by_title, rows are grouped by normalized
+    (Name, Year) and one shortlink per group is resolved; the others get the
+    same film URL, in uri_map and in the cache. ``verify_groups`` groups,
+    picked at random, also have a second shortlink resolved; a group whose two
+    links disagree has every shortlink resolved on its own.
+    """
+    PROGRESS.phase("loading_csv")
     raw: List[str] = []
+    raw_titles: Dict[str, tuple[str, str]] = {}
 
     with open(csv_path, "r", encoding="utf-8", newline="") as f:
         reader = csv.DictReader(f)
@@ -275,10 +362,15 @@ def read_letterboxd_film_urls(csv_path: str, uri_column: Optional[str], *, timeo
             raise ValueError("CSV has no header row; export with headers and try again")
 
         chosen_col = uri_column or guess_uri_column(reader.fieldnames)
+        title_col, year_col = guess_title_columns(reader.fieldnames)
 
         for row in reader:
             if chosen_col and row.get(chosen_col):
                 raw.append(row[chosen_col])
+                if title_col and row.get(title_col):
+                    raw_titles.setdefault(
+                        row[chosen_col].strip(), (row[title_col].strip(), (row.get(year_col) or "").strip())
+                    )
             else:
                 raw.extend(extract_urls_from_row(row))
 
@@ -292,31 +384,123 @@ def read_letterboxd_film_urls(csv_path: str, uri_column: Optional[str], *, timeo
         seen_raw.add(r)
         deduped_raw.append(r)
     raw = deduped_raw
-    total = len(raw)
-    if total == 0:
+    if not raw:
         return [], {}
 
-    print("PHASE resolve", file=sys.stderr, flush=True)
+    # Title group of every raw value that shares its (Name, Year) with another row
+    group_of: Dict[str, str] = {}
+    if group_by_title:
+        members: Dict[str, List[str]] = {}
+        for r in raw:
+            key = title_group_key(*raw_titles[r]) if r in raw_titles else None
+            if key is not None:
+                members.setdefault(key, []).append(r)
+        group_of = {r: key for key, rs in members.items() if len(rs) > 1 for r in rs}
+    group_urls: Dict[str, str] = {}
 
     urls: Set[str] = set()
     uri_map: Dict[str, str] = {}
+    if known_uri_map:
+        for r in raw:
+            known = known_uri_map.get(r)
+            if isinstance(known, str) and known:
+                urls.add(known)
+                uri_map[r] = known
+                if r in group_of:
+                    group_urls.setdefault(group_of[r], known)
+        raw = [r for r in raw if r not in uri_map]
+    total = len(raw)
 
-    # Use parallel requests for URL resolution (10 concurrent workers)
-    def resolve_one(u: str) -> tuple[str, str | None]:
-        resolved = resolve_letterboxd_film_url(u, timeout=timeout, cache=cache)
-        return (u, resolved)
-
+    PROGRESS.phase("resolve")
     completed = 0
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {executor.submit(resolve_one, u): u for u in raw}
-        for future in as_completed(futures):
-            u, resolved = future.result()
-            if resolved:
-                urls.add(resolved)
-                uri_map[u] = resolved
-            completed += 1
-            print(f"PROGRESS {completed} {total}", file=sys.stderr, flush=True)
 
+    def add(u: str, resolved: str | None) -> None:
+        nonlocal completed
+        if resolved:
+            urls.add(resolved)
+            uri_map[u] = resolved
+        completed += 1
+        PROGRESS.progress(completed, total)
+
+    # Film URLs and cached shortlinks need no request (nor the HTTP stack)
+    pending: List[str] = []
+    for u in raw:
+        resolved = cached_film_url(u, cache)
+        if resolved is None:
+            pending.append(u)
+        else:
+            add(u, resolved)
+            if resolved and u in group_of:
+                group_urls.setdefault(group_of[u], resolved)
+
+    # One request per title group: the first uncached shortlink stands for the rest
+    to_resolve: List[str] = []
+    representatives: Dict[str, str] = {}
+    followers: Dict[str, List[str]] = {}
+    for u in pending:
+        key = group_of.get(u)
+        if key is None:
+            to_resolve.append(u)
+        elif key in group_urls or key in representatives:
+            followers.setdefault(key, []).append(u)
+        else:
+            representatives[key] = u
+            to_resolve.append(u)
+    checks: Dict[str, str] = {}
+    if verify_groups > 0:
+        import random
+
+        candidates = [key for key, rest in followers.items() if rest]
+        for key in random.sample(candidates, min(verify_groups, len(candidates))):
+            checks[key] = followers[key].pop(0)
+
+    # Resolve concurrently on the shared transport (bounded by its adaptive per-host limits)
+    async def resolve_one(u: str) -> tuple[str, str | None]:
+        resolved = await resolve_letterboxd_film_url(u, timeout=timeout, cache=cache, retries=retries)
+        return (u, resolved)
+
+    async def resolve_all(items: List[str]) -> None:
+        import asyncio
+
+        for future in asyncio.as_completed([resolve_one(u) for u in items]):
+            add(*await future)
+
+    batch = to_resolve + list(checks.values())
+    if batch:
+        HTTP.run(resolve_all(batch))
+    for key, u in representatives.items():
+        if u in uri_map:
+            group_urls[key] = uri_map[u]
+
+    # Groups whose spot check disagreed, or whose representative failed, are resolved link by link.
+    mismatched = {key for key, u in checks.items() if uri_map.get(u) != group_urls.get(key)}
+    if checks:
+        print(
+            f"Verified {len(checks) - len(mismatched)} of {len(checks)} title groups"
+            + (f"; resolving {len(mismatched)} group(s) link by link" if mismatched else ""),
+            file=sys.stderr,
+            flush=True,
+        )
+    split = {key for key in followers if key in mismatched or key not in group_urls}
+    separate = [u for key in split for u in followers[key]]
+    if separate:
+        HTTP.run(resolve_all(separate))
+    collapsed = 0
+    for key, rest in followers.items():
+        if key in split:
+            continue
+        for u in rest:
+            add(u, group_urls[key])
+            if cache is not None and "boxd.it/" in u:
+                cache["shortlink_to_film"][u] = group_urls[key]
+            collapsed += 1
+    if collapsed:
+        print(f"Resolved {collapsed} rewatch shortlinks from their title group", file=sys.stderr, flush=True)
+
+    if titles is not None:
+        for r, title_year in raw_titles.items():
+            if r in uri_map:
+                titles.setdefault(uri_map[r], title_year)
     return sorted(urls), uri_map
 
 
@@ -337,347 +521,823 @@ def build_index(urls: Iterable[str]) -> Dict[str, dict]:
     }
 
 
-def load_letterboxd_list(list_csv_path: str, uri_column: Optional[str], *, timeout: int, cache: dict[str, Any] | None = None) -> Set[str]:
-    """Load Letterboxd film URLs from a list CSV file.
-    
-    Returns a set of normalized Letterboxd film URLs.
+def load_previous_output(path: str) -> tuple[Dict[str, dict], Dict[str, str]]:
+    """Load an earlier {movieIndex, uriMap} output. A bare index is accepted too, and
+    so is an --format ndjson output (an unfinished one has no uriMap yet)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            ndjson = f.readline().startswith('{"type": ')
+            f.seek(0)
+            if not ndjson:
+                data = json.load(f)
+        if ndjson:
+            films, trailer = read_ndjson(path)
+            uri_map = (trailer or {}).get("uriMap")
+            index = {film["letterboxd_url"]: film for film in films if film.get("letterboxd_url")}
+            return index, uri_map if isinstance(uri_map, dict) else {}
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not read previous output {path}: {e}", file=sys.stderr)
+        return {}, {}
+    if not isinstance(data, dict):
+        return {}, {}
+    if isinstance(data.get("movieIndex"), dict):
+        uri_map = data.get("uriMap")
+        return data["movieIndex"], uri_map if isinstance(uri_map, dict) else {}
+    return data, {}
+
+
+def is_reusable_entry(entry: Any, *, enrich_tmdb: bool, api_key: Optional[str]) -> bool:
+    """Whether a previous run's entry already has everything this run would add.
+
+    List memberships don't count: they depend on this run's lists, so
+    mark_list_memberships() recomputes them for every entry, reused or not.
     """
-    print("PHASE list_read", file=sys.stderr, flush=True)
+    if not isinstance(entry, dict) or not entry.get("letterboxd_url"):
+        return False
+    if enrich_tmdb and not isinstance(entry.get("tmdb_movie_id"), int):
+        return False
+    if enrich_tmdb and api_key and not isinstance(entry.get("tmdb_data"), dict):
+        return False
+    return True
 
-    if not list_csv_path or not os.path.exists(list_csv_path):
-        return set()
 
-    # Fast path: reuse cached resolved URLs for this list if available
-    if cache is not None:
-        key = _list_cache_key(list_csv_path, uri_column)
-        entry = cache.get("list_cache", {}).get(key)
-        if isinstance(entry, dict) and isinstance(entry.get("resolved_urls"), list):
-            resolved = {str(u) for u in entry["resolved_urls"] if u}
-            if resolved:
-                print("PHASE list_cache_hit", file=sys.stderr, flush=True)
-                print("PROGRESS 1 1", file=sys.stderr, flush=True)
-                return resolved
+def clear_list_memberships(entry: dict) -> dict:
+    """Reset an entry's list-derived fields (``lists`` and the LIST_FLAGS flags)."""
+    entry["lists"] = {}
+    for flag in LIST_FLAGS.values():
+        entry[flag] = False
+    return entry
 
-    raw: List[str] = []
-
-    with open(list_csv_path, "r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        if reader.fieldnames is None:
-            print(f"Warning: List CSV {list_csv_path} has no header row, skipping", file=sys.stderr)
-            return set()
-
-        chosen_col = uri_column or guess_uri_column(reader.fieldnames)
-
-        for row in reader:
-            if chosen_col and row.get(chosen_col):
-                val = row[chosen_col]
-                if val:
-                    raw.append(str(val))
-            else:
-                raw.extend(extract_urls_from_row(row))
 
-    # Resolve URLs (expand boxd.it, canonicalize)
-    raw = [r for r in (r.strip() for r in raw) if r]
-    if not raw:
-        return set()
+def parse_list_specs(values: Iterable[str]) -> Dict[str, str]:
+    """Parse ["criterion", "mine=watchlist.csv", ...] from the CLI into {key: list CSV path}.
 
-    # Deduplicate raw list values while preserving order
-    seen_raw: Set[str] = set()
-    deduped_raw: List[str] = []
-    for r in raw:
-        if r in seen_raw:
+    A bare key names one of the curated exports in public/ (build_curated_lists.LISTS).
+    """
+    lists: Dict[str, str] = {}
+    for value in values:
+        key, sep, path = value.partition("=")
+        key = key.strip()
+        if sep and key and path.strip():
+            lists[key] = path.strip()
+        elif not sep and key in CURATED_LISTS:
+            lists[key] = os.path.join(PUBLIC_DIR, CURATED_LISTS[key][0])
+        else:
+            raise ValueError(f"Expected KEY=PATH or one of {', '.join(CURATED_LISTS)}, got {value!r}")
+    return lists
+
+
+def read_list_rows(list_csv_path: str, uri_column: Optional[str]) -> List[tuple[int, str]]:
+    """Return (rank, raw URL) for each entry of a list CSV.
+
+    Letterboxd list exports start with a few lines about the list itself; the
+    entries follow a "Position,..." header and are ranked by Position. Any
+    other CSV is ranked by row order.
+    """
+    with open(list_csv_path, "r", encoding="utf-8", newline="") as f:
+        lines = f.readlines()
+    header_idx = next((i for i, line in enumerate(lines) if line.startswith("Position,")), 0)
+    reader = csv.DictReader(lines[header_idx:])
+    if reader.fieldnames is None:
+        print(f"Warning: List CSV {list_csv_path} has no header row, skipping", file=sys.stderr)
+        return []
+
+    chosen_col = uri_column if uri_column in reader.fieldnames else guess_uri_column(reader.fieldnames)
+    rows: List[tuple[int, str]] = []
+    for i, row in enumerate(reader, start=1):
+        position = (row.get("Position") or "").strip()
+        rank = int(position) if position.isdigit() else i
+        if chosen_col and row.get(chosen_col):
+            rows.append((rank, str(row[chosen_col]).strip()))
+        else:
+            rows.extend((rank, u) for u in extract_urls_from_row(row))
+    return [(rank, u) for rank, u in rows if u]
+
+
+def load_letterboxd_lists(
+    lists: Dict[str, str],
+    uri_column: Optional[str],
+    *,
+    timeout: int,
+    cache: CacheStore | None = None,
+    retries: int = DEFAULT_RETRIES,
+) -> Dict[str, Dict[str, int]]:
+    """Load several Letterboxd list CSVs; returns {list key: {film slug: rank}}.
+
+    Lists already in list_cache need no reading or resolving. The rest are
+    read, their URLs deduped across all of them, and the uncached shortlinks
+    resolved concurrently in one batch.
+    """
+    list_cache = cache.setdefault("list_cache", {}) if cache is not None else {}
+    ranks: Dict[str, Dict[str, int]] = {}
+    to_resolve: Dict[str, tuple[List[tuple[int, str]], str, str]] = {}
+    for key, path in lists.items():
+        if not os.path.exists(path):
+            print(f"Warning: List CSV {path} not found, skipping", file=sys.stderr)
+            ranks[key] = {}
             continue
-        seen_raw.add(r)
-        deduped_raw.append(r)
-    raw = deduped_raw
+        # Fast path: this exact file was seen before
+        path_key = _list_cache_key(path, uri_column)
+        entry = list_cache.get(path_key)
+        if isinstance(entry, dict) and isinstance(entry.get("content_key"), str):
+            entry = list_cache.get(entry["content_key"])
+        cached = _cached_list_ranks(entry)
+        if cached is None:
+            # Same list content under another path (e.g. a new upload of the same list)
+            rows = read_list_rows(path, uri_column)
+            content_key = _list_content_key(f"{rank}\t{u}" for rank, u in rows)
+            cached = _cached_list_ranks(list_cache.get(content_key))
+            if cached is None:
+                to_resolve[key] = (rows, path_key, content_key)
+                continue
+            if cache is not None:
+                list_cache[path_key] = {"content_key": content_key}
+        ranks[key] = cached
+    if not to_resolve:
+        return ranks
 
+    # Each URL once, however many lists it's on
+    raw = list(dict.fromkeys(u for rows, _, _ in to_resolve.values() for _, u in rows))
     total = len(raw)
-    print("PHASE list_resolve", file=sys.stderr, flush=True)
-
-    resolved_urls: Set[str] = set()
-    for i, u in enumerate(raw, start=1):
-        resolved = resolve_letterboxd_film_url(u, timeout=timeout, cache=cache)
-        if resolved:
-            resolved_urls.add(resolved)
-        print(f"PROGRESS {i} {total}", file=sys.stderr, flush=True)
+    PROGRESS.phase("list_resolve")
+    completed = 0
+    resolved: Dict[str, str] = {}
+
+    def add(u: str, url: str | None) -> None:
+        nonlocal completed
+        if url:
+            resolved[u] = url
+        completed += 1
+        PROGRESS.progress(completed, total)
+
+    pending: List[str] = []
+    for u in raw:
+        url = cached_film_url(u, cache)
+        if url is None:
+            pending.append(u)
+        else:
+            add(u, url)
+
+    async def resolve_one(u: str) -> tuple[str, str | None]:
+        return (u, await resolve_letterboxd_film_url(u, timeout=timeout, cache=cache, retries=retries))
+
+    async def resolve_all() -> None:
+        import asyncio
+
+        for future in asyncio.as_completed([resolve_one(u) for u in pending]):
+            add(*await future)
+
+    if pending:
+        HTTP.run(resolve_all())
+
+    for key, (rows, path_key, content_key) in to_resolve.items():
+        list_ranks: Dict[str, int] = {}
+        for rank, u in rows:
+            slug = film_slug(resolved.get(u, ""))
+            if slug:
+                list_ranks.setdefault(slug, rank)
+        ranks[key] = list_ranks
+        if cache is not None:
+            list_cache[content_key] = {
+                "resolved_urls": sorted(f"https://letterboxd.com/film/{slug}/" for slug in list_ranks),
+                "ranks": list_ranks,
+            }
+            list_cache[path_key] = {"content_key": content_key}
+    return ranks
 
-    if cache is not None:
-        key = _list_cache_key(list_csv_path, uri_column)
-        cache.setdefault("list_cache", {})[key] = {
-            "resolved_urls": sorted(resolved_urls),
-        }
-    return resolved_urls
 
+def mark_list_memberships(index: Dict[str, dict], ranks: Dict[str, Dict[str, int]]) -> Dict[str, int]:
+    """Attach every list's memberships in one pass over the index.
 
-def mark_list_membership(index: Dict[str, dict], list_urls: Set[str], flag_key: str) -> None:
-    """Mark movies in the index that are in the provided list.
-    
-    For Criterion Collection, this would mark is_in_criterion_collection=True.
+    Each film gets ``lists`` ({list key: rank}, like curated-lists.json), and
+    each LIST_FLAGS flag (e.g. is_in_criterion_collection) set to whether it
+    is on that list. Every entry is reset first, so nothing carries over from
+    a reused entry, even when ``ranks`` is empty. Returns how many films of
+    the index are on each list.
     """
+    by_slug: Dict[str, Dict[str, int]] = {}
+    for key, list_ranks in ranks.items():
+        for slug, rank in list_ranks.items():
+            by_slug.setdefault(slug, {})[key] = rank
+    counts = dict.fromkeys(ranks, 0)
     for url, data in index.items():
-        if url in list_urls:
-            data[flag_key] = True
-
-
-def fetch_tmdb_movie_details(tmdb_id: int, *, api_key: str, timeout: int = 30) -> dict:
-    """Fetch movie details from TMDb API.
-
-    Returns a dict with movie information like title, release_date, overview, etc.
-    """
-    url = f"https://api.themoviedb.org/3/movie/{tmdb_id}"
-    params = {
-        "api_key": api_key,
-        "language": "en-US",
-    }
-    headers = {
-        "Accept": "application/json",
-    }
-    resp = SESSION.get(url, params=params, headers=headers, timeout=timeout)
-    resp.raise_for_status()
-    return resp.json()
-
-
-def fetch_tmdb_movie_credits(tmdb_id: int, *, api_key: str, timeout: int = 30) -> dict:
-    """Fetch movie credits from TMDb API.
-
-    Returns a dict with cast and crew information.
-    """
-    url = f"https://api.themoviedb.org/3/movie/{tmdb_id}/credits"
-    params = {
-        "api_key": api_key,
-        "language": "en-US",
-    }
-    headers = {
-        "Accept": "application/json",
-    }
-    resp = SESSION.get(url, params=params, headers=headers, timeout=timeout)
-    resp.raise_for_status()
-    return resp.json()
+        clear_list_memberships(data)
+        memberships = by_slug.get(film_slug(url), {})
+        data["lists"] = dict(memberships)
+        for key in memberships:
+            counts[key] += 1
+            if key in LIST_FLAGS:
+                data[LIST_FLAGS[key]] = True
+    return counts
 
 
 def enrich_with_tmdb(
     index: Dict[str, dict],
     *,
     timeout: int,
-    sleep_s: float,
     api_key: Optional[str] = None,
-    cache: dict[str, Any] | None = None,
+    cache: CacheStore | None = None,
+    on_done: Optional[Callable[[str, dict], None]] = None,
+    retries: int = DEFAULT_RETRIES,
+    retry_failures: bool = False,
+    resolver: str = "scrape",
+    titles: Optional[Dict[str, tuple[str, str]]] = None,
 ) -> None:
     """Mutates index in place by filling tmdb_movie_id when possible.
     
     If api_key is provided, also fetches movie details from TMDb API.
+    on_done(url, data) is called once per film, as soon as its entry is final.
+    Throttled or transient failures are retried up to ``retries`` times before
+    a film gets a tmdb_error / tmdb_api_error. Failures are remembered in the
+    cache for a TTL that depends on their kind (see negative_cache.py) and not
+    retried until it expires, unless retry_failures is set.
+
+    With resolver="hybrid" and an api_key, films with a (Name, Year) in
+    ``titles`` are searched on TMDb first; only those without a match of
+    SEARCH_MIN_CONFIDENCE, or whose search failed, have their page scraped.
+    Each film's tmdb_source records which of the two found its ID.
     """
     film_to_tmdb = cache.get("film_to_tmdb", {}) if cache is not None else {}
+    title_year_to_tmdb = cache.get("title_year_to_tmdb", {}) if cache is not None else {}
+    failures = NegativeCache(cache, enabled=not retry_failures)
+    search = resolver == "hybrid" and bool(api_key) and bool(titles)
 
     # ----------------------------
     # Pass 1: Letterboxd -> TMDb ID
     # ----------------------------
-    print("PHASE letterboxd_scrape", file=sys.stderr, flush=True)
+    completed = 0
     total = len(index)
 
-    def scrape_one(url: str) -> tuple[str, int | None, str | None]:
-        """Scrape TMDb ID for a single Letterboxd URL. Returns (url, tmdb_id, error)."""
-        # Cache hit: skip scraping Letterboxd page
-        if url in film_to_tmdb and isinstance(film_to_tmdb[url], int):
-            return (url, int(film_to_tmdb[url]), None)
+    def start(phase: str, items: int) -> None:
+        nonlocal completed, total
+        PROGRESS.phase(phase)
+        completed, total = 0, items
+
+    def tick() -> None:
+        nonlocal completed
+        completed += 1
+        PROGRESS.progress(completed, total)
+
+    def found(url: str, tmdb_id: int | None, error: str | None, source: str = SOURCE_SCRAPE) -> None:
+        data = index[url]
+        if tmdb_id is not None:
+            data["tmdb_movie_id"] = tmdb_id
+            data["tmdb_source"] = source
+            # Only an ID read off the film's own page is filed under its URL; a
+            # search match stays a title/year guess (title_year_to_tmdb).
+            if cache is not None and source == SOURCE_SCRAPE and url not in film_to_tmdb:
+                film_to_tmdb[url] = int(tmdb_id)
+        elif error:
+            data["tmdb_error"] = error
+        tick()
+        if on_done is not None and not api_key:
+            on_done(url, data)
+
+    # Cache hits are settled without a request. In hybrid mode every other film
+    # goes through the search phase, and those it can't match are scraped after.
+    start("tmdb_search" if search else "letterboxd_scrape", len(index))
+    to_search: List[str] = []
+    to_scrape: List[str] = []
+    for url in index:
+        cached = film_to_tmdb.get(url)
+        if isinstance(cached, int):
+            found(url, cached, None)
+        elif search and url in titles:
+            title, year = titles[url]
+            # Other scripts cache weaker guesses here too: only a match as
+            # confident as our own search would need is taken as-is.
+            cached = cached_search_id(title_year_to_tmdb.get(f"{title}|{year}"), SEARCH_MIN_CONFIDENCE)
+            if cached is not None:
+                found(url, cached, None, SOURCE_SEARCH)
+            else:
+                to_search.append(url)
+        else:
+            to_scrape.append(url)
+            if search:
+                tick()
+
+    async def search_one(url: str) -> tuple[str, int | None, float]:
+        """Search TMDb by the film's title and year. Returns (url, tmdb_id if matched confidently, confidence)."""
+        title, year = titles[url]
         try:
-            tmdb_id = letterboxd_film_to_tmdb_id(url, timeout=timeout)
+            results = await with_retries(
+                lambda: search_movie(HTTP.transport, title, year, api_key=api_key, timeout=timeout),
+                retries=retries,
+            )
+        except Exception:
+            return (url, None, 0.0)  # blocked or failing: the page scrape decides
+        match, confidence = match_search_result(results, title, year)
+        if match is None or confidence < SEARCH_MIN_CONFIDENCE:
+            return (url, None, confidence)
+        return (url, int(match["id"]), confidence)
+
+    async def search_all() -> None:
+        import asyncio
+
+        for future in asyncio.as_completed([search_one(url) for url in to_search]):
+            url, tmdb_id, confidence = await future
+            if tmdb_id is None:
+                to_scrape.append(url)
+                tick()
+                continue
+            if cache is not None:
+                title, year = titles[url]
+                title_year_to_tmdb[f"{title}|{year}"] = search_cache_entry(tmdb_id, confidence)
+            found(url, tmdb_id, None, SOURCE_SEARCH)
+
+    if to_search:
+        HTTP.run(search_all())
+        print(
+            f"Matched {len(to_search) - len(to_scrape)} of {len(to_search)} films by title search; "
+            f"{len(to_scrape)} left to scrape",
+            file=sys.stderr,
+            flush=True,
+        )
+    if search and to_scrape:
+        start("letterboxd_scrape", len(to_scrape))
+
+    # Known failures (no TMDb link, recently blocked, ...) are skipped until their TTL expires.
+    pending: List[str] = []
+    for url in to_scrape:
+        failure = failures.get("scrape", url)
+        if failure is not None:
+            found(url, None, failure["error"])
+        else:
+            pending.append(url)
+
+    async def scrape_one(url: str) -> tuple[str, int | None, str | None]:
+        """Scrape the TMDb ID for a single Letterboxd URL. Returns (url, tmdb_id, error)."""
+        try:
+            tmdb_id = await letterboxd_film_to_tmdb_id(url, timeout=timeout, retries=retries)
             return (url, tmdb_id, None)
         except Exception as e:
+            failures.record("scrape", url, e)
             return (url, None, str(e))
 
-    # Use parallel requests (10 concurrent workers)
-    completed = 0
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {executor.submit(scrape_one, url): url for url in index.keys()}
-        for future in as_completed(futures):
-            url, tmdb_id, error = future.result()
-            data = index[url]
-            if tmdb_id is not None:
-                data["tmdb_movie_id"] = tmdb_id
-                if cache is not None and url not in film_to_tmdb:
-                    film_to_tmdb[url] = int(tmdb_id)
-            elif error:
-                data["tmdb_error"] = error
-            completed += 1
-            print(f"PROGRESS {completed} {total}", file=sys.stderr, flush=True)
+    # Scrape concurrently on the shared transport (bounded by its adaptive per-host limits)
+    async def scrape_all() -> None:
+        import asyncio
+
+        for future in asyncio.as_completed([scrape_one(url) for url in pending]):
+            found(*await future)
+
+    if pending:
+        HTTP.run(scrape_all())
 
     # ------------------------------------
     # Pass 2: TMDb API -> details + credits
     # ------------------------------------
     if api_key:
-        print("PHASE tmdb_api", file=sys.stderr, flush=True)
+        start("tmdb_api", len(index))
         tmdb_movie_data_cache = cache.get("tmdb_movie_data", {}) if cache is not None else {}
 
-        for i, (url, data) in enumerate(index.items(), start=1):
-            tmdb_id = data.get("tmdb_movie_id")
-            if not isinstance(tmdb_id, int):
-                print(f"PROGRESS {i} {total}", file=sys.stderr, flush=True)
-                continue
-
-            # Check cache first
+        async def fetch_one(url: str, tmdb_id: int, data: dict) -> str:
+            """Fetch details + credits for one film into data["tmdb_data"]. Returns url."""
             cache_key = str(tmdb_id)
-            cached_tmdb = tmdb_movie_data_cache.get(cache_key)
-            if cached_tmdb and "directed_by_woman" in cached_tmdb:
-                data["tmdb_data"] = cached_tmdb
-                print(f"PROGRESS {i} {total}", file=sys.stderr, flush=True)
-                continue  # Skip API calls and sleep
-
-            network_used = False
             try:
-                tmdb_data = fetch_tmdb_movie_details(tmdb_id, api_key=api_key, timeout=timeout)
-                network_used = True
-
-                # Extract production countries (for American/not American classification)
-                production_countries = tmdb_data.get("production_countries", [])
-                country_codes = [c.get("iso_3166_1") for c in production_countries if c.get("iso_3166_1")]
-                country_names = [c.get("name") for c in production_countries if c.get("name")]
-
-                # Extract spoken languages (for reference)
-                spoken_languages = tmdb_data.get("spoken_languages", [])
-                language_codes = [l.get("iso_639_1") for l in spoken_languages if l.get("iso_639_1")]
-                language_names = [l.get("name") for l in spoken_languages if l.get("name")]
-
-                # Get original/primary language (the main language of the film)
-                original_language = tmdb_data.get("original_language", "")
-
-                # Helper flags for easy filtering
-                is_american = "US" in country_codes
-                # Use original_language to determine if primarily in English
-                # (not spoken_languages, which includes ANY language spoken)
-                is_english = original_language == "en"
-
-                # Fetch credits to get director and writer gender information
-                credits_data: dict = {}
-                directors: list = []
-                writers: list = []
-                directed_by_woman = False
-                written_by_woman = False
-
-                try:
-                    credits = fetch_tmdb_movie_credits(tmdb_id, api_key=api_key, timeout=timeout)
-                    crew = credits.get("crew", [])
-
-                    directors = [
-                        {"name": person.get("name"), "gender": person.get("gender")}
-                        for person in crew
-                        if person.get("job") == "Director"
-                    ]
-
-                    writer_jobs = ["Writer", "Screenplay", "Story", "Characters"]
-                    writers = [
-                        {"name": person.get("name"), "job": person.get("job"), "gender": person.get("gender")}
-                        for person in crew
-                        if person.get("job") in writer_jobs
-                    ]
-
-                    directed_by_woman = any(d.get("gender") == 1 for d in directors)
-                    written_by_woman = any(w.get("gender") == 1 for w in writers)
-
-                    credits_data = {
-                        "directors": directors,
-                        "writers": writers,
-                        "directed_by_woman": directed_by_woman,
-                        "written_by_woman": written_by_woman,
-                    }
-                except Exception as credits_error:
-                    credits_data["credits_error"] = str(credits_error)
-
-                data["tmdb_data"] = {
-                    "title": tmdb_data.get("title"),
-                    "original_title": tmdb_data.get("original_title"),
-                    "original_language": original_language,
-                    "release_date": tmdb_data.get("release_date"),
-                    "overview": tmdb_data.get("overview"),
-                    "runtime": tmdb_data.get("runtime"),
-                    "genres": [g.get("name") for g in tmdb_data.get("genres", [])],
-                    "popularity": tmdb_data.get("popularity"),
-                    "vote_average": tmdb_data.get("vote_average"),
-                    "vote_count": tmdb_data.get("vote_count"),
-                    "poster_path": tmdb_data.get("poster_path"),
-                    "backdrop_path": tmdb_data.get("backdrop_path"),
-                    "production_countries": {"codes": country_codes, "names": country_names},
-                    "is_american": is_american,
-                    "spoken_languages": {"codes": language_codes, "names": language_names},
-                    "is_english": is_english,
-                    **credits_data,
-                }
+                tmdb_data, credits, credits_error = await with_retries(
+                    lambda: fetch_movie(HTTP.transport, tmdb_id, api_key=api_key, timeout=timeout),
+                    retries=retries,
+                )
+
+                data["tmdb_data"] = build_tmdb_data(tmdb_data, credits, credits_error)
 
                 # Cache the TMDb data for future runs
                 if cache is not None:
                     tmdb_movie_data_cache[cache_key] = data["tmdb_data"]
 
             except Exception as e:
+                failures.record("tmdb", tmdb_id, e)
                 data["tmdb_api_error"] = str(e)
+            return url
+
+        def fetched(url: str) -> None:
+            tick()
+            if on_done is not None:
+                on_done(url, index[url])
+
+        to_fetch: List[tuple[str, int, dict]] = []
+        for url, data in index.items():
+            tmdb_id = data.get("tmdb_movie_id")
+            if not isinstance(tmdb_id, int):
+                fetched(url)
+                continue
+
+            # Check cache first
+            cached_tmdb = tmdb_movie_data_cache.get(str(tmdb_id))
+            if is_complete_tmdb_data(cached_tmdb):
+                data["tmdb_data"] = cached_tmdb
+                fetched(url)
+                continue  # Skip API calls
+
+            failure = failures.get("tmdb", tmdb_id)
+            if failure is not None:
+                data["tmdb_api_error"] = failure["error"]
+                fetched(url)
+                continue
 
-            print(f"PROGRESS {i} {total}", file=sys.stderr, flush=True)
-            # Only sleep when we actually hit the network
-            if sleep_s > 0 and network_used:
-                time.sleep(sleep_s)
+            to_fetch.append((url, tmdb_id, data))
+
+        # Requests run concurrently; the transport's TMDb token bucket sets the pace.
+        async def fetch_all() -> None:
+            import asyncio
+
+            for future in asyncio.as_completed([fetch_one(*item) for item in to_fetch]):
+                fetched(await future)
+
+        if to_fetch:
+            HTTP.run(fetch_all())
+
+    if failures.skipped:
+        print(
+            f"Skipped {failures.skipped} lookups that failed recently (--retry-failures to try them again)",
+            file=sys.stderr,
+            flush=True,
+        )
+    PROGRESS.emit("failures", skipped=failures.skipped, recorded=dict(failures.recorded))
 
 
 def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Build a dict of Letterboxd film URLs (optionally enriched with TMDb IDs)")
-    p.add_argument("--csv", required=True, help="Path to your CSV (e.g. diary.csv)")
+    p.add_argument("--csv", help="Path to your CSV (e.g. diary.csv); required unless --worker")
     p.add_argument(
         "--uri-column",
         help='Column name that contains the Letterboxd film URL (yours is "Letterboxd URI"; may contain boxd.it shortlinks)',
     )
-    p.add_argument("--out", required=True, help="Where to write JSON output")
+    p.add_argument("--out", help="Where to write JSON output; required unless --worker")
+    p.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default="json",
+        help="json: one {movieIndex, uriMap} document at the end (default). "
+        "ndjson: one film per line as each finishes, then a trailer line with uriMap",
+    )
+    p.add_argument(
+        "--previous",
+        help="Earlier --out file for the same diary; only rows whose URI it doesn't already cover are resolved and enriched",
+    )
+    p.add_argument(
+        "--no-title-groups",
+        action="store_true",
+        help="Resolve every boxd.it shortlink, instead of one per Name/Year group (a diary's rewatches)",
+    )
+    p.add_argument(
+        "--verify-title-groups",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Spot-check N random Name/Year groups by resolving a second shortlink; "
+        "groups whose links disagree are resolved link by link",
+    )
     p.add_argument("--enrich-tmdb", action="store_true", help="Scrape each film page to extract TMDb movie ID")
     p.add_argument("--tmdb-api-key", help="TMDb API key to fetch movie details (optional, requires --enrich-tmdb)")
+    p.add_argument(
+        "--tmdb-resolver",
+        choices=TMDB_RESOLVERS,
+        default="scrape",
+        help="scrape: take each TMDb ID from the film's Letterboxd page (default). "
+        "hybrid: search TMDb by the CSV's Name/Year first and scrape only films without a confident match "
+        "(needs --tmdb-api-key)",
+    )
     p.add_argument("--criterion-list", help="Path to CSV file containing Letterboxd list (e.g., Criterion Collection list export) to compare against")
     p.add_argument("--black-director-list", help="Path to CSV file containing Letterboxd list of films by Black directors")
+    p.add_argument(
+        "--list",
+        action="append",
+        default=[],
+        metavar="KEY[=PATH]",
+        help="Mark each film's rank on a Letterboxd list CSV under lists[KEY] (repeatable). "
+        f"A bare KEY is one of the curated exports in public/: {', '.join(CURATED_LISTS)}",
+    )
+    p.add_argument("--curated-lists", action="store_true", help="Load all the curated exports in public/ (as --list KEY for each)")
     p.add_argument("--timeout", type=int, default=30, help="HTTP timeout per request (seconds)")
-    p.add_argument("--sleep", type=float, default=0.25, help="Delay between TMDb API requests (seconds). TMDb allows 40 req/10s.")
+    p.add_argument(
+        "--retries",
+        type=int,
+        default=DEFAULT_RETRIES,
+        help="Retries with backoff for throttled (429, 5xx, Cloudflare) or timed-out requests",
+    )
+    p.add_argument(
+        "--retry-failures",
+        action="store_true",
+        help="Ignore cached failures (no TMDb link, TMDb 404, ...) and try those films again",
+    )
+    p.add_argument(
+        "--host-limit",
+        action="append",
+        default=[],
+        metavar="HOST=N",
+        help="Max concurrent requests to HOST; concurrency adapts below this ceiling "
+        "(repeatable, e.g. --host-limit letterboxd.com=8)",
+    )
+    p.add_argument(
+        "--tmdb-rate",
+        default="40/10",
+        metavar="N[/SECONDS]",
+        help="TMDb API request budget, e.g. 40/10 for 40 requests per 10 seconds (TMDb's documented limit)",
+    )
     p.add_argument(
         "--cache",
-        default=str(Path(".cache") / "letterboxd_tmdb_cache.json"),
-        help="Path to a JSON cache file used to avoid re-resolving boxd.it links and re-scraping TMDb IDs",
+        help="Film metadata store shared with the other scripts, used to avoid re-resolving boxd.it links, "
+        "re-scraping TMDb IDs and re-fetching TMDb records "
+        "(.sqlite/.db for the SQLite store, anything else for a single JSON file). "
+        "Default: .cache/film_store.sqlite, or a throwaway store with --record-http/--replay-http",
+    )
+    p.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=DEFAULT_CHECKPOINT_EVERY,
+        metavar="N",
+        help="Persist new cache entries after N writes, so a killed run resumes from there",
     )
-    return p.parse_args(argv)
+    p.add_argument(
+        "--checkpoint-seconds",
+        type=float,
+        default=DEFAULT_CHECKPOINT_SECONDS,
+        metavar="SECONDS",
+        help="Persist new cache entries at least this often",
+    )
+    p.add_argument(
+        "--progress",
+        choices=PROGRESS_FORMATS,
+        default="legacy",
+        help="legacy: PHASE/PROGRESS lines on stderr (default). "
+        "json: JSON-lines events with rates, ETA, cache hit ratios, retries and per-phase timings",
+    )
+    p.add_argument(
+        "--progress-interval",
+        type=float,
+        default=DEFAULT_PROGRESS_INTERVAL,
+        metavar="SECONDS",
+        help="With --progress json, emit at most one progress event per phase this often",
+    )
+    p.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="Write a profiling report here when the run ends ('-' for stderr): wall time per phase, "
+        "per-host latency histograms, CPU vs network vs wait time, peak memory",
+    )
+    p.add_argument(
+        "--profile-cprofile",
+        metavar="PATH",
+        help="Also run cProfile and dump its stats here; the hottest functions go in the report",
+    )
+    p.add_argument(
+        "--cache-codec",
+        choices=CODECS,
+        default="auto",
+        help="How SQLite cache values are serialized: auto (orjson if installed, else json), json, "
+        "or msgpack (needs the msgpack package). Existing entries stay readable either way",
+    )
+    archive = p.add_mutually_exclusive_group()
+    archive.add_argument(
+        "--record-http",
+        metavar="DIR",
+        help="Save every HTTP request and response of this run to an archive directory",
+    )
+    archive.add_argument(
+        "--replay-http",
+        metavar="DIR",
+        help="Answer HTTP requests from an archive made with --record-http instead of the network "
+        "(any --tmdb-api-key will do)",
+    )
+    p.add_argument(
+        "--replay-timing",
+        type=float,
+        default=0.0,
+        metavar="FACTOR",
+        help="With --replay-http, wait the recorded response time times FACTOR (default 0: no waiting)",
+    )
+    p.add_argument(
+        "--worker",
+        action="store_true",
+        help="Stay running and take jobs as JSON lines on stdin (or --socket), keeping the cache and "
+        "HTTP connections warm; see job_worker.py for the protocol",
+    )
+    p.add_argument("--socket", metavar="PATH", help="With --worker, take jobs on this Unix socket instead of stdin")
+    p.add_argument(
+        "--worker-jobs",
+        type=int,
+        default=DEFAULT_WORKER_JOBS,
+        metavar="N",
+        help="With --worker, run up to N jobs at once (they share the per-host limits)",
+    )
+    args = p.parse_args(argv)
+    if not args.worker and not (args.csv and args.out):
+        p.error("--csv and --out are required (unless --worker)")
+    if args.socket and not args.worker:
+        p.error("--socket needs --worker")
+    # Checked here so a bad value exits before the cache is opened.
+    try:
+        args.lists = parse_list_specs(
+            (list(CURATED_LISTS) if args.curated_lists else [])
+            + ([f"criterion={args.criterion_list}"] if args.criterion_list else [])
+            + ([f"black-directors={args.black_director_list}"] if args.black_director_list else [])
+            + args.list
+        )
+    except ValueError as e:
+        p.error(f"Invalid --list: {e}")
+    return args
+
+
+def configure_transport(args: argparse.Namespace) -> Optional[int]:
+    """Apply the per-host limits and HTTP archive flags. Returns an exit code on bad values."""
+    try:
+        HTTP.configure(
+            host_limits=parse_host_limits(args.host_limit),
+            rate_limits={"api.themoviedb.org": parse_rate(args.tmdb_rate)},
+        )
+    except ValueError as e:
+        print(f"Invalid limit: {e}", file=sys.stderr)
+        return 2
+    args.archive = None
+    if args.record_http or args.replay_http:
+        from http_archive import open_archive  # brings in httpx, so only when asked for
 
+        try:
+            args.archive = open_archive(record=args.record_http, replay=args.replay_http, timing=args.replay_timing)
+        except ValueError as e:
+            print(f"Invalid HTTP archive: {e}", file=sys.stderr)
+            return 2
+        HTTP.configure(archive=args.archive)
+    return None
 
-def main(argv: Optional[List[str]] = None) -> int:
-    args = parse_args(argv)
 
-    if not args.tmdb_api_key:
-        args.tmdb_api_key = os.environ.get("TMDB_API_KEY")
+def open_store(args: argparse.Namespace) -> Optional[CacheStore]:
+    try:
+        with PROFILE.phase("cache_open"):
+            return open_cache(
+                resolve_cache_path(args.cache, isolated=bool(args.record_http or args.replay_http)),
+                namespaces=CACHE_NAMESPACES,
+                import_from=LEGACY_CACHE_FILES,
+                checkpoint_every=args.checkpoint_every,
+                checkpoint_seconds=args.checkpoint_seconds,
+                codec=args.cache_codec,
+            )
+    except ValueError as e:
+        print(f"Invalid --cache-codec: {e}", file=sys.stderr)
+        return None
+
 
-    cache = load_cache(args.cache)
+def run(args: argparse.Namespace, cache: CacheStore, *, startup: Optional[Dict[str, float]] = None) -> int:
+    """Index (and enrich) one CSV into args.out, using an open cache.
 
-    urls, uri_map = read_letterboxd_film_urls(args.csv, args.uri_column, timeout=args.timeout, cache=cache)
+    ``startup`` (import and cache-open seconds) goes in the summary event.
+    """
+    if not args.tmdb_api_key:
+        args.tmdb_api_key = os.environ.get("TMDB_API_KEY")
+    previous_index: Dict[str, dict] = {}
+    previous_uri_map: Dict[str, str] = {}
+    if args.previous:
+        previous_index, previous_uri_map = load_previous_output(args.previous)
+
+    titles: Optional[Dict[str, tuple[str, str]]] = None
+    if args.enrich_tmdb and args.tmdb_resolver == "hybrid":
+        if args.tmdb_api_key:
+            titles = {}
+        else:
+            print("Warning: --tmdb-resolver hybrid needs a TMDb API key; scraping every film", file=sys.stderr)
+
+    urls, uri_map = read_letterboxd_film_urls(
+        args.csv,
+        args.uri_column,
+        timeout=args.timeout,
+        cache=cache,
+        known_uri_map=previous_uri_map,
+        retries=args.retries,
+        titles=titles,
+        group_by_title=not args.no_title_groups,
+        verify_groups=args.verify_title_groups,
+    )
     if not urls:
         print("No Letterboxd film URLs found in the CSV.", file=sys.stderr)
         return 2
 
     index = build_index(urls)
 
-    # Load and compare against Criterion Collection list (or any other list)
-    if args.criterion_list:
-        print("PHASE loading_criterion_list", file=sys.stderr, flush=True)
-        list_urls = load_letterboxd_list(args.criterion_list, args.uri_column, timeout=args.timeout, cache=cache)
-        print(f"Loaded {len(list_urls)} films from list", file=sys.stderr, flush=True)
-        mark_list_membership(index, list_urls, "is_in_criterion_collection")
-        print(f"Marked {sum(1 for d in index.values() if d.get('is_in_criterion_collection'))} films as in the list", file=sys.stderr, flush=True)
+    # Delta mode: carry over finished entries from the previous output
+    reused: Set[str] = set()
+    for url in index:
+        entry = previous_index.get(url)
+        if is_reusable_entry(entry, enrich_tmdb=args.enrich_tmdb, api_key=args.tmdb_api_key):
+            index[url] = entry
+            reused.add(url)
+    if args.previous:
+        print(f"Reusing {len(reused)} of {len(index)} films from {args.previous}", file=sys.stderr, flush=True)
+
+    # Load every list at once and mark memberships (Criterion Collection, curated lists, ...)
+    ranks: Dict[str, Dict[str, int]] = {}
+    if args.lists:
+        PROGRESS.phase("loading_lists")
+        ranks = load_letterboxd_lists(args.lists, args.uri_column, timeout=args.timeout, cache=cache, retries=args.retries)
+    counts = mark_list_memberships(index, ranks)
+    for key, list_ranks in ranks.items():
+        print(f"{key}: {len(list_ranks)} films in list, {counts[key]} in yours", file=sys.stderr, flush=True)
+
+    writer = NdjsonWriter(args.out) if args.format == "ndjson" else None
+
+    def emit(url: str, data: dict) -> None:
+        if writer is not None:
+            writer.write_film(data)
+            data.clear()  # written: don't hold the film (and its tmdb_data) until the run ends
+
+    pending = {url: data for url, data in index.items() if url not in reused} if args.enrich_tmdb else {}
+    for url, data in index.items():
+        if url not in pending:
+            emit(url, data)
+    if pending:
+        enrich_with_tmdb(
+            pending,
+            timeout=args.timeout,
+            api_key=args.tmdb_api_key,
+            cache=cache,
+            on_done=emit,
+            retries=args.retries,
+            retry_failures=args.retry_failures,
+            resolver=args.tmdb_resolver,
+            titles=titles,
+        )
+
+    extra = {"startup": startup} if startup else {}
+    PROGRESS.finish(cache=cache.lookup_stats(), retries=dict(RETRY_COUNTS), **extra)
+
+    with PROFILE.phase("write_output"):
+        if writer is not None:
+            writer.close(uriMap=uri_map)
+        else:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump({"movieIndex": index, "uriMap": uri_map}, f, ensure_ascii=False, indent=2)
 
-    if args.black_director_list:
-        print("PHASE loading_black_director_list", file=sys.stderr, flush=True)
-        list_urls = load_letterboxd_list(args.black_director_list, args.uri_column, timeout=args.timeout, cache=cache)
-        print(f"Loaded {len(list_urls)} films from list", file=sys.stderr, flush=True)
-        mark_list_membership(index, list_urls, "is_by_black_director")
-        print(f"Marked {sum(1 for d in index.values() if d.get('is_by_black_director'))} films as in the list", file=sys.stderr, flush=True)
+    print(f"Wrote {len(index)} films -> {args.out}")
+    return 0
 
-    if args.enrich_tmdb:
-        enrich_with_tmdb(index, timeout=args.timeout, sleep_s=args.sleep, api_key=args.tmdb_api_key, cache=cache)
 
-    with open(args.out, "w", encoding="utf-8") as f:
-        json.dump({"movieIndex": index, "uriMap": uri_map}, f, ensure_ascii=False, indent=2)
+# Flags that change process-wide state, so a worker takes them at start-up only.
+WORKER_ONLY_FLAGS = (
+    "--cache", "--cache-codec", "--checkpoint-every", "--checkpoint-seconds", "--host-limit", "--tmdb-rate",
+    "--record-http", "--replay-http", "--replay-timing", "--profile", "--profile-cprofile", "--worker", "--socket",
+)
 
-    save_cache(args.cache, cache)
 
-    print(f"Wrote {len(index)} films -> {args.out}")
-    return 0
+def serve(args: argparse.Namespace) -> int:
+    """--worker: run jobs from stdin (or --socket) against one warm cache and transport."""
+    error = configure_transport(args)
+    if error is not None:
+        return error
+    cache = open_store(args)
+    if cache is None:
+        return 2
+
+    def run_job(argv: List[str]) -> int:
+        job_args = parse_args(argv)
+        ignored = [flag for flag in WORKER_ONLY_FLAGS if any(a == flag or a.startswith(flag + "=") for a in argv)]
+        if ignored:
+            print(f"Ignoring worker-wide flags in a job: {', '.join(ignored)}", file=sys.stderr)
+        return run(job_args, cache)
+
+    worker = JobWorker(
+        run_job,
+        progress=PROGRESS,
+        jobs=args.worker_jobs,
+        progress_interval=args.progress_interval,
+        after_job=cache.checkpoint,
+    )
+    try:
+        if args.socket:
+            return worker.serve_socket(args.socket)
+        return worker.serve_stdio()
+    finally:
+        cache.close()
+        if args.archive is not None:
+            print(args.archive.describe(), file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.worker:
+        return serve(args)
+    PROGRESS.configure(fmt=args.progress, interval=args.progress_interval)
+    if args.profile or args.profile_cprofile:
+        PROFILE.start(transport=HTTP, cprofile_path=args.profile_cprofile)
+
+    error = configure_transport(args)
+    if error is not None:
+        return error
+    cache = open_store(args)
+    if cache is None:
+        return 2
+    try:
+        startup = {"imports": round(IMPORT_SECONDS, 3), "cache_open": round(cache.open_seconds, 3)}
+        code = run(args, cache, startup=startup)
+    finally:
+        with PROFILE.phase("cache_close"):
+            cache.close()
+
+    if args.archive is not None:
+        print(args.archive.describe(), file=sys.stderr)
+    if PROFILE.enabled:
+        PROFILE.write_report(args.profile or "-", phases={"imports": IMPORT_SECONDS, **PROGRESS.phase_seconds})
+    return code
 
 
 if __name__ == "__main__":
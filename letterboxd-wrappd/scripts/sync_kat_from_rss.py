@@ -2,11 +2,12 @@
 import argparse
 import csv
 import re
-import urllib.request
 import xml.etree.ElementTree as ET
 from email.utils import parsedate_to_datetime
 from datetime import datetime
 
+from http_transport import shared_transport
+
 
 DIARY_DEFAULT = "public/kat_diary.csv"
 WATCHLIST_DEFAULT = "public/kat_watchlist.csv"
@@ -20,9 +21,9 @@ def norm(s):
 
 
 def fetch_rss(url):
-    req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
-    with urllib.request.urlopen(req) as resp:
-        return resp.read().decode("utf-8", errors="replace")
+    resp = shared_transport().get(url, headers={"User-Agent": "Mozilla/5.0"})
+    resp.raise_for_status()
+    return resp.content.decode("utf-8", errors="replace")
 
 
 def find_text_by_suffix(elem, suffix):
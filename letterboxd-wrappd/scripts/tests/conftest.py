@@ -0,0 +1,6 @@
+"""The scripts import each other as siblings, so tests run with scripts/ on the path."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
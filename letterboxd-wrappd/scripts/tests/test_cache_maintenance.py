@@ -0,0 +1,59 @@
+import pytest
+
+import cache_maintenance
+from cache_store import open_cache
+
+
+def make_caches(tmp_path):
+    with open_cache(tmp_path / "film_store.sqlite", checkpoint_every=1) as store:
+        store["film_to_tmdb"]["https://letterboxd.com/film/heat-1995/"] = 949
+        store["failures"]["scrape:x"] = {"kind": "timeout", "error": "slow", "expires_at": 0}
+        # Leave the -wal/-shm files behind, as a running script would.
+        leftover = open_cache(tmp_path / "film_store.sqlite")
+        leftover["film_to_tmdb"].get("x")
+    with open_cache(tmp_path / "old_cache.json", checkpoint_every=1) as store:
+        store["film_to_tmdb"]["https://letterboxd.com/film/alien-1979/"] = 348
+    return leftover
+
+
+def snapshot(tmp_path):
+    return {p.name: p.read_bytes() for p in tmp_path.iterdir()}
+
+
+def test_stats_never_writes(tmp_path, capsys):
+    leftover = make_caches(tmp_path)
+    before = snapshot(tmp_path)
+    assert any(name.endswith("-wal") for name in before)
+
+    assert cache_maintenance.main(["stats", *sorted(str(tmp_path / name) for name in before)]) == 0
+
+    assert snapshot(tmp_path) == before
+    out = capsys.readouterr().out
+    assert "film_store.sqlite" in out and "old_cache.json" in out
+    assert "-wal" not in out and "-shm" not in out
+    leftover.close()
+
+
+def test_prune_skips_sidecars(tmp_path):
+    leftover = make_caches(tmp_path)
+    leftover.close()
+    (tmp_path / "film_store.sqlite-shm").touch()
+    paths = sorted(str(p) for p in tmp_path.iterdir()) + [str(tmp_path / "gone.sqlite-shm")]
+
+    assert cache_maintenance.main(["prune", *paths]) == 0
+
+    with open_cache(tmp_path / "film_store.sqlite", read_only=True) as store:
+        assert store.peek("failures", "scrape:x") is None
+        assert store.peek("film_to_tmdb", "https://letterboxd.com/film/heat-1995/") == 949
+
+
+def test_rejects_files_that_are_not_caches(tmp_path, capsys):
+    (tmp_path / "notes.txt").write_text("keep me", encoding="utf-8")
+    assert cache_maintenance.main(["stats", str(tmp_path / "notes.txt")]) == 2
+    assert (tmp_path / "notes.txt").read_text(encoding="utf-8") == "keep me"
+    assert "Not a cache file" in capsys.readouterr().err
+
+
+def test_read_only_store_must_exist(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        open_cache(tmp_path / "missing.sqlite", read_only=True)
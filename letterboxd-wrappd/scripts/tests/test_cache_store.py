@@ -0,0 +1,55 @@
+import pytest
+
+from cache_store import open_cache
+
+
+@pytest.mark.parametrize("suffix", [".json", ".sqlite"])
+def test_lookup_stats_count_real_misses(tmp_path, suffix):
+    with open_cache(tmp_path / f"cache{suffix}") as store:
+        ns = store["film_to_tmdb"]
+        ns["a"] = 1
+        assert ns.get("a") == 1
+        assert ns["a"] == 1
+        assert ns.get("b") is None
+        with pytest.raises(KeyError):
+            ns["c"]
+        assert "d" not in ns  # membership tests count as neither
+        ns.setdefault("e", 5)
+        # A write without a lookup first isn't a miss.
+        ns["f"] = 6
+
+        stats = store.lookup_stats()["film_to_tmdb"]
+        assert (stats["hits"], stats["misses"], stats["hit_ratio"], stats["writes"]) == (2, 3, 0.4, 3)
+
+
+@pytest.mark.parametrize("suffix", [".json", ".sqlite"])
+def test_entries_survive_reopening(tmp_path, suffix):
+    path = tmp_path / f"cache{suffix}"
+    with open_cache(path) as store:
+        store["shortlink_to_film"]["https://boxd.it/abc"] = "https://letterboxd.com/film/heat-1995/"
+    with open_cache(path) as store:
+        assert store["shortlink_to_film"]["https://boxd.it/abc"] == "https://letterboxd.com/film/heat-1995/"
+        assert store.lookup_stats()["shortlink_to_film"]["hits"] == 1
+
+
+def test_http_archive_runs_get_a_throwaway_store(tmp_path, monkeypatch):
+    import cache_store
+    import scrape_tmdb_ids
+
+    shared = tmp_path / "film_store.sqlite"
+    monkeypatch.setattr(cache_store, "SHARED_CACHE_PATH", shared)
+    base = ["--csv", "diary.csv", "--out", "out.json"]
+
+    for flag in ("--replay-http", "--record-http"):
+        store = scrape_tmdb_ids.open_store(scrape_tmdb_ids.parse_args([*base, flag, str(tmp_path / "http")]))
+        store["film_to_tmdb"]["https://letterboxd.com/film/heat-1995/"] = 949
+        store.close()
+        assert store.path.parent.name.startswith("wrappd-cache-")
+        assert not shared.exists()
+
+    explicit = tmp_path / "mine.sqlite"
+    args = scrape_tmdb_ids.parse_args([*base, "--replay-http", str(tmp_path / "http"), "--cache", str(explicit)])
+    scrape_tmdb_ids.open_store(args).close()
+    assert explicit.exists()
+
+    assert cache_store.resolve_cache_path(None) == shared
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from compact_records import decode_tmdb_data, encode_tmdb_data
+from tmdb_client import build_tmdb_data, is_complete_tmdb_data
+
+DETAILS = {
+    "id": 496243,
+    "title": "Parasite",
+    "original_title": "기생충",
+    "original_language": "ko",
+    "release_date": "2019-05-30",
+    "overview": "All unemployed, Ki-taek's family takes peculiar interest in the wealthy Parks.",
+    "runtime": 133,
+    "genres": [{"id": 35, "name": "Comedy"}, {"id": 53, "name": "Thriller"}, {"id": 1, "name": "Satire"}],
+    "popularity": 88.5,
+    "vote_average": 8.5,
+    "vote_count": 17000,
+    "poster_path": "/7IiTTgloJzvGI1TAYymCfbfl3vT.jpg",
+    "backdrop_path": "/hiKmpZMGZsrkA3cdce8a7Dpos1j.jpg",
+    "production_countries": [{"iso_3166_1": "KR", "name": "South Korea"}, {"iso_3166_1": "XK", "name": "Kosovo"}],
+    "spoken_languages": [
+        {"iso_639_1": "ko", "name": "한국어/조선말"},
+        {"iso_639_1": "en", "name": "English"},
+        {"iso_639_1": "zu", "name": "isiZulu"},
+    ],
+}
+CREDITS = {
+    "crew": [
+        {"id": 21684, "name": "Bong Joon-ho", "job": "Director", "gender": 2, "profile_path": "/a.jpg"},
+        {"id": 21684, "name": "Bong Joon-ho", "job": "Screenplay", "gender": 2, "profile_path": "/a.jpg"},
+        {"id": 1, "name": "Han Jin-won", "job": "Screenplay", "gender": 1, "profile_path": None},
+        {"id": 2, "name": "Someone", "job": "Novel", "gender": 0, "profile_path": None},
+    ]
+}
+
+# Every tmdb_data field the app (src/App.tsx) reads.
+APP_FIELDS = (
+    "title", "release_date", "runtime", "genres", "vote_average", "poster_path", "production_countries",
+    "is_american", "spoken_languages", "is_english", "directors", "writers", "directed_by_woman",
+    "written_by_woman",
+)
+
+
+def round_trip(data):
+    # Through JSON too, as the stores keep it.
+    return decode_tmdb_data(json.loads(json.dumps(encode_tmdb_data(data))))
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        build_tmdb_data(DETAILS, CREDITS),
+        build_tmdb_data(DETAILS, None, "credits timed out"),
+        build_tmdb_data({**DETAILS, "production_countries": [], "spoken_languages": [], "original_language": "en"}, {}),
+        {**build_tmdb_data(DETAILS, CREDITS), "is_english": True, "tmdb_source": "csv_title_search"},
+    ],
+)
+def test_round_trip_is_lossless(data):
+    decoded = round_trip(data)
+    assert decoded == data
+    assert list(decoded) == list(data)
+
+
+def test_app_fields_survive_compaction():
+    data = build_tmdb_data(DETAILS, CREDITS)
+    decoded = round_trip(data)
+    for field in APP_FIELDS:
+        assert decoded[field] == data[field], field
+    assert decoded["spoken_languages"] == {"codes": ["ko", "en", "zu"], "names": ["한국어/조선말", "English", "isiZulu"]}
+    assert is_complete_tmdb_data(decoded)
+
+
+def test_compact_record_is_smaller():
+    data = build_tmdb_data(DETAILS, CREDITS)
+    assert len(json.dumps(encode_tmdb_data(data))) < len(json.dumps(data))
+
+
+def test_old_dict_records_pass_through():
+    data = build_tmdb_data(DETAILS, CREDITS)
+    assert decode_tmdb_data(data) is data
+
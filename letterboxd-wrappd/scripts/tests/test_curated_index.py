@@ -0,0 +1,92 @@
+import pytest
+
+import build_curated_lists
+from cache_store import open_cache
+from curated_index import CuratedIndex, film_key, write_curated_index
+
+LISTS = {
+    "top": {"name": "Top 250", "count": 3, "ranked": True},
+    "criterion": {"name": "Criterion Collection", "count": 2, "ranked": False},
+    "long": {"name": "Long list", "count": 1, "ranked": True},
+}
+
+
+def build(tmp_path, films, lists=LISTS):
+    path = tmp_path / "curated-lists.idx"
+    size = write_curated_index(path, lists, films)
+    assert size == path.stat().st_size
+    return CuratedIndex.load(path)
+
+
+def test_round_trip(tmp_path):
+    index = build(
+        tmp_path,
+        [
+            ("parasite-2019", {"top": 2, "criterion": None}),
+            ("heat-1995", {"top": 1}),
+            ("boxd.it/29qi", {"criterion": None, "long": 70_000}),
+        ],
+    )
+
+    assert index.lists == LISTS
+    assert len(index) == 3
+    assert index.lists_of("parasite-2019") == {"top": 2, "criterion": None}
+    assert index.lists_of("https://letterboxd.com/someone/film/heat-1995/") == {"top": 1}
+    assert index.lists_of("https://boxd.it/29qi") == {"criterion": None, "long": 70_000}
+    assert index.lists_of("not-on-any-list") == {}
+    assert index.position("parasite-2019", "top") == 2
+    assert index.position("parasite-2019", "criterion") is None
+    assert index.position("heat-1995", "long") is None
+    assert "https://letterboxd.com/film/parasite-2019/" in index
+    assert "alien-1979" not in index
+
+
+def test_films_in_sorts_films_without_a_position_last(tmp_path):
+    index = build(tmp_path, [("a", {"top": 0}), ("b", {"top": 3}), ("c", {"top": 1}), ("d", {"criterion": None})])
+
+    assert index.films_in("top") == ["c", "b", "a"]
+    assert index.films_in("criterion") == ["d"]
+    with pytest.raises(KeyError):
+        index.films_in("unknown")
+
+
+def test_duplicate_keys_merge(tmp_path):
+    index = build(tmp_path, [("heat-1995", {"top": 4}), ("heat-1995", {"top": 9, "criterion": None})])
+
+    assert len(index) == 1
+    assert index.lists_of("heat-1995") == {"top": 4, "criterion": None}
+
+
+def test_empty_index(tmp_path):
+    index = build(tmp_path, [], lists={})
+
+    assert len(index) == 0
+    assert index.lists_of("heat-1995") == {}
+
+
+def test_rejects_other_files(tmp_path):
+    with pytest.raises(ValueError):
+        CuratedIndex(b"not an index" + bytes(16))
+
+
+def test_film_key():
+    assert film_key("Parasite-2019") == "parasite-2019"
+    assert film_key("https://letterboxd.com/film/parasite-2019/") == "parasite-2019"
+    assert film_key("https://boxd.it/29qi") == "boxd.it/29qi"
+    assert film_key("boxd.it/29qi") == "boxd.it/29qi"
+
+
+def test_build_keys_resolved_shortlinks_by_slug(tmp_path):
+    cache_path = tmp_path / "film_store.sqlite"
+    with open_cache(cache_path, namespaces=("shortlink_to_film",)) as cache:
+        cache["shortlink_to_film"]["https://boxd.it/29qi"] = "https://letterboxd.com/film/parasite-2019/"
+        cache["shortlink_to_film"]["https://boxd.it/list1"] = "https://letterboxd.com/someone/list/favourites/"
+
+    urls = ["https://boxd.it/29qi", "https://boxd.it/list1", "https://boxd.it/2b0k"]
+    shortlinks = build_curated_lists.load_resolved_shortlinks(urls, cache_path)
+
+    assert shortlinks == {"https://boxd.it/29qi": "https://letterboxd.com/film/parasite-2019/"}
+    assert build_curated_lists.load_resolved_shortlinks(urls, tmp_path / "missing.sqlite") == {}
+    index = build(tmp_path, [(film_key(shortlinks.get(url, url)), {"criterion": None}) for url in urls])
+    assert index.lists_of("parasite-2019") == {"criterion": None}
+    assert index.lists_of("https://boxd.it/2b0k") == {"criterion": None}
@@ -0,0 +1,96 @@
+import csv
+import json
+
+import scrape_tmdb_ids
+
+PARASITE = "https://letterboxd.com/film/parasite-2019/"
+HEAT = "https://letterboxd.com/film/heat-1995/"
+
+
+def write_csv(path, urls):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Year", "Letterboxd URI"])
+        for url in urls:
+            writer.writerow(["", "", url])
+
+
+def run(tmp_path, *extra):
+    out = tmp_path / "out.json"
+    code = scrape_tmdb_ids.main(
+        ["--csv", str(tmp_path / "diary.csv"), "--out", str(out), "--cache", str(tmp_path / "cache.json"), *extra]
+    )
+    assert code == 0
+    return json.loads(out.read_text(encoding="utf-8"))["movieIndex"]
+
+
+def test_reused_entries_drop_stale_list_memberships(tmp_path):
+    write_csv(tmp_path / "diary.csv", [PARASITE, HEAT])
+    previous = {
+        PARASITE: {
+            **scrape_tmdb_ids.build_index([PARASITE])[PARASITE],
+            "is_in_criterion_collection": True,
+            "is_by_black_director": True,
+            "lists": {"criterion": 12, "old-list": 3},
+        },
+    }
+    (tmp_path / "previous.json").write_text(json.dumps({"movieIndex": previous, "uriMap": {}}), encoding="utf-8")
+
+    index = run(tmp_path, "--previous", str(tmp_path / "previous.json"))
+
+    for url in (PARASITE, HEAT):
+        assert index[url]["lists"] == {}
+        assert index[url]["is_in_criterion_collection"] is False
+        assert index[url]["is_by_black_director"] is False
+
+
+def test_reused_entries_get_this_runs_lists(tmp_path):
+    write_csv(tmp_path / "diary.csv", [PARASITE, HEAT])
+    write_csv(tmp_path / "criterion.csv", [HEAT])
+    previous = {PARASITE: {**scrape_tmdb_ids.build_index([PARASITE])[PARASITE], "is_in_criterion_collection": True}}
+    (tmp_path / "previous.json").write_text(json.dumps({"movieIndex": previous, "uriMap": {}}), encoding="utf-8")
+
+    index = run(
+        tmp_path, "--previous", str(tmp_path / "previous.json"), "--criterion-list", str(tmp_path / "criterion.csv")
+    )
+
+    assert index[PARASITE]["is_in_criterion_collection"] is False
+    assert index[PARASITE]["lists"] == {}
+    assert index[HEAT]["is_in_criterion_collection"] is True
+    assert index[HEAT]["lists"] == {"criterion": 1}
+
+
+def test_mark_list_memberships_resets_every_entry():
+    index = scrape_tmdb_ids.build_index([PARASITE, HEAT])
+    index[PARASITE].update(is_in_criterion_collection=True, lists={"criterion": 12})
+    index[HEAT].update(is_by_black_director=True, lists={"old-list": 3})
+
+    counts = scrape_tmdb_ids.mark_list_memberships(index, {"criterion": {"heat-1995": 7}, "mine": {"heat-1995": 1}})
+
+    assert counts == {"criterion": 1, "mine": 1}
+    assert index[PARASITE]["lists"] == {}
+    assert index[PARASITE]["is_in_criterion_collection"] is False
+    assert index[HEAT]["lists"] == {"criterion": 7, "mine": 1}
+    assert index[HEAT]["is_in_criterion_collection"] is True
+    assert index[HEAT]["is_by_black_director"] is False
+
+    assert scrape_tmdb_ids.mark_list_memberships(index, {}) == {}
+    assert index[HEAT]["lists"] == {}
+    assert index[HEAT]["is_in_criterion_collection"] is False
+
+
+def test_previous_reads_ndjson_output(tmp_path):
+    write_csv(tmp_path / "diary.csv", [PARASITE, HEAT])
+    out = tmp_path / "out.ndjson"
+    args = ["--csv", str(tmp_path / "diary.csv"), "--cache", str(tmp_path / "cache.json"), "--format", "ndjson"]
+    assert scrape_tmdb_ids.main([*args, "--out", str(out)]) == 0
+
+    index, uri_map = scrape_tmdb_ids.load_previous_output(str(out))
+    assert set(index) == {PARASITE, HEAT}
+    assert uri_map == {PARASITE: PARASITE, HEAT: HEAT}
+
+    # A run killed mid-write: the films written so far, no uriMap
+    lines = out.read_text(encoding="utf-8").splitlines(keepends=True)
+    (tmp_path / "partial.ndjson").write_text(lines[0] + lines[1][:20], encoding="utf-8")
+    index, uri_map = scrape_tmdb_ids.load_previous_output(str(tmp_path / "partial.ndjson"))
+    assert len(index) == 1 and uri_map == {}
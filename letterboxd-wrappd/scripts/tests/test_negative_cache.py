@@ -0,0 +1,72 @@
+import httpx
+import pytest
+
+from http_archive import ArchiveMissError
+from letterboxd_client import CloudflareBlockedError, TmdbLinkNotFoundError
+from negative_cache import FAILURE_TTLS, NegativeCache, classify_failure
+
+REQUEST = httpx.Request("GET", "https://api.themoviedb.org/3/movie/1")
+
+
+def status_error(status):
+    return httpx.HTTPStatusError("failed", request=REQUEST, response=httpx.Response(status, request=REQUEST))
+
+
+@pytest.mark.parametrize(
+    "exc, kind",
+    [
+        (TmdbLinkNotFoundError("no link"), "not_found"),
+        (status_error(404), "not_found"),
+        (status_error(410), "not_found"),
+        (CloudflareBlockedError("challenge"), "blocked"),
+        (status_error(429), "blocked"),
+        (httpx.ReadTimeout("slow", request=REQUEST), "timeout"),
+        (status_error(500), "unavailable"),
+        (status_error(503), "unavailable"),
+        (httpx.ConnectError("refused", request=REQUEST), "unavailable"),
+        (httpx.RemoteProtocolError("dropped", request=REQUEST), "unavailable"),
+        (status_error(400), "error"),
+        (httpx.TooManyRedirects("loop", request=REQUEST), "error"),
+        (status_error(401), None),
+        (status_error(403), None),
+        (ArchiveMissError("not recorded", request=REQUEST), None),
+        (KeyError("bug"), None),
+        (RuntimeError("bug"), None),
+    ],
+)
+def test_classify_failure(exc, kind):
+    assert classify_failure(exc) == kind
+
+
+def test_transient_failures_expire_quickly():
+    long_lived = FAILURE_TTLS["not_found"]
+    for kind in ("blocked", "timeout", "unavailable"):
+        assert FAILURE_TTLS[kind] <= 60 * 60 < long_lived
+
+
+def test_record_and_expire(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr("negative_cache.time.time", lambda: now[0])
+    failures = NegativeCache({"failures": {}})
+
+    entry = failures.record("tmdb", 1, status_error(503))
+    assert entry["kind"] == "unavailable"
+    assert entry["expires_at"] == now[0] + FAILURE_TTLS["unavailable"]
+    assert failures.get("tmdb", 1)["error"] == "failed"
+
+    now[0] += FAILURE_TTLS["unavailable"]
+    assert failures.get("tmdb", 1) is None
+
+
+def test_uncacheable_failures_are_not_recorded():
+    cache = {"failures": {}}
+    failures = NegativeCache(cache)
+    assert failures.record("tmdb", 1, status_error(401)) is None
+    assert failures.record("scrape", "x", ValueError("bug")) is None
+    assert cache["failures"] == {}
+
+
+def test_disabled_cache_never_hits():
+    failures = NegativeCache({"failures": {}}, enabled=False)
+    failures.record("tmdb", 1, status_error(404))
+    assert failures.get("tmdb", 1) is None
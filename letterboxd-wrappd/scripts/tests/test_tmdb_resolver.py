@@ -0,0 +1,87 @@
+import csv
+import json
+
+import pytest
+
+import enrich_curated_lists
+import scrape_tmdb_ids
+from cache_store import open_cache
+from fake_services import HOSTS, TMDB_ID_OFFSET, FakeServices, ServiceConfig, film_title, film_url, film_year
+from tmdb_client import SEARCH_MIN_CONFIDENCE, search_cache_entry
+
+FILMS = (1, 2, 3)
+
+
+@pytest.fixture
+def services():
+    with FakeServices(ServiceConfig(latency={host: 0.0 for host in HOSTS}, page_kb=8)) as svc:
+        scrape_tmdb_ids.HTTP.configure(host_overrides=svc.overrides())
+        yield svc
+        # Clients keep the origin they were created with: the next test's
+        # stand-ins listen on another port.
+        scrape_tmdb_ids.HTTP.run(scrape_tmdb_ids.HTTP.transport.aclose())
+
+
+def run(tmp_path, resolver, rows=None):
+    diary = tmp_path / "diary.csv"
+    with open(diary, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Year", "Letterboxd URI"])
+        for row in rows or [(film_title(n), film_year(n), film_url(n)) for n in FILMS]:
+            writer.writerow(row)
+    out = tmp_path / "out.json"
+    code = scrape_tmdb_ids.main([
+        "--csv", str(diary), "--out", str(out), "--cache", str(tmp_path / "cache.sqlite"),
+        "--enrich-tmdb", "--tmdb-api-key", "test", "--tmdb-resolver", resolver,
+    ])
+    assert code == 0
+    return json.loads(out.read_text(encoding="utf-8"))["movieIndex"]
+
+
+def cached(tmp_path, namespace):
+    with open_cache(tmp_path / "cache.sqlite", read_only=True) as store:
+        return {key: store.peek(namespace, key) for key in store[namespace]} if namespace in store else {}
+
+
+def test_search_matches_stay_out_of_film_to_tmdb(tmp_path, services):
+    index = run(tmp_path, "hybrid")
+    assert {url: entry["tmdb_source"] for url, entry in index.items()} == {
+        film_url(n): scrape_tmdb_ids.SOURCE_SEARCH for n in FILMS
+    }
+    assert cached(tmp_path, "film_to_tmdb") == {}
+    assert cached(tmp_path, "title_year_to_tmdb") == {
+        f"{film_title(n)}|{film_year(n)}": search_cache_entry(n + TMDB_ID_OFFSET, 1.0) for n in FILMS
+    }
+
+    # A second hybrid run answers from the title/year cache, without searching.
+    services.reset_stats()
+    index = run(tmp_path, "hybrid")
+    assert all(entry["tmdb_source"] == scrape_tmdb_ids.SOURCE_SEARCH for entry in index.values())
+    assert services.stats() == {}
+
+
+def test_page_scrape_wins_over_a_search_match(tmp_path, services):
+    run(tmp_path, "hybrid")
+    index = run(tmp_path, "scrape")
+    assert all(entry["tmdb_source"] == scrape_tmdb_ids.SOURCE_SCRAPE for entry in index.values())
+    assert cached(tmp_path, "film_to_tmdb") == {film_url(n): n + TMDB_ID_OFFSET for n in FILMS}
+
+    index = run(tmp_path, "hybrid")
+    assert all(entry["tmdb_source"] == scrape_tmdb_ids.SOURCE_SCRAPE for entry in index.values())
+
+
+def test_weak_search_guesses_from_other_scripts_are_not_trusted(tmp_path, services):
+    # enrich_curated_lists.py settles for a title-only match when the year is
+    # off, and older caches hold bare IDs from its unscored searches.
+    result, confidence = enrich_curated_lists.tmdb_search(film_title(1), "1990", "test")
+    assert result["id"] == 1 + TMDB_ID_OFFSET and confidence < SEARCH_MIN_CONFIDENCE
+    with open_cache(tmp_path / "cache.sqlite") as store:
+        store["title_year_to_tmdb"][f"{film_title(1)}|1990"] = search_cache_entry(999, confidence)
+        store["title_year_to_tmdb"][f"{film_title(2)}|{film_year(2)}"] = 999
+
+    index = run(tmp_path, "hybrid", [(film_title(1), "1990", film_url(1)), (film_title(2), film_year(2), film_url(2))])
+
+    assert index[film_url(1)]["tmdb_source"] == scrape_tmdb_ids.SOURCE_SCRAPE
+    assert index[film_url(1)]["tmdb_movie_id"] == 1 + TMDB_ID_OFFSET
+    assert index[film_url(2)]["tmdb_source"] == scrape_tmdb_ids.SOURCE_SEARCH
+    assert index[film_url(2)]["tmdb_movie_id"] == 2 + TMDB_ID_OFFSET
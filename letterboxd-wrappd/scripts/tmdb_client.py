@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""TMDb API calls shared by the enrichment scripts.
+
+fetch_movie() gets a film's details and credits in one round trip with
+``append_to_response=credits``. If the combined request fails, or comes back
+without a credits block, it falls back to the separate /movie/{id} and
+/movie/{id}/credits calls.
+
+build_tmdb_data() turns the (details, credits) pair into the tmdb_data record
+every script caches and outputs, so a record cached by one script is a hit
+for the others (they share one store, see cache_store.py).
+
+search_movie() looks a film up by title and year, and match_search_result()
+picks the result a title/year pair names, with a confidence score (the same
+rules as searchTmdbByTitle in api/movies.ts, plus a penalty for ties).
+Search matches are cached (title_year_to_tmdb) with that confidence, see
+search_cache_entry(), so a reader can tell a confident match from a guess.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, List, Optional, Tuple
+
+from http_transport import AsyncTransport, is_retryable
+
+TMDB_API_BASE = "https://api.themoviedb.org/3"
+
+WRITER_JOBS = ("Writer", "Screenplay", "Story", "Characters")
+
+# A cached record without these predates the shared schema (or has no
+# credits) and is fetched again.
+COMPLETE_RECORD_KEYS = ("release_date", "directed_by_woman")
+
+# match_search_result() scores: exact title and year, title with the year one
+# off, title alone, year alone. A result is trusted from SEARCH_MIN_CONFIDENCE.
+CONFIDENCE_TITLE_YEAR = 1.0
+CONFIDENCE_TITLE_NEAR_YEAR = 0.75
+CONFIDENCE_TITLE = 0.5
+CONFIDENCE_YEAR = 0.25
+SEARCH_MIN_CONFIDENCE = CONFIDENCE_TITLE_NEAR_YEAR
+
+
+async def _get_json(transport: AsyncTransport, path: str, params: dict, *, timeout: float) -> dict:
+    resp = await transport.get(
+        f"{TMDB_API_BASE}{path}",
+        params=params,
+        headers={"Accept": "application/json"},
+        timeout=timeout,
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def fetch_movie(
+    transport: AsyncTransport,
+    tmdb_id: int,
+    *,
+    api_key: str,
+    timeout: float = 30,
+) -> Tuple[dict, Optional[dict], Optional[str]]:
+    """Return (details, credits, credits_error) for a TMDb movie.
+
+    Raises if the details themselves can't be fetched. A 401/404 or a throttle
+    on the combined request is raised as-is, since the split calls would fail
+    the same way; callers retry throttles with http_transport.with_retries.
+    A credits failure is reported as ``credits_error`` with ``credits`` None.
+    """
+    import httpx
+
+    # No ``language``: TMDb answers in its default (en-US) either way, and
+    # enrich_curated_lists.py never sent one, so records match across scripts.
+    params = {"api_key": api_key}
+    try:
+        details = await _get_json(
+            transport,
+            f"/movie/{tmdb_id}",
+            {**params, "append_to_response": "credits"},
+            timeout=timeout,
+        )
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code in (401, 404) or is_retryable(e):
+            raise
+        details = None
+    except Exception:
+        details = None
+
+    if details is None:
+        details = await _get_json(transport, f"/movie/{tmdb_id}", params, timeout=timeout)
+
+    credits = details.pop("credits", None)
+    if isinstance(credits, dict):
+        return details, credits, None
+    try:
+        return details, await _get_json(transport, f"/movie/{tmdb_id}/credits", params, timeout=timeout), None
+    except Exception as e:
+        return details, None, str(e)
+
+
+async def search_movie(
+    transport: AsyncTransport,
+    title: str,
+    year: str = "",
+    *,
+    api_key: str,
+    timeout: float = 30,
+) -> List[dict]:
+    """Return TMDb's /search/movie results for a title (within ``year``, if given)."""
+    params = {"api_key": api_key, "query": title}
+    if year:
+        params["year"] = year
+    data = await _get_json(transport, "/search/movie", params, timeout=timeout)
+    return data.get("results") or []
+
+
+def normalize_title(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "", (value or "").lower())
+
+
+def _search_score(result: dict, norm_title: str, year: Optional[int]) -> float:
+    titles = {normalize_title(result.get("title", "")), normalize_title(result.get("original_title", ""))}
+    release_year = str(result.get("release_date") or "")[:4]
+    year_off = abs(int(release_year) - year) if year is not None and release_year.isdigit() else None
+    if norm_title and norm_title in titles:
+        if year_off == 0:
+            return CONFIDENCE_TITLE_YEAR
+        if year_off == 1:
+            return CONFIDENCE_TITLE_NEAR_YEAR
+        return CONFIDENCE_TITLE
+    return CONFIDENCE_YEAR if year_off == 0 else 0.0
+
+
+def match_search_result(results: List[dict], title: str, year: str = "") -> Tuple[Optional[dict], float]:
+    """Return (best result, confidence) for a title/year among search results.
+
+    Confidence is the best result's score; when another result scores the
+    same (a remake in the same year, two films of one title a year apart) it
+    is halved, since the title and year can't tell them apart.
+    """
+    norm_title = normalize_title(title)
+    year_value = int(year) if str(year).isdigit() else None
+    scored = [(_search_score(r, norm_title, year_value), r) for r in results if r.get("id")]
+    if not scored:
+        return None, 0.0
+    best_score, best = max(scored, key=lambda item: item[0])
+    if sum(1 for score, _ in scored if score == best_score) > 1:
+        best_score /= 2
+    return best, best_score
+
+
+def search_cache_entry(tmdb_id: int, confidence: float) -> dict:
+    """The title_year_to_tmdb value for a search match."""
+    return {"id": int(tmdb_id), "confidence": confidence}
+
+
+def cached_search_id(entry: Any, min_confidence: float = 0.0) -> Optional[int]:
+    """The TMDb ID of a title_year_to_tmdb entry if its confidence reaches ``min_confidence``.
+
+    A bare ID (a search cached without a score, e.g. curated_tmdb_cache.json's
+    ``tmdb_search``) counts as confidence 0.
+    """
+    if isinstance(entry, int) and not isinstance(entry, bool):
+        return entry if min_confidence <= 0 else None
+    if not isinstance(entry, dict) or not isinstance(entry.get("id"), int):
+        return None
+    confidence = entry.get("confidence")
+    if not isinstance(confidence, (int, float)) or confidence < min_confidence:
+        return None
+    return entry["id"]
+
+
+def _person(person: dict, *, job: bool = False) -> dict:
+    record = {"id": person.get("id"), "name": person.get("name")}
+    if job:
+        record["job"] = person.get("job")
+    record["gender"] = person.get("gender")
+    record["profile_path"] = person.get("profile_path")
+    return record
+
+
+def build_tmdb_data(details: dict, credits: Optional[dict], credits_error: Optional[str] = None) -> dict:
+    """The tmdb_data record for a film, from fetch_movie()'s result.
+
+    Without credits the record has ``credits_error`` instead of the director,
+    writer and woman-director/-writer fields.
+    """
+    production_countries = details.get("production_countries", [])
+    country_codes = [c.get("iso_3166_1") for c in production_countries if c.get("iso_3166_1")]
+    country_names = [c.get("name") for c in production_countries if c.get("name")]
+
+    spoken_languages = details.get("spoken_languages", [])
+    language_codes = [l.get("iso_639_1") for l in spoken_languages if l.get("iso_639_1")]
+    language_names = [l.get("name") for l in spoken_languages if l.get("name")]
+
+    # original_language, not spoken_languages (which lists ANY language spoken)
+    original_language = details.get("original_language", "")
+
+    credits_data: dict[str, Any]
+    if credits is not None:
+        crew = credits.get("crew", [])
+        directors = [_person(p) for p in crew if p.get("job") == "Director"]
+        writers = [_person(p, job=True) for p in crew if p.get("job") in WRITER_JOBS]
+        credits_data = {
+            "directors": directors,
+            "writers": writers,
+            "directed_by_woman": any(d.get("gender") == 1 for d in directors),
+            "written_by_woman": any(w.get("gender") == 1 for w in writers),
+        }
+    else:
+        credits_data = {"credits_error": credits_error}
+
+    return {
+        "title": details.get("title"),
+        "original_title": details.get("original_title"),
+        "original_language": original_language,
+        "release_date": details.get("release_date"),
+        "overview": details.get("overview"),
+        "runtime": details.get("runtime"),
+        "genres": [g.get("name") for g in details.get("genres", [])],
+        "popularity": details.get("popularity"),
+        "vote_average": details.get("vote_average"),
+        "vote_count": details.get("vote_count"),
+        "poster_path": details.get("poster_path"),
+        "backdrop_path": details.get("backdrop_path"),
+        "production_countries": {"codes": country_codes, "names": country_names},
+        "is_american": "US" in country_codes,
+        "spoken_languages": {"codes": language_codes, "names": language_names},
+        "is_english": original_language == "en",
+        **credits_data,
+    }
+
+
+def is_complete_tmdb_data(record: Any) -> bool:
+    """Whether a cached tmdb_data record can be used as-is."""
+    return isinstance(record, dict) and all(key in record for key in COMPLETE_RECORD_KEYS)
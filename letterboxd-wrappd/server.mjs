@@ -7,8 +7,6 @@ import os from "node:os";
 import path from "node:path";
 import { XMLParser } from "fast-xml-parser";
 
-const CACHE_PATH = path.join(process.cwd(), ".cache", "letterboxd_tmdb_cache.json");
-
 import dotenv from "dotenv";
 dotenv.config();
 
@@ -25,6 +23,196 @@ function pruneJobs(maxAgeMs = 30 * 60 * 1000) {
   }
 }
 
+function startPhase(job, rawPhase) {
+  // Normalize phase to avoid hidden characters causing mismatches
+  const phase = String(rawPhase)
+    .trim()
+    .toLowerCase()
+    .replace(/[^a-z0-9_\-]/g, "");
+
+  // Reset progress whenever we enter a new phase so we don't show 302/302 forever.
+  job.current = 0;
+  job.total = 0;
+  job.rate = null;
+  job.eta = null;
+
+  if (phase === "loading_csv") job.message = "Loading CSV…";
+  else if (phase === "loading_list") job.message = "Loading list…";
+  else if (phase === "loading_criterion_list") job.message = "Loading Criterion list…";
+  else if (phase === "loading_lists") job.message = "Loading lists…";
+  else if (phase === "list_resolve") job.message = "Resolving list films…";
+  else if (phase === "resolve") job.message = "Resolving film URLs…";
+  else if (phase === "tmdb_search") job.message = "Searching TMDb by title…";
+  else if (phase === "letterboxd_scrape") job.message = "Reading TMDb IDs from Letterboxd…";
+  else if (phase === "tmdb") job.message = "Fetching TMDb data…";
+  else job.message = `Working (${phase || "unknown"})…`;
+
+  console.log(`[Job ${job.id}] PHASE: ${rawPhase} -> ${job.message}`);
+}
+
+// JSON events (--progress json, see scripts/progress_events.py)
+function handleEvent(job, ev) {
+  if (ev.event === "phase_start") startPhase(job, ev.phase);
+  else if (ev.event === "progress") {
+    job.current = Number(ev.done) || 0;
+    job.total = Number(ev.total) || 0;
+    job.rate = ev.rate ?? null;
+    job.eta = ev.eta ?? null;
+  } else console.log(`[Job ${job.id}] ${ev.event}:`, JSON.stringify(ev));
+}
+
+function parseEvent(line) {
+  if (!line.startsWith("{")) return null;
+  try {
+    const ev = JSON.parse(line);
+    return ev && typeof ev.event === "string" ? ev : null;
+  } catch {
+    return null;
+  }
+}
+
+const MAX_JOB_LOG_LINES = 200;
+
+// One line the script wrote to stderr (or printed, under the worker)
+function handleScriptLine(job, line) {
+  const ev = parseEvent(line);
+  if (ev) {
+    handleEvent(job, ev);
+    return;
+  }
+
+  console.log("[PY]", line);
+  const pm = line.match(/^PHASE\s+(.+?)\s*$/);
+  if (pm) {
+    startPhase(job, pm[1]);
+    return;
+  }
+
+  const m = line.match(/^PROGRESS\s+(\d+)\s+(\d+)\s*$/);
+  if (m) {
+    job.current = Number(m[1]);
+    job.total = Number(m[2]);
+    console.log(`[Job ${job.id}] PROGRESS: ${job.current}/${job.total}`);
+    return;
+  }
+
+  // Warnings and notes, not errors: a job that exits 0 can print plenty of
+  // these. They only become the job's error if it fails without one.
+  if (line.trim()) {
+    console.log(`[Job ${job.id}] stderr line: ${line}`);
+    job.logs.push(line);
+    if (job.logs.length > MAX_JOB_LOG_LINES) job.logs.shift();
+  }
+}
+
+// Split a stream into lines, calling onLine for each complete one
+function onLines(stream, onLine) {
+  let buf = "";
+  stream.on("data", (d) => {
+    buf += d.toString();
+    const lines = buf.split(/\r?\n/);
+    buf = lines.pop() || "";
+    for (const line of lines) onLine(line);
+  });
+}
+
+async function finishJob(job, code) {
+  const { csvPath, outPath } = job;
+  try {
+    if (code !== 0) {
+      job.state = "error";
+      if (!job.error.trim()) job.error = job.logs.join("\n") || `Python exited with code ${code}`;
+      return;
+    }
+    job.resultText = await fs.readFile(outPath, "utf-8");
+    let parsed = null;
+    try {
+      parsed = JSON.parse(job.resultText);
+    } catch (e) {
+      parsed = null;
+    }
+
+    // Normalize output: always { movieIndex, uriMap }
+    if (parsed && typeof parsed === "object" && parsed.movieIndex) {
+      job.result = parsed;
+    } else if (parsed && typeof parsed === "object") {
+      job.result = { movieIndex: parsed, uriMap: null };
+    } else {
+      job.result = { movieIndex: {}, uriMap: null };
+      job.logs.push("Failed to parse output JSON.");
+    }
+
+    // Ensure resultText matches the normalized shape (useful for debugging)
+    job.resultText = JSON.stringify(job.result);
+    console.log(`[Job ${job.id}] Result keys:`, Object.keys(job.result || {}));
+    job.state = "done";
+    job.message = "Ready";
+  } catch (e) {
+    job.state = "error";
+    job.error += String(e);
+  } finally {
+    try { await fs.unlink(csvPath); } catch {}
+    try { await fs.unlink(outPath); } catch {}
+  }
+}
+
+// One python3 process per upload (SCRAPE_WORKER=0)
+function runInProcess(job, args, cwd) {
+  const p = spawn("python3", args, { cwd });
+  onLines(p.stderr, (line) => handleScriptLine(job, line));
+  p.on("close", (code) => finishJob(job, code));
+}
+
+// Otherwise uploads go to one long-lived `scrape_tmdb_ids.py --worker`
+// (see scripts/job_worker.py), which keeps the cache and connections warm.
+// It is started on the first upload and again after it exits.
+const USE_SCRAPE_WORKER = process.env.SCRAPE_WORKER !== "0";
+let scrapeWorker = null;
+
+function getScrapeWorker() {
+  if (scrapeWorker) return scrapeWorker;
+  const proc = spawn("python3", ["scripts/scrape_tmdb_ids.py", "--worker"], { cwd: process.cwd() });
+  const worker = { proc, jobs: new Map() };
+  console.log(`Started scrape worker (pid ${proc.pid})`);
+
+  onLines(proc.stdout, (line) => {
+    const ev = parseEvent(line);
+    const job = ev && worker.jobs.get(String(ev.job));
+    if (!job) {
+      if (line.trim()) console.log("[PY worker]", line);
+      return;
+    }
+    if (ev.event === "result") {
+      worker.jobs.delete(job.id);
+      if (ev.error) job.error += ev.error + "\n";
+      finishJob(job, ev.exit);
+    } else if (ev.event === "log") handleScriptLine(job, ev.line);
+    else handleEvent(job, ev);
+  });
+  onLines(proc.stderr, (line) => console.log("[PY]", line));
+  proc.stdin.on("error", (e) => console.log("Scrape worker stdin:", String(e))); // it died; "close" fails its jobs
+
+  const onExit = (why) => {
+    if (scrapeWorker === worker) scrapeWorker = null;
+    for (const job of worker.jobs.values()) {
+      job.error += `Scrape worker ${why}\n`;
+      finishJob(job, 1);
+    }
+    worker.jobs.clear();
+  };
+  proc.on("error", (e) => onExit(`failed: ${e}`));
+  proc.on("close", (code) => onExit(`exited with code ${code}`));
+
+  scrapeWorker = worker;
+  return worker;
+}
+
+function runOnWorker(job, args) {
+  const worker = getScrapeWorker();
+  worker.jobs.set(job.id, job);
+  worker.proc.stdin.write(JSON.stringify({ id: job.id, args }) + "\n");
+}
+
 const app = express();
 
 // Allow your dev frontend (Vite) to call this API
@@ -118,8 +306,11 @@ app.get("/api/movies/:id/status", (req, res) => {
     state: job.state,
     current: job.current,
     total: job.total,
+    rate: job.rate,
+    eta: job.eta,
     message: job.message,
     error: job.state === "error" ? job.error : "",
+    logs: job.logs,
   });
 });
 
@@ -170,7 +361,10 @@ app.post("/api/movies", upload.single("file"), async (req, res) => {
     current: 0,
     total: 0,
     message: enrich ? "Starting TMDb scraping…" : "Building index…",
-    error: "",
+    rate: null, // items/sec in the current phase
+    eta: null, // seconds left in the current phase
+    error: "", // why the job failed; only set when it does
+    logs: [], // the script's other stderr lines (warnings, notes), most recent last
     resultText: "",
   };
   jobs.set(jobId, job);
@@ -183,12 +377,17 @@ app.post("/api/movies", upload.single("file"), async (req, res) => {
     "Letterboxd URI",
     "--out",
     outPath,
+    "--progress",
+    "json",
   ];
   if (enrich) {
     args.push("--enrich-tmdb");
     if (tmdbApiKey) {
       args.push("--tmdb-api-key");
       args.push(tmdbApiKey);
+      // Search TMDb by title first; only unmatched films hit letterboxd.com
+      args.push("--tmdb-resolver");
+      args.push("hybrid");
     }
   }
   if (criterionListPath) {
@@ -200,110 +399,10 @@ app.post("/api/movies", upload.single("file"), async (req, res) => {
     args.push(blackDirectorListPath);
   }
 
-  const p = spawn("python3", args, { cwd });
-
-  let stderrBuf = "";
-  p.stderr.on("data", (d) => {
-    const text = d.toString();
-    stderrBuf += text;
-
-    const lines = stderrBuf.split(/\r?\n/);
-    stderrBuf = lines.pop() || "";
-
-    for (const line of lines) {
-      console.log("[PY]", line);
-      const pm = line.match(/^PHASE\s+(.+?)\s*$/);
-      if (pm) {
-        // Normalize phase to avoid hidden characters causing mismatches
-        const rawPhase = pm[1];
-        const phase = rawPhase
-          .trim()
-          .toLowerCase()
-          .replace(/[^a-z0-9_\-]/g, "");
-
-        // Reset progress whenever we enter a new phase so we don't show 302/302 forever.
-        job.current = 0;
-        job.total = 0;
-
-        if (phase === "loading_csv") job.message = "Loading CSV…";
-        else if (phase === "loading_list") job.message = "Loading list…";
-        else if (phase === "loading_criterion_list") job.message = "Loading Criterion list…";
-        else if (phase === "resolve") job.message = "Resolving film URLs…";
-        else if (phase === "tmdb") job.message = "Fetching TMDb data…";
-        else job.message = `Working (${phase || "unknown"})…`;
-
-        console.log(`[Job ${jobId}] PHASE: ${rawPhase} -> ${job.message}`);
-        continue;
-      }
-
-      const m = line.match(/^PROGRESS\s+(\d+)\s+(\d+)\s*$/);
-      if (m) {
-        job.current = Number(m[1]);
-        job.total = Number(m[2]);
-        console.log(`[Job ${jobId}] PROGRESS: ${job.current}/${job.total}`);
-        continue;
-      }
-
-      if (line.trim()) {
-        console.log(`[Job ${jobId}] stderr line: ${line}`);
-        job.error += line + "\n";
-      }
-    }
-  });
-
-  p.on("close", async (code) => {
-    try {
-      if (code !== 0) {
-        job.state = "error";
-        if (!job.error.trim()) job.error = `Python exited with code ${code}`;
-        return;
-      }
-      job.resultText = await fs.readFile(outPath, "utf-8");
-      let parsed = null;
-      try {
-        parsed = JSON.parse(job.resultText);
-      } catch (e) {
-        parsed = null;
-      }
-
-      // Normalize output: always { movieIndex, uriMap }
-      if (parsed && typeof parsed === "object" && parsed.movieIndex) {
-        job.result = parsed;
-      } else if (parsed && typeof parsed === "object") {
-        job.result = { movieIndex: parsed, uriMap: null };
-      } else {
-        job.result = { movieIndex: {}, uriMap: null };
-        job.error += "\nFailed to parse output JSON.";
-      }
-
-      // If Python didn't include uriMap, try to populate it from the persistent cache
-      if (job.result && (job.result.uriMap == null || Object.keys(job.result.uriMap || {}).length === 0)) {
-        try {
-          const cacheText = await fs.readFile(CACHE_PATH, "utf-8");
-          const cacheJson = JSON.parse(cacheText);
-          const shortMap = cacheJson && typeof cacheJson === "object" ? cacheJson.shortlink_to_film : null;
-          if (shortMap && typeof shortMap === "object") {
-            job.result.uriMap = shortMap;
-            console.log(`[Job ${jobId}] Loaded uriMap from cache: ${Object.keys(shortMap).length} entries`);
-          }
-        } catch (e) {
-          // It's okay if cache doesn't exist yet
-        }
-      }
-
-      // Ensure resultText matches the normalized shape (useful for debugging)
-      job.resultText = JSON.stringify(job.result);
-      console.log(`[Job ${jobId}] Result keys:`, Object.keys(job.result || {}));
-      job.state = "done";
-      job.message = "Ready";
-    } catch (e) {
-      job.state = "error";
-      job.error += String(e);
-    } finally {
-      try { await fs.unlink(csvPath); } catch {}
-      try { await fs.unlink(outPath); } catch {}
-    }
-  });
+  job.csvPath = csvPath;
+  job.outPath = outPath;
+  if (USE_SCRAPE_WORKER) runOnWorker(job, args.slice(1));
+  else runInProcess(job, args, cwd);
 
   res.json({ jobId });
 });